@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+Asyncio FPGA UART Interface
+Event-loop driven variant of FPGAUartInterface. The serial port is opened with
+pyserial for configuration, then its file descriptor is driven non-blocking
+through loop.add_reader()/add_writer(), so one asyncio service can poll
+registers, update the PWM and serve other I/O concurrently without threads.
+
+Outstanding 'R' / 'b' requests are kept in a FIFO; reply bytes resolve the
+futures in order as they arrive, with unsolicited "DBG: " frames set apart by
+RxDecoder. uart_if.v processes commands in order but
+drops any command received while a block read reply is still queued, so
+single reads and writes are pipelined freely while every command after a
+block read waits for that reply.
+
+Protocol: see fpga_uart_interface.py
+
+Usage:
+    async def main():
+        fpga = AsyncFPGAUartInterface('/dev/ttyUSB1')
+        if await fpga.connect():
+            duty, leds = await asyncio.gather(fpga.get_pwm_duty(), fpga.get_debug_leds())
+            await fpga.disconnect()
+"""
+
+import asyncio
+import os
+import sys
+from collections import deque
+from typing import List, Optional
+
+import serial
+
+from fpga_uart_interface import (BITS_PER_BYTE, BLOCK_OVERRUN_SETTLE, CMD_BLOCK_READ,
+                                 CMD_BLOCK_WRITE, CMD_READ, CMD_WRITE, MAX_BLOCK_LENGTH,
+                                 RX_LOOKAHEAD)
+from link_profile import default_baudrate
+from rx_decoder import DEBUG_PREFIX, RxDecoder
+
+# Silence required after a timeout before new requests are sent, so a late
+# reply is dropped instead of being taken as the answer to the next request
+RESYNC_QUIET = 0.1
+
+
+class _Request:
+    """Outstanding request waiting for reply bytes."""
+
+    __slots__ = ('future', 'block')
+
+    def __init__(self, future: asyncio.Future, block: bool):
+        self.future = future
+        self.block = block
+
+
+class AsyncFPGAUartInterface:
+    """Asyncio UART interface for FPGA register bank communication."""
+
+    def __init__(self, port: str = '/dev/ttyUSB1', baudrate: Optional[int] = None, timeout: float = 1.0,
+                 verbose: bool = True):
+        """
+        Initialize (call connect() from a running event loop).
+
+        Args:
+            port: Serial port device (e.g., '/dev/ttyUSB1')
+            baudrate: UART baud rate (default: saved link profile, else 115200)
+            timeout: Reply timeout per request in seconds
+            verbose: Whether to print connection messages
+        """
+        self.port = port
+        self.baudrate = baudrate or default_baudrate(port)
+        self.timeout = timeout
+        self.verbose = verbose
+        self.serial = None
+        # WORKAROUND: see FPGAUartInterface.block_overrun_settle
+        self.block_overrun_settle = BLOCK_OVERRUN_SETTLE
+        self.rx_lookahead = RX_LOOKAHEAD
+        self.resync_quiet = RESYNC_QUIET
+
+        # Request counters; received byte statistics are in rx_decoder.stats
+        self.stats = {'requests': 0, 'timeouts': 0}
+        self.rx_decoder = RxDecoder()
+
+        self._loop = None
+        self._fd = None
+        self._tx = bytearray()
+        self._pending = deque()
+        self._block_gate = None   # Set while no block read reply is outstanding
+        self._settle_handle = None
+        self._lookahead_handle = None
+        self._writing = False
+        self._resync = False      # Set after a timeout until the line is quiet
+        self._last_rx = 0.0       # Time stray (non debug frame) bytes last arrived
+
+    async def connect(self, exclusive: bool = True) -> bool:
+        """
+        Open the serial port and attach it to the running event loop.
+
+        Args:
+            exclusive: Lock the port (flock on POSIX), see FPGAUartInterface.connect()
+
+        Returns:
+            True if connection successful, False otherwise
+        """
+        self._loop = asyncio.get_running_loop()
+        try:
+            self.serial = serial.Serial(
+                port=self.port,
+                baudrate=self.baudrate,
+                bytesize=serial.EIGHTBITS,
+                parity=serial.PARITY_NONE,
+                stopbits=serial.STOPBITS_ONE,
+                timeout=0,
+                exclusive=exclusive
+            )
+            self.serial.reset_input_buffer()
+            self.serial.reset_output_buffer()
+        except serial.SerialException as e:
+            print(f"Failed to connect to {self.port}: {e}")
+            return False
+
+        self._fd = self.serial.fileno()
+        os.set_blocking(self._fd, False)
+        self._block_gate = asyncio.Event()
+        self._block_gate.set()
+        self._loop.add_reader(self._fd, self._on_readable)
+        if self.verbose:
+            print(f"Connected to FPGA on {self.port} at {self.baudrate} baud")
+        return True
+
+    async def disconnect(self):
+        """Detach from the event loop and close the serial port."""
+        if self._fd is not None:
+            self._loop.remove_reader(self._fd)
+            if self._writing:
+                self._loop.remove_writer(self._fd)
+            self._fail_pending()
+            self._fd = None
+        if self.serial and self.serial.is_open:
+            self.serial.close()
+            if self.verbose:
+                print("Disconnected from FPGA")
+
+    # ------------------------------------------------------------------
+    # Event loop callbacks
+    # ------------------------------------------------------------------
+    def _on_readable(self):
+        """Decode received bytes and resolve completed requests."""
+        try:
+            self.rx_decoder.fill(self._fd)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            print(f"Read error: {e}")
+            self._fail_pending()
+            return
+        unsolicited = self.rx_decoder.stats['unsolicited_bytes']
+        self.rx_decoder.decode()
+        if self.rx_decoder.stats['unsolicited_bytes'] != unsolicited:
+            self._last_rx = self._loop.time()
+        self._dispatch()
+
+    def _dispatch(self):
+        """Resolve completed replies in FIFO order."""
+        decoder = self.rx_decoder
+        while True:
+            data = decoder.take()
+            if data is None:
+                break
+            request = self._pending.popleft()
+            if request.block:
+                self._block_gate.set()
+            if not request.future.done():
+                request.future.set_result(bytes(data))
+
+        if decoder.head_complete and self._settle_handle is None:
+            # Give an over-long block reply time to finish (correct data is
+            # at the end); nothing else is in flight behind it
+            self._settle_handle = self._loop.call_later(self.block_overrun_settle, self._complete_block)
+        if decoder.waiting and self._lookahead_handle is None:
+            # A reply byte that may start a debug frame: classify once the
+            # rest of a frame would have arrived
+            lookahead = len(DEBUG_PREFIX) * BITS_PER_BYTE / self.baudrate + self.rx_lookahead
+            self._lookahead_handle = self._loop.call_later(lookahead, self._resolve_lookahead)
+
+    def _resolve_lookahead(self):
+        self._lookahead_handle = None
+        if self.rx_decoder.waiting:
+            self.rx_decoder.decode(final=True)
+            self._dispatch()
+
+    def _complete_block(self):
+        """Finish the block read at the head of the FIFO with the last bytes received."""
+        self._settle_handle = None
+        self.rx_decoder.decode(final=True)
+        self.rx_decoder.close()
+        self._dispatch()
+
+    def _on_writable(self):
+        """Continue sending buffered command bytes."""
+        self._flush_tx()
+
+    def _flush_tx(self):
+        """Write as much of the TX buffer as the fd accepts."""
+        try:
+            while self._tx:
+                sent = os.write(self._fd, self._tx)
+                del self._tx[:sent]
+        except BlockingIOError:
+            pass
+        except OSError as e:
+            print(f"Write error: {e}")
+            self._tx.clear()
+            self._fail_pending()
+        if self._tx and not self._writing:
+            self._loop.add_writer(self._fd, self._on_writable)
+            self._writing = True
+        elif not self._tx and self._writing:
+            self._loop.remove_writer(self._fd)
+            self._writing = False
+
+    def _fail_pending(self):
+        """Fail all outstanding requests; the reply stream can no longer be trusted."""
+        for handle in (self._settle_handle, self._lookahead_handle):
+            if handle is not None:
+                handle.cancel()
+        self._settle_handle = self._lookahead_handle = None
+        while self._pending:
+            request = self._pending.popleft()
+            if not request.future.done():
+                request.future.set_result(None)
+        self.rx_decoder.reset()
+        if self._block_gate is not None:
+            self._block_gate.set()
+
+    # ------------------------------------------------------------------
+    # Request handling
+    # ------------------------------------------------------------------
+    async def _send(self, cmd: bytes, reply_length: int = 0, block: bool = False) -> Optional[asyncio.Future]:
+        """
+        Queue command bytes behind any outstanding block read.
+
+        Returns:
+            Future for the reply bytes if reply_length > 0, else None
+        """
+        while self._resync or not self._block_gate.is_set():
+            if self._resync:
+                await self._wait_quiet()
+            else:
+                await self._block_gate.wait()
+
+        # No await between queueing the request and writing the command, so
+        # the FIFO order always matches the order on the wire
+        future = None
+        if reply_length:
+            future = self._loop.create_future()
+            self._pending.append(_Request(future, block))
+            self.rx_decoder.expect(reply_length, keep_last=block)
+            self.stats['requests'] += 1
+            if block:
+                self._block_gate.clear()
+        self._tx += cmd
+        self._flush_tx()
+        return future
+
+    async def _wait_quiet(self):
+        """
+        Wait until no stray bytes were received for resync_quiet seconds.
+
+        Bytes arriving meanwhile have no request to go to and are counted as
+        unsolicited by the decoder; debug frames do not extend the wait.
+        """
+        while self._resync:
+            remaining = self._last_rx + self.resync_quiet - self._loop.time()
+            if remaining <= 0:
+                self.rx_decoder.reset()
+                self._resync = False
+                return
+            await asyncio.sleep(remaining)
+
+    async def _wait_reply(self, future: asyncio.Future, what: str) -> Optional[bytes]:
+        """Wait for a reply future with the request timeout."""
+        try:
+            data = await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError:
+            self.stats['timeouts'] += 1
+            print(f"{what} timeout")
+            self._fail_pending()
+            # A late reply may still arrive; let it pass before the next request
+            self._resync = True
+            self._last_rx = self._loop.time()
+            return None
+        return data
+
+    def _connected(self) -> bool:
+        if self._fd is None:
+            print("UART not connected")
+            return False
+        return True
+
+    async def write_register(self, address: int, data: int) -> bool:
+        """
+        Write single byte to register (no sleep; later commands see the write).
+
+        Args:
+            address: Register address (0-255)
+            data: Data byte to write (0-255)
+
+        Returns:
+            True if the command was queued, False otherwise
+        """
+        if not self._connected():
+            return False
+        await self._send(bytes([CMD_WRITE, address & 0xFF, data & 0xFF]))
+        return True
+
+    async def write_block(self, start_address: int, data: List[int]) -> bool:
+        """
+        Write block of bytes to consecutive registers.
+
+        Args:
+            start_address: Starting register address
+            data: List of data bytes to write (1-255)
+
+        Returns:
+            True if the command was queued, False otherwise
+        """
+        if not self._connected():
+            return False
+        if len(data) == 0 or len(data) > MAX_BLOCK_LENGTH:
+            print("Invalid block size (1-255 bytes)")
+            return False
+        cmd = bytes([CMD_BLOCK_WRITE, start_address & 0xFF, len(data)]) + bytes(d & 0xFF for d in data)
+        await self._send(cmd)
+        return True
+
+    async def read_register(self, address: int) -> Optional[int]:
+        """
+        Read single byte from register.
+
+        Args:
+            address: Register address (0-255)
+
+        Returns:
+            Data byte (0-255) if successful, None if error
+        """
+        if not self._connected():
+            return None
+        future = await self._send(bytes([CMD_READ, address & 0xFF]), 1)
+        data = await self._wait_reply(future, f"Read 0x{address & 0xFF:02X}")
+        return None if data is None else data[0]
+
+    async def read_many(self, addresses: List[int]) -> Optional[List[int]]:
+        """
+        Read several registers with pipelined single reads.
+
+        Args:
+            addresses: Register addresses (0-255)
+
+        Returns:
+            List of data bytes in the order of addresses, None if error
+        """
+        if not self._connected():
+            return None
+        if len(addresses) == 0:
+            return []
+        cmd = bytearray()
+        for address in addresses:
+            cmd += bytes([CMD_READ, address & 0xFF])
+        future = await self._send(bytes(cmd), len(addresses))
+        data = await self._wait_reply(future, f"Read of {len(addresses)} registers")
+        return None if data is None else list(data)
+
+    async def read_block(self, start_address: int, length: int) -> Optional[List[int]]:
+        """
+        Read block of bytes from consecutive registers.
+
+        Args:
+            start_address: Starting register address
+            length: Number of bytes to read (1-255)
+
+        Returns:
+            List of data bytes if successful, None if error
+        """
+        if not self._connected():
+            return None
+        if length == 0 or length > MAX_BLOCK_LENGTH:
+            print("Invalid block size (1-255 bytes)")
+            return None
+        future = await self._send(bytes([CMD_BLOCK_READ, start_address & 0xFF, length]), length, block=True)
+        data = await self._wait_reply(future, f"Block read 0x{start_address & 0xFF:02X}")
+        return None if data is None else list(data)
+
+    async def set_pwm_duty(self, duty_percent: float) -> bool:
+        """Set PWM duty cycle as percentage (0.0 - 100.0)."""
+        if not (0.0 <= duty_percent <= 100.0):
+            print("Duty cycle must be 0-100%")
+            return False
+        return await self.write_register(0x01, int((duty_percent / 100.0) * 255))
+
+    async def get_pwm_duty(self) -> Optional[float]:
+        """Get current PWM duty cycle as percentage."""
+        duty_value = await self.read_register(0x01)
+        if duty_value is not None:
+            return (duty_value / 255.0) * 100.0
+        return None
+
+    async def set_debug_leds(self, led_pattern: int) -> bool:
+        """Set 6-bit debug LED pattern (0-63)."""
+        if not (0 <= led_pattern <= 63):
+            print("LED pattern must be 0-63 (6 bits)")
+            return False
+        return await self.write_register(0x02, led_pattern)
+
+    async def get_debug_leds(self) -> Optional[int]:
+        """Get current debug LED pattern."""
+        return await self.read_register(0x02)
+
+
+async def _demo(port: str):
+    """Poll registers while ramping the PWM, all on one event loop."""
+    fpga = AsyncFPGAUartInterface(port=port)
+    if not await fpga.connect():
+        return
+
+    async def poll():
+        for _ in range(10):
+            values = await fpga.read_many([0x00, 0x01, 0x02])
+            print(f"Poll: {values}")
+            await asyncio.sleep(0.05)
+
+    async def ramp():
+        for duty in range(0, 101, 10):
+            await fpga.set_pwm_duty(float(duty))
+            await asyncio.sleep(0.05)
+
+    try:
+        await asyncio.gather(poll(), ramp(), fpga.read_block(0x00, 8))
+        print(f"Stats: {fpga.stats}")
+    finally:
+        await fpga.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(_demo(sys.argv[1] if len(sys.argv) > 1 else '/dev/ttyUSB1'))
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Board Fleet Controller
+Drives many boards (one FPGAUartInterface per serial port) in parallel:
+broadcast writes and configurations, gathered reads with per-board results
+and aggregate throughput statistics. A fleet operation takes about as long
+as the slowest board instead of the sum over all boards.
+
+Each board has its own single-thread worker, so operations on one board stay
+in order while boards run concurrently. Every fleet operation has a
+per-board timeout: a board that does not answer in time is reported as timed
+out without holding up the others, and is reported busy until its stuck
+operation returns.
+
+Usage:
+    with BoardFleet(['/dev/ttyUSB1', '/dev/ttyUSB3']) as fleet:
+        fleet.write_register(0x02, 0x15)
+        results = fleet.read_many([0x00, 0x01])
+        fleet.print_results(results)
+    python3 board_fleet.py /dev/ttyUSB1 /dev/ttyUSB3 /dev/ttyUSB5
+    python3 board_fleet.py --emulate 12
+"""
+
+import argparse
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+from fpga_uart_interface import FPGAUartInterface, WRITE_MODE_FENCED
+from register_config import apply_config, load_config
+from uart_stats import latency_summary
+
+DEFAULT_BOARD_TIMEOUT = 2.0
+
+
+class BoardResult(NamedTuple):
+    port: str
+    ok: bool
+    value: object           # Return value of the operation (None on error)
+    error: Optional[str]    # 'timeout', 'busy', 'offline' or exception text
+    elapsed: float          # Seconds on this board (timeout if it did not finish)
+
+
+class _Board:
+    """One port with its interface, worker and counters."""
+
+    def __init__(self, fpga: FPGAUartInterface):
+        self.fpga = fpga
+        self.worker = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"board-{fpga.port}")
+        self.online = False
+        self.pending = None     # Future of an operation that timed out
+        self.stats = {'ops': 0, 'errors': 0, 'timeouts': 0, 'busy_time': 0.0}
+
+
+class BoardFleet:
+    """Parallel controller for FPGAUartInterfaces on many ports."""
+
+    def __init__(self, ports: List[str], baudrate: Optional[int] = None,
+                 timeout: float = DEFAULT_BOARD_TIMEOUT, write_mode: str = WRITE_MODE_FENCED,
+                 register_file: Optional[str] = None):
+        """
+        Args:
+            ports: Serial ports, one board each
+            baudrate: UART baud rate (default: saved link profile per port or 115200)
+            timeout: Per-board timeout of fleet operations in seconds
+            write_mode: Write completion strategy of every interface
+            register_file: JSON register database (default: repo register map)
+        """
+        self.timeout = timeout
+        self.boards = {port: _Board(FPGAUartInterface(port=port, baudrate=baudrate, verbose=False,
+                                                      write_mode=write_mode, register_file=register_file))
+                       for port in ports}
+        self._op_times = []     # Wall time per fleet operation
+        self._board_time = 0.0  # Sum of per-board times
+        self._started = time.perf_counter()
+
+    @property
+    def online(self) -> List[str]:
+        """Ports of connected boards."""
+        return [port for port, board in self.boards.items() if board.online]
+
+    def connect(self) -> Dict[str, bool]:
+        """
+        Connect all boards in parallel.
+
+        Returns:
+            Dictionary port -> connected
+        """
+        results = self.run(lambda fpga: fpga.connect(), ports=list(self.boards), require_online=False)
+        for port, result in results.items():
+            self.boards[port].online = result.ok
+        return {port: result.ok for port, result in results.items()}
+
+    def close(self):
+        """Disconnect all boards and stop the workers (stuck operations are abandoned)."""
+        self.run(lambda fpga: fpga.disconnect() or True, ports=self.online)
+        for board in self.boards.values():
+            board.online = False
+            board.worker.shutdown(wait=False)
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def run(self, operation: Callable[[FPGAUartInterface], object], ports: Optional[List[str]] = None,
+            timeout: Optional[float] = None, require_online: bool = True) -> Dict[str, BoardResult]:
+        """
+        Run an operation on several boards at once.
+
+        Args:
+            operation: Called with each board's FPGAUartInterface; None/False counts as error
+            ports: Boards to use (default: all online boards)
+            timeout: Per-board timeout (default: fleet timeout)
+            require_online: Skip boards that are not connected
+
+        Returns:
+            Dictionary port -> BoardResult, in the order of ports
+        """
+        ports = self.online if ports is None else ports
+        timeout = self.timeout if timeout is None else timeout
+        begin = time.perf_counter()
+
+        results = {}
+        futures = {}
+        for port in ports:
+            board = self.boards[port]
+            if require_online and not board.online:
+                results[port] = BoardResult(port, False, None, 'offline', 0.0)
+            elif board.pending is not None and not board.pending.done():
+                results[port] = BoardResult(port, False, None, 'busy', 0.0)
+            else:
+                board.pending = None
+                futures[port] = board.worker.submit(self._timed, operation, board.fpga)
+
+        wait(futures.values(), timeout=timeout)
+        for port, future in futures.items():
+            board = self.boards[port]
+            board.stats['ops'] += 1
+            if not future.done():
+                board.pending = future
+                board.stats['timeouts'] += 1
+                board.stats['busy_time'] += timeout
+                results[port] = BoardResult(port, False, None, 'timeout', timeout)
+                continue
+            try:
+                value, elapsed = future.result()
+                ok = value is not None and value is not False
+                results[port] = BoardResult(port, ok, value, None if ok else 'failed', elapsed)
+            except Exception as e:
+                elapsed = time.perf_counter() - begin
+                results[port] = BoardResult(port, False, None, str(e) or type(e).__name__, elapsed)
+            board.stats['busy_time'] += results[port].elapsed
+            if not results[port].ok:
+                board.stats['errors'] += 1
+
+        self._op_times.append(time.perf_counter() - begin)
+        self._board_time += sum(r.elapsed for r in results.values())
+        return {port: results[port] for port in ports}
+
+    @staticmethod
+    def _timed(operation: Callable[[FPGAUartInterface], object], fpga: FPGAUartInterface):
+        start = time.perf_counter()
+        value = operation(fpga)
+        return value, time.perf_counter() - start
+
+    # Broadcast writes
+
+    def write_register(self, address: int, data: int, **kwargs) -> Dict[str, BoardResult]:
+        """Write one register on every board."""
+        return self.run(lambda fpga: fpga.write_register(address, data), **kwargs)
+
+    def write_block(self, start_address: int, data: List[int], **kwargs) -> Dict[str, BoardResult]:
+        """Block write on every board."""
+        return self.run(lambda fpga: fpga.write_block(start_address, data), **kwargs)
+
+    def write_coalesced(self, writes: Dict[int, int], **kwargs) -> Dict[str, BoardResult]:
+        """Write a set of registers on every board."""
+        return self.run(lambda fpga: fpga.write_coalesced(writes), **kwargs)
+
+    def apply_config(self, path: str, dry_run: bool = False, **kwargs) -> Dict[str, BoardResult]:
+        """
+        Apply a configuration file to every board (see register_config.py).
+
+        The file is loaded once; each result value is that board's report.
+        """
+        try:
+            values = load_config(path)
+        except (OSError, ValueError) as e:
+            print(f"Cannot load {path}: {e}")
+            return {}
+        return self.run(lambda fpga: apply_config(fpga, values, dry_run), **kwargs)
+
+    # Gathered reads
+
+    def read_register(self, address: int, **kwargs) -> Dict[str, BoardResult]:
+        """Read one register from every board."""
+        return self.run(lambda fpga: fpga.read_register(address), **kwargs)
+
+    def read_many(self, addresses: List[int], **kwargs) -> Dict[str, BoardResult]:
+        """Read several registers from every board (values in the order of addresses)."""
+        return self.run(lambda fpga: fpga.read_planned(addresses), **kwargs)
+
+    def read_range(self, start_addr: int, end_addr: int, **kwargs) -> Dict[str, BoardResult]:
+        """Read an address range from every board."""
+        return self.run(lambda fpga: fpga.read_range(start_addr, end_addr), **kwargs)
+
+    # Statistics
+
+    def stats(self) -> Dict:
+        """
+        Aggregate statistics of all fleet operations so far.
+
+        Returns:
+            Dict with operation counts, fleet op latency (ms), board ops/s and
+            parallel speedup (sum of board times / fleet wall time)
+        """
+        wall = sum(self._op_times)
+        board_ops = sum(board.stats['ops'] for board in self.boards.values())
+        return {
+            'boards': len(self.boards),
+            'online': len(self.online),
+            'fleet_ops': len(self._op_times),
+            'board_ops': board_ops,
+            'errors': sum(board.stats['errors'] for board in self.boards.values()),
+            'timeouts': sum(board.stats['timeouts'] for board in self.boards.values()),
+            'fleet_op_ms': latency_summary(self._op_times),
+            'board_ops_per_s': round(board_ops / wall, 1) if wall > 0 else 0.0,
+            'speedup': round(self._board_time / wall, 2) if wall > 0 else 0.0,
+            'per_board': {port: dict(board.stats) for port, board in self.boards.items()},
+        }
+
+    @staticmethod
+    def print_results(results: Dict[str, BoardResult]):
+        """One line per board."""
+        for port, result in results.items():
+            if result.ok:
+                value = result.value
+                if isinstance(value, list):
+                    value = ' '.join(f"{v:02X}" for v in value)
+                elif isinstance(value, int) and not isinstance(value, bool):
+                    value = f"0x{value:02X}"
+                print(f"  {port:<16} OK     {result.elapsed * 1000:8.2f} ms  {value}")
+            else:
+                print(f"  {port:<16} {result.error.upper():<6} {result.elapsed * 1000:8.2f} ms")
+
+    def print_stats(self):
+        s = self.stats()
+        lat = s['fleet_op_ms']
+        print(f"{s['online']}/{s['boards']} boards online, {s['fleet_ops']} fleet ops, {s['board_ops']} board ops, "
+              f"{s['errors']} errors ({s['timeouts']} timeouts)")
+        print(f"Fleet op p50 {lat['p50'] or 0:.2f} ms, p99 {lat['p99'] or 0:.2f} ms; "
+              f"{s['board_ops_per_s']:.1f} board ops/s, parallel speedup {s['speedup']:.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Read and write registers on many boards in parallel')
+    parser.add_argument('ports', nargs='*', help='Serial ports, one board each')
+    parser.add_argument('-b', '--baud', type=int, help='Baud rate (default: saved link profile or 115200)')
+    parser.add_argument('-t', '--timeout', type=float, default=DEFAULT_BOARD_TIMEOUT,
+                        help=f'Per-board timeout in seconds (default: {DEFAULT_BOARD_TIMEOUT})')
+    parser.add_argument('--config', help='Apply this JSON/TOML configuration to every board')
+    parser.add_argument('-n', '--iterations', type=int, default=20, help='Gathered reads to time (default: 20)')
+    parser.add_argument('--emulate', type=int, metavar='N', help='Run against N fpga_emulator.py boards')
+    args = parser.parse_args()
+
+    emulators = []
+    ports = args.ports
+    if args.emulate:
+        from fpga_emulator import FPGAEmulator
+        emulators = [FPGAEmulator(baudrate=args.baud or 115200) for _ in range(args.emulate)]
+        ports = [emulator.start() for emulator in emulators]
+    if not ports:
+        parser.error("no ports given")
+
+    try:
+        with BoardFleet(ports, baudrate=args.baud, timeout=args.timeout) as fleet:
+            print(f"Fleet: {len(fleet.online)}/{len(ports)} boards connected")
+            for port in ports:
+                if port not in fleet.online:
+                    print(f"  {port:<16} OFFLINE")
+            if not fleet.online:
+                sys.exit(1)
+
+            if args.config:
+                print(f"\nApplying {args.config}:")
+                fleet.print_results({port: r._replace(value=f"{len(r.value['registers'])} registers written")
+                                     if r.ok else r for port, r in fleet.apply_config(args.config).items()})
+
+            print("\nsys_cfg / pwm_duty / debug_led:")
+            fleet.print_results(fleet.read_many([0x00, 0x01, 0x02]))
+            for _ in range(args.iterations):
+                fleet.read_many([0x00, 0x01, 0x02, 0x40])
+            print()
+            fleet.print_stats()
+    finally:
+        for emulator in emulators:
+            emulator.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -5,19 +5,207 @@ Monitors UART output for debug messages from the FPGA.
 Press Button S2 on the FPGA to trigger debug sequence.
 
 Debug sequence expected: "DBG: " followed by bytes 0x00-0x0F and newline
+
+Frames are found incrementally as bytes arrive, so the monitor keeps up with
+continuous debug traffic at full baud rate. Decoded frames can be captured to
+a CSV or binary file by a background writer thread; bytes outside valid
+frames are counted as dropped.
+
+Binary capture records: timestamp f64 (seconds since epoch) + 16 payload bytes.
+
+Usage:
+    python3 debug_monitor.py /dev/ttyUSB1
+    python3 debug_monitor.py /dev/ttyUSB1 115200 -q -o capture.csv
 """
 
+import argparse
+import queue
 import serial
-import time
+import struct
 import sys
+import threading
+import time
+from typing import List, Optional
+
+from rx_decoder import DEBUG_FRAME_END, DEBUG_PAYLOAD_BYTES, DEBUG_PREFIX
+
+EXPECTED_PAYLOAD = bytes(range(DEBUG_PAYLOAD_BYTES))
+CAPTURE_RECORD = struct.Struct(f'<d{DEBUG_PAYLOAD_BYTES}s')
+
+# Parser states
+_HUNT = 0       # Looking for the 'D' of the prefix
+_PREFIX = 1     # Inside "DBG: "
+_PAYLOAD = 2    # Collecting the 16 data bytes
+_END = 3        # Expecting CR LF
+
+_PREFIX_START = DEBUG_PREFIX[:1]
+
+
+class DebugFrameParser:
+    """Incremental "DBG: " frame parser (state machine, no rescanning)."""
+
+    def __init__(self):
+        self._state = _HUNT
+        self._matched = 0
+        self._payload = bytearray()
+        self.stats = {'bytes': 0, 'frames': 0, 'bad_frames': 0, 'sequence_errors': 0,
+                      'dropped_bytes': 0}
+
+    def feed(self, data: bytes) -> List[bytes]:
+        """
+        Parse received bytes.
+
+        Args:
+            data: Bytes in arrival order (any chunking)
+
+        Returns:
+            Payloads of the frames completed by these bytes
+        """
+        frames = []
+        stats = self.stats
+        stats['bytes'] += len(data)
+        pos = 0
+        end = len(data)
+        while pos < end:
+            state = self._state
+
+            if state == _HUNT:
+                start = data.find(_PREFIX_START, pos)
+                if start < 0:
+                    stats['dropped_bytes'] += end - pos
+                    break
+                stats['dropped_bytes'] += start - pos
+                self._state = _PREFIX
+                self._matched = 1
+                pos = start + 1
+
+            elif state == _PREFIX:
+                if data[pos] == DEBUG_PREFIX[self._matched]:
+                    self._matched += 1
+                    pos += 1
+                    if self._matched == len(DEBUG_PREFIX):
+                        self._state = _PAYLOAD
+                        self._payload.clear()
+                else:
+                    # Partial prefix was noise; rescan from this byte
+                    stats['dropped_bytes'] += self._matched
+                    self._state = _HUNT
+
+            elif state == _PAYLOAD:
+                n = min(DEBUG_PAYLOAD_BYTES - len(self._payload), end - pos)
+                self._payload += data[pos:pos + n]
+                pos += n
+                if len(self._payload) == DEBUG_PAYLOAD_BYTES:
+                    self._state = _END
+                    self._matched = 0
 
-def monitor_debug_output(port='/dev/ttyUSB0', baudrate=115200):
-    """Monitor UART for debug output from FPGA."""
+            else:
+                if data[pos] == DEBUG_FRAME_END[self._matched]:
+                    self._matched += 1
+                    pos += 1
+                    if self._matched == len(DEBUG_FRAME_END):
+                        payload = bytes(self._payload)
+                        stats['frames'] += 1
+                        if payload != EXPECTED_PAYLOAD:
+                            stats['sequence_errors'] += 1
+                        frames.append(payload)
+                        self._state = _HUNT
+                else:
+                    # Missing terminator: drop the frame, the byte may start the next one
+                    stats['bad_frames'] += 1
+                    stats['dropped_bytes'] += len(DEBUG_PREFIX) + DEBUG_PAYLOAD_BYTES + self._matched
+                    self._state = _HUNT
+        return frames
+
+
+class FrameSink:
+    """Writes decoded frames to a CSV or binary file on a background thread."""
+
+    def __init__(self, path: str, binary: bool = False, max_queue: int = 100000):
+        """
+        Args:
+            path: Capture file (overwritten)
+            binary: Fixed-size binary records instead of CSV
+            max_queue: Frames buffered before new ones are dropped
+        """
+        self.path = path
+        self.binary = binary
+        self.dropped = 0
+        self.written = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._file = open(path, 'wb' if binary else 'w')
+        if not binary:
+            self._file.write('timestamp,' + ','.join(f'b{i}' for i in range(DEBUG_PAYLOAD_BYTES)) + '\n')
+        self._thread = threading.Thread(target=self._run, name='frame-sink', daemon=True)
+        self._thread.start()
+
+    def put(self, timestamp: float, frames: List[bytes]):
+        """Queue frames received at timestamp (never blocks the reader)."""
+        try:
+            self._queue.put_nowait((timestamp, frames))
+        except queue.Full:
+            self.dropped += len(frames)
+
+    @property
+    def backlog(self) -> int:
+        return self._queue.qsize()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            timestamp, frames = item
+            if self.binary:
+                self._file.write(b''.join(CAPTURE_RECORD.pack(timestamp, f) for f in frames))
+            else:
+                self._file.write(''.join(f"{timestamp:.6f}," + ','.join(str(b) for b in f) + '\n'
+                                         for f in frames))
+            self.written += len(frames)
+
+    def close(self):
+        """Write out queued frames and close the file."""
+        self._queue.put(None)
+        self._thread.join()
+        self._file.close()
+
+
+def print_frame(timestamp: float, payload: bytes):
+    status = '✓' if payload == EXPECTED_PAYLOAD else '⚠'
+    print(f"[{time.strftime('%H:%M:%S', time.localtime(timestamp))}] {status} DBG: {payload.hex(' ').upper()}")
+
+
+def print_summary(parser: DebugFrameParser, elapsed: float, interval_frames: int, interval: float,
+                  sink: Optional[FrameSink]):
+    s = parser.stats
+    line = (f"[{time.strftime('%H:%M:%S')}] {interval_frames / interval:7.1f} frames/s  "
+            f"total {s['frames']} frames, {s['bytes']} bytes in {elapsed:.0f}s  "
+            f"dropped {s['dropped_bytes']} bytes  bad {s['bad_frames']}  seq err {s['sequence_errors']}")
+    if sink:
+        line += f"  sink backlog {sink.backlog}, lost {sink.dropped}"
+    print(line)
+
+
+def monitor_debug_output(port='/dev/ttyUSB0', baudrate=115200, quiet=False, output=None,
+                         binary=False, interval=5.0):
+    """
+    Monitor UART for debug output from FPGA.
+
+    Args:
+        port: Serial port
+        baudrate: Baud rate
+        quiet: Print only periodic summaries, not every frame
+        output: Capture file for decoded frames
+        binary: Binary instead of CSV capture
+        interval: Seconds between summaries
+    """
 
     print(f"FPGA Debug Monitor")
     print(f"==================")
     print(f"Port: {port}")
     print(f"Baud: {baudrate}")
+    if output:
+        print(f"Capture: {output} ({'binary' if binary else 'CSV'})")
     print()
     print("Instructions:")
     print("1. Make sure FPGA is programmed and running")
@@ -27,6 +215,9 @@ def monitor_debug_output(port='/dev/ttyUSB0', baudrate=115200):
     print("Waiting for debug data...")
     print("-" * 40)
 
+    parser = DebugFrameParser()
+    sink = None
+    start = time.time()
     try:
         # Open serial port
         ser = serial.Serial(
@@ -35,83 +226,35 @@ def monitor_debug_output(port='/dev/ttyUSB0', baudrate=115200):
             bytesize=serial.EIGHTBITS,
             parity=serial.PARITY_NONE,
             stopbits=serial.STOPBITS_ONE,
-            timeout=0.1  # Non-blocking read
+            timeout=0.1,  # Bounds the wait when the line is idle
+            exclusive=True
         )
 
         # Clear any existing data
         ser.reset_input_buffer()
+        if output:
+            sink = FrameSink(output, binary)
 
-        received_data = bytearray()
-        last_activity = time.time()
-
+        next_summary = start + interval
+        summary_frames = 0
         while True:
-            # Read available data
-            if ser.in_waiting > 0:
-                data = ser.read(ser.in_waiting)
-                received_data.extend(data)
-                last_activity = time.time()
-
-                # Display raw bytes
-                for byte in data:
-                    if 32 <= byte <= 126:  # Printable ASCII
-                        char = chr(byte)
-                        print(f"RX: 0x{byte:02X} '{char}'")
-                    else:
-                        print(f"RX: 0x{byte:02X} [non-printable]")
-
-                # Check for complete debug sequence
-                data_str = received_data.decode('ascii', errors='ignore')
-                if 'DBG:' in data_str:
-                    print()
-                    print("✓ Debug sequence detected!")
-
-                    # Find the debug sequence
-                    dbg_start = data_str.find('DBG:')
-                    if dbg_start >= 0:
-                        debug_part = data_str[dbg_start:]
-                        print(f"Debug message: '{debug_part.strip()}'")
-
-                        # Show hex dump of the sequence
-                        hex_bytes = []
-                        for i in range(dbg_start, len(received_data)):
-                            if i < len(received_data):
-                                hex_bytes.append(f"0x{received_data[i]:02X}")
-
-                        if hex_bytes:
-                            print(f"Hex bytes: {' '.join(hex_bytes)}")
-
-                        # Analyze the data bytes after "DBG: "
-                        dbg_data_start = dbg_start + 5  # Skip "DBG: "
-                        if len(received_data) > dbg_data_start:
-                            data_bytes = received_data[dbg_data_start:]
-                            print(f"Data portion: {' '.join(f'0x{b:02X}' for b in data_bytes)}")
-
-                            # Check if it's the expected sequence 0x00-0x0F
-                            expected = list(range(16))
-                            actual = []
-                            for b in data_bytes:
-                                if b < 16:  # Only count bytes 0x00-0x0F
-                                    actual.append(b)
-                                elif b == 0x0D or b == 0x0A:  # CR/LF
-                                    break
-
-                            if actual == expected:
-                                print("✓ Complete sequence 0x00-0x0F received correctly!")
-                            else:
-                                print(f"⚠ Expected 0x00-0x0F, got: {[f'0x{b:02X}' for b in actual]}")
-
-                    print()
-                    print("Clearing buffer, waiting for next debug sequence...")
-                    print("-" * 40)
-                    received_data.clear()
-
-            # Show periodic status
-            if time.time() - last_activity > 5.0:
-                print(f"[{time.strftime('%H:%M:%S')}] Still listening... (press Button S2 on FPGA)")
-                last_activity = time.time()
-
-            # Brief sleep to prevent CPU spinning
-            time.sleep(0.01)
+            # Blocks until data arrives or the timeout expires, no polling sleep
+            data = ser.read(ser.in_waiting or 1)
+            now = time.time()
+            if data:
+                frames = parser.feed(data)
+                if frames:
+                    summary_frames += len(frames)
+                    if sink:
+                        sink.put(now, frames)
+                    if not quiet:
+                        for payload in frames:
+                            print_frame(now, payload)
+
+            if now >= next_summary:
+                print_summary(parser, now - start, summary_frames, interval + now - next_summary, sink)
+                summary_frames = 0
+                next_summary = now + interval
 
     except serial.SerialException as e:
         print(f"Serial port error: {e}")
@@ -123,20 +266,27 @@ def monitor_debug_output(port='/dev/ttyUSB0', baudrate=115200):
     finally:
         if 'ser' in locals() and ser.is_open:
             ser.close()
+        if sink:
+            sink.close()
+            print(f"Wrote {sink.written} frames to {sink.path}")
+        s = parser.stats
+        elapsed = time.time() - start
+        print(f"{s['frames']} frames ({s['frames'] / elapsed:.1f}/s), {s['bytes']} bytes, "
+              f"{s['dropped_bytes']} dropped, {s['bad_frames']} bad frames, "
+              f"{s['sequence_errors']} sequence errors")
 
 def main():
-    if len(sys.argv) > 1:
-        port = sys.argv[1]
-    else:
-        port = '/dev/ttyUSB0'
-
-    if len(sys.argv) > 2:
-        baudrate = int(sys.argv[2])
-    else:
-        baudrate = 115200
+    parser = argparse.ArgumentParser(description='Monitor FPGA debug frames')
+    parser.add_argument('port', nargs='?', default='/dev/ttyUSB0', help='Serial port (default: /dev/ttyUSB0)')
+    parser.add_argument('baudrate', nargs='?', type=int, default=115200, help='Baud rate (default: 115200)')
+    parser.add_argument('-q', '--quiet', action='store_true', help='Print only periodic summaries')
+    parser.add_argument('-o', '--output', help='Capture decoded frames to a file')
+    parser.add_argument('--binary', action='store_true', help='Binary capture instead of CSV')
+    parser.add_argument('--interval', type=float, default=5.0, help='Seconds between summaries (default: 5)')
+    args = parser.parse_args()
 
-    success = monitor_debug_output(port, baudrate)
+    success = monitor_debug_output(args.port, args.baudrate, args.quiet, args.output, args.binary, args.interval)
     return 0 if success else 1
 
 if __name__ == "__main__":
-    sys.exit(main())
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+FPGA UART Protocol Benchmark
+Repeatable timing of every FPGAUartInterface operation: single register
+write/read, block write/read at lengths 1-255, the set_sys_cfg_bits
+read-modify-write and a full dump_registers. For each case it reports ops/s,
+payload bytes/s, p50/p95/p99 latency and the overhead ratio of the median
+against the theoretical wire time of the protocol bytes (10 bits per byte).
+
+Runs against a real port or, with --emulate, against fpga_emulator.py on a
+local pty. Results can be saved as JSON (with the git commit of the tree)
+and compared against an earlier run.
+
+The register contents are saved before and restored after the run.
+
+Usage:
+    python3 fpga_benchmark.py /dev/ttyUSB1 -o results.json
+    python3 fpga_benchmark.py --emulate --compare results.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+from fpga_emulator import FPGAEmulator
+from fpga_uart_interface import (BITS_PER_BYTE, BLOCK_READ_CMD_BYTES, BLOCK_WRITE_HEADER_BYTES,
+                                 FPGAUartInterface, READ_CMD_BYTES, WRITE_CMD_BYTES,
+                                 WRITE_MODE_FENCED, WRITE_MODE_SLEEP)
+from uart_stats import latency_summary
+
+DEFAULT_LENGTHS = [1, 2, 4, 8, 16, 32, 64, 128, 255]
+
+
+class BenchmarkCase:
+    """One timed operation with its protocol byte counts."""
+
+    def __init__(self, name: str, operation: Callable[[], object], tx_bytes: int, rx_bytes: int,
+                 payload_bytes: int):
+        """
+        Args:
+            name: Case name in reports
+            operation: Callable doing one operation; False/None counts as error
+            tx_bytes: Command bytes sent per operation
+            rx_bytes: Reply bytes received per operation
+            payload_bytes: Register bytes transferred per operation
+        """
+        self.name = name
+        self.operation = operation
+        self.tx_bytes = tx_bytes
+        self.rx_bytes = rx_bytes
+        self.payload_bytes = payload_bytes
+
+    def wire_time(self, baudrate: int) -> float:
+        """Theoretical time of the protocol bytes on the wire."""
+        return (self.tx_bytes + self.rx_bytes) * BITS_PER_BYTE / baudrate
+
+    def run(self, iterations: int, baudrate: int) -> Dict:
+        """Time the operation and summarize."""
+        latencies = []
+        errors = 0
+        begin = time.perf_counter()
+        for _ in range(iterations):
+            start = time.perf_counter()
+            result = self.operation()
+            latencies.append(time.perf_counter() - start)
+            if result is None or result is False:
+                errors += 1
+        total = time.perf_counter() - begin
+
+        latency = latency_summary(latencies)
+        wire_ms = self.wire_time(baudrate) * 1000.0
+        return {
+            'name': self.name,
+            'iterations': iterations,
+            'errors': errors,
+            'ops_per_s': round(iterations / total, 1),
+            'bytes_per_s': round(iterations * self.payload_bytes / total, 1),
+            'latency_ms': latency,
+            'wire_ms': round(wire_ms, 4),
+            'overhead': round(latency['p50'] / wire_ms, 2) if wire_ms else None,
+        }
+
+
+def build_cases(fpga: FPGAUartInterface, lengths: List[int]) -> List[BenchmarkCase]:
+    """Benchmark cases for an interface in its write mode."""
+    # A fenced write carries an extra 'R' and its reply byte
+    fence_tx = READ_CMD_BYTES if fpga.write_mode == WRITE_MODE_FENCED else 0
+    fence_rx = 1 if fpga.write_mode == WRITE_MODE_FENCED else 0
+    pattern = bytes(range(256))
+
+    cases = [
+        BenchmarkCase('write_register', lambda: fpga.write_register(0x02, 0x15),
+                      WRITE_CMD_BYTES + fence_tx, fence_rx, 1),
+        BenchmarkCase('read_register', lambda: fpga.read_register(0x01), READ_CMD_BYTES, 1, 1),
+    ]
+    for length in lengths:
+        # Block writes end at 0xFF so short ones only touch unmapped addresses
+        start = 0x100 - length
+        data = list(pattern[:length])
+        cases.append(BenchmarkCase(f'write_block[{length}]',
+                                   lambda start=start, data=data: fpga.write_block(start, data),
+                                   BLOCK_WRITE_HEADER_BYTES + length + fence_tx, fence_rx, length))
+    for length in lengths:
+        cases.append(BenchmarkCase(f'read_block[{length}]',
+                                   lambda length=length: fpga.read_block(0x00, length),
+                                   BLOCK_READ_CMD_BYTES, length, length))
+    cases.append(BenchmarkCase('set_sys_cfg_bits', lambda: fpga.set_sys_cfg_bits(enable_stuf=True),
+                               READ_CMD_BYTES + WRITE_CMD_BYTES + fence_tx, 1 + fence_rx, 1))
+
+    def dump():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return fpga.dump_registers(0x00, 0xFF)
+
+    cases.append(BenchmarkCase('dump_registers', dump, 2 * BLOCK_READ_CMD_BYTES, 256, 256))
+    return cases
+
+
+def git_commit() -> Optional[str]:
+    """Commit of the source tree ('+dirty' with local changes), None outside git."""
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=cwd, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=cwd,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ('+dirty' if dirty else '')
+
+
+def run_benchmark(fpga: FPGAUartInterface, iterations: int, lengths: List[int]) -> List[Dict]:
+    """Run all cases, restoring the writable registers afterwards."""
+    snapshot = fpga.read_range(0x00, 0xFF)
+    results = []
+    try:
+        for case in build_cases(fpga, lengths):
+            result = case.run(iterations, fpga.baudrate)
+            results.append(result)
+            print_result(result)
+    finally:
+        if snapshot is not None:
+            writable = fpga.regmap.writable
+            fpga.write_coalesced({a: snapshot[a] for a in range(256) if writable[a]})
+    return results
+
+
+def print_header():
+    print(f"{'Case':<18} {'ops/s':>9} {'bytes/s':>10} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'p99 ms':>8} {'wire ms':>8} {'overhead':>8} {'err':>4}")
+    print("-" * 89)
+
+
+def print_result(r: Dict):
+    lat = r['latency_ms']
+    print(f"{r['name']:<18} {r['ops_per_s']:>9.1f} {r['bytes_per_s']:>10.1f} {lat['p50']:>8.3f} "
+          f"{lat['p95']:>8.3f} {lat['p99']:>8.3f} {r['wire_ms']:>8.3f} {r['overhead']:>7.1f}x "
+          f"{r['errors']:>4}")
+
+
+def print_comparison(results: List[Dict], baseline: Dict):
+    """Print p50 latency and throughput against a saved run."""
+    base = {r['name']: r for r in baseline.get('results', [])}
+    print(f"\nCompared with {baseline.get('commit') or 'baseline'} ({baseline.get('timestamp', '?')}):")
+    print(f"{'Case':<18} {'p50 ms':>8} {'base ms':>8} {'ratio':>7} {'ops/s':>9} {'base':>9}")
+    print("-" * 64)
+    for r in results:
+        b = base.get(r['name'])
+        if not b:
+            print(f"{r['name']:<18} {r['latency_ms']['p50']:>8.3f} {'-':>8}")
+            continue
+        ratio = r['latency_ms']['p50'] / b['latency_ms']['p50'] if b['latency_ms']['p50'] else 0.0
+        print(f"{r['name']:<18} {r['latency_ms']['p50']:>8.3f} {b['latency_ms']['p50']:>8.3f} "
+              f"{ratio:>6.2f}x {r['ops_per_s']:>9.1f} {b['ops_per_s']:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark FPGAUartInterface operations')
+    parser.add_argument('port', nargs='?', default='/dev/ttyUSB1', help='Serial port (default: /dev/ttyUSB1)')
+    parser.add_argument('--emulate', action='store_true', help='Run against fpga_emulator.py on a local pty')
+    parser.add_argument('--latency', type=float, default=0.0, help='Emulated reply latency in seconds')
+    parser.add_argument('-b', '--baud', type=int, help='Baud rate (default: saved link profile or 115200)')
+    parser.add_argument('-n', '--iterations', type=int, default=100, help='Operations per case (default: 100)')
+    parser.add_argument('--lengths', type=int, nargs='+', default=DEFAULT_LENGTHS,
+                        help='Block lengths to test (1-255)')
+    parser.add_argument('--write-mode', choices=[WRITE_MODE_SLEEP, WRITE_MODE_FENCED], default=WRITE_MODE_FENCED,
+                        help='Write completion strategy (default: fenced)')
+    parser.add_argument('-o', '--output', help='Save results as JSON')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare against')
+    args = parser.parse_args()
+
+    if any(not 1 <= length <= 255 for length in args.lengths):
+        parser.error("block lengths must be 1-255")
+
+    with contextlib.ExitStack() as stack:
+        port = args.port
+        if args.emulate:
+            emulator = stack.enter_context(FPGAEmulator(baudrate=args.baud or 115200, latency=args.latency))
+            port = emulator.port
+
+        fpga = FPGAUartInterface(port=port, baudrate=args.baud, verbose=False, write_mode=args.write_mode)
+        if not fpga.connect():
+            sys.exit(1)
+        stack.callback(fpga.disconnect)
+
+        print(f"Benchmark on {port}{' (emulated)' if args.emulate else ''} at {fpga.baudrate} baud, "
+              f"write mode {fpga.write_mode}, {args.iterations} iterations per case\n")
+        print_header()
+        results = run_benchmark(fpga, args.iterations, args.lengths)
+
+    report = {
+        'commit': git_commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'port': args.port if not args.emulate else 'emulator',
+        'emulated': args.emulate,
+        'baudrate': fpga.baudrate,
+        'write_mode': fpga.write_mode,
+        'iterations': args.iterations,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved results to {args.output}")
+
+    if args.compare:
+        try:
+            with open(args.compare) as f:
+                print_comparison(results, json.load(f))
+        except (OSError, ValueError) as e:
+            print(f"Cannot read {args.compare}: {e}")
+
+
+if __name__ == "__main__":
+    main()
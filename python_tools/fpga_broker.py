@@ -0,0 +1,546 @@
+#!/usr/bin/env python3
+"""
+FPGA Serial Broker
+Daemon that owns the FPGA serial port and serves register access to many
+local clients over a Unix socket, so debug_monitor.py, test scripts and
+production tools can run side by side.
+
+Clients send one JSON object per line and get one JSON reply per line:
+    {"id": 1, "op": "read_many", "args": [[0, 1, 2]]}
+    {"id": 1, "result": [2, 133, 170]}
+
+A single dispatcher thread executes requests in arrival order. Consecutive
+read requests from all clients are merged into one read_planned() call, so
+concurrent readers share pipelined 'R' bursts and block reads instead of
+taking turns at one round trip each. Writes are never reordered with reads.
+Per-client request counts and latencies are available with the 'stats' op.
+
+FPGABrokerClient is a drop-in replacement for FPGAUartInterface that talks
+to the broker instead of the serial port.
+
+Usage:
+    python3 fpga_broker.py /dev/ttyUSB1 &
+    python3 fpga_broker.py --stats
+
+    fpga = FPGABrokerClient()
+    fpga.connect()
+    fpga.set_pwm_duty(50.0)
+"""
+
+import argparse
+import json
+import os
+import queue
+import socket
+import socketserver
+import sys
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fpga_uart_interface import (FPGAUartInterface, MAX_BLOCK_LENGTH, WRITE_MODE_FENCED,
+                                 WRITE_MODE_SLEEP)
+from uart_stats import latency_summary
+
+DEFAULT_SOCKET = '/tmp/fpga_broker.sock'
+
+# Requests that only read registers and can be merged into one read_planned()
+READ_OPS = ('read_register', 'read_many', 'read_planned', 'read_block')
+WRITE_OPS = ('write_register', 'write_block', 'write_coalesced', 'write_verify', 'write_block_verify', 'burst')
+# Latency samples kept per client
+LATENCY_HISTORY = 1000
+
+
+class _Job:
+    """One client request waiting for the dispatcher."""
+
+    __slots__ = ('client', 'op', 'args', 'queued', 'done', 'result', 'error')
+
+    def __init__(self, client: 'ClientStats', op: str, args: list):
+        self.client = client
+        self.op = op
+        self.args = args
+        self.queued = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+    def addresses(self) -> List[int]:
+        """Register addresses read by this job (read ops only)."""
+        if self.op == 'read_register':
+            return [self.args[0] & 0xFF]
+        if self.op == 'read_block':
+            start, length = self.args
+            return [(start + n) & 0xFF for n in range(length)]
+        return [a & 0xFF for a in self.args[0]]
+
+
+def _is_int(value) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _is_int_list(value) -> bool:
+    return isinstance(value, list) and all(_is_int(v) for v in value)
+
+
+def validate_args(op: str, args) -> Optional[str]:
+    """
+    Check the arguments of a queued op before the dispatcher sees them.
+
+    Returns:
+        Error message, None if the arguments are valid
+    """
+    if not isinstance(args, list):
+        return "args must be a list"
+    if op == 'read_register':
+        ok = len(args) == 1 and _is_int(args[0])
+    elif op in ('read_many', 'read_planned'):
+        ok = len(args) == 1 and _is_int_list(args[0])
+    elif op == 'read_block':
+        ok = len(args) == 2 and _is_int(args[0]) and _is_int(args[1]) and 1 <= args[1] <= MAX_BLOCK_LENGTH
+    elif op == 'write_register':
+        ok = len(args) == 2 and _is_int(args[0]) and _is_int(args[1])
+    elif op in ('write_block', 'write_block_verify'):
+        ok = len(args) == 2 and _is_int(args[0]) and _is_int_list(args[1])
+    elif op in ('write_coalesced', 'write_verify'):
+        ok = len(args) == 1 and isinstance(args[0], list) and \
+            all(_is_int_list(pair) and len(pair) == 2 for pair in args[0])
+    elif op == 'burst':
+        ok = len(args) == 3 and _is_int_list(args[0]) and len(args[0]) > 0 and \
+            all(0 <= b <= 0xFF for b in args[0]) and _is_int(args[1]) and args[1] >= 0 and \
+            _is_int(args[2]) and 0 <= args[2] <= min(args[1], MAX_BLOCK_LENGTH)
+    elif op == 'measure_rtt':
+        ok = len(args) == 0 or (len(args) == 1 and _is_int(args[0]) and args[0] > 0)
+    else:
+        return f"Unknown op '{op}'"
+    return None if ok else f"Bad arguments for {op}: {json.dumps(args)}"
+
+
+class ClientStats:
+    """Request counters and latency history of one client connection."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.requests = 0
+        self.errors = 0
+        self.batched = 0     # Reads served as part of a merged burst
+        self.latencies = deque(maxlen=LATENCY_HISTORY)
+
+    def record(self, job: _Job, batch_size: int):
+        self.requests += 1
+        if job.error is not None:
+            self.errors += 1
+        if batch_size > 1:
+            self.batched += 1
+        self.latencies.append(time.perf_counter() - job.queued)
+
+    def summary(self) -> Dict:
+        latency = latency_summary(self.latencies)
+        return {'requests': self.requests, 'errors': self.errors, 'batched': self.batched,
+                'p50_ms': latency['p50'], 'p95_ms': latency['p95'], 'max_ms': latency['max']}
+
+
+class FPGABroker:
+    """Owns the FPGA interface and serializes requests from all clients."""
+
+    def __init__(self, fpga: FPGAUartInterface, socket_path: str = DEFAULT_SOCKET):
+        """
+        Args:
+            fpga: Connected interface used for all hardware access
+            socket_path: Unix socket to listen on
+        """
+        self.fpga = fpga
+        self.socket_path = socket_path
+        self.clients = {}         # Connection id -> ClientStats (including closed ones)
+        self._jobs = queue.Queue()
+        self._held = None         # Job taken from the queue that ends a read batch
+        self._server = None
+        self._next_client = 0
+        self._lock = threading.Lock()
+
+    def serve_forever(self):
+        """Listen on the socket and dispatch requests until shutdown()."""
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+
+        broker = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                broker._handle_client(self.rfile, self.wfile)
+
+        self._server = socketserver.ThreadingUnixStreamServer(self.socket_path, Handler)
+        self._server.daemon_threads = True
+        dispatcher = threading.Thread(target=self._dispatch_loop, daemon=True)
+        dispatcher.start()
+        print(f"FPGA broker on {self.fpga.port} listening at {self.socket_path}")
+        try:
+            self._server.serve_forever()
+        finally:
+            self._server.server_close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+
+    def shutdown(self):
+        """Stop serve_forever() (call from another thread)."""
+        if self._server:
+            self._server.shutdown()
+
+    def _handle_client(self, rfile, wfile):
+        """Read requests of one connection; each waits for its reply."""
+        with self._lock:
+            self._next_client += 1
+            client = ClientStats(f"client-{self._next_client}")
+            self.clients[self._next_client] = client
+
+        for line in rfile:
+            try:
+                request = json.loads(line)
+                op = request['op']
+                args = request.get('args', [])
+            except (ValueError, KeyError, TypeError) as e:
+                wfile.write(json.dumps({'error': f"Bad request: {e}"}).encode() + b'\n')
+                continue
+
+            if op == 'hello':
+                client.name = str(args[0]) if args else client.name
+                reply = {'result': True}
+            elif op == 'stats':
+                reply = {'result': self.stats()}
+            elif op in READ_OPS or op in WRITE_OPS or op == 'measure_rtt':
+                error = validate_args(op, args)
+                if error is not None:
+                    client.requests += 1
+                    client.errors += 1
+                    wfile.write(json.dumps({'error': error, 'id': request.get('id')}).encode() + b'\n')
+                    continue
+                job = _Job(client, op, args)
+                self._jobs.put(job)
+                job.done.wait()
+                reply = {'result': job.result} if job.error is None else {'error': job.error}
+            else:
+                reply = {'error': f"Unknown op '{op}'"}
+
+            reply['id'] = request.get('id')
+            wfile.write(json.dumps(reply).encode() + b'\n')
+
+    def stats(self) -> Dict[str, Dict]:
+        """Per-client statistics keyed by client name."""
+        return {client.name: client.summary() for client in self.clients.values()}
+
+    def _dispatch_loop(self):
+        """Execute jobs in order, merging runs of reads into one planned read."""
+        while True:
+            job = self._held or self._jobs.get()
+            self._held = None
+            if job.op not in READ_OPS:
+                self._execute(lambda: self._run(job), [job])
+                continue
+
+            batch = [job]
+            while True:
+                try:
+                    job = self._jobs.get_nowait()
+                except queue.Empty:
+                    break
+                if job.op not in READ_OPS:
+                    self._held = job
+                    break
+                batch.append(job)
+            self._execute(lambda: self._run_reads(batch), batch)
+
+    def _execute(self, run: Callable[[], None], batch: List[_Job]):
+        """Run a batch; any exception fails the batch instead of the dispatcher thread."""
+        try:
+            run()
+        except Exception as e:
+            for job in batch:
+                job.result = None
+                job.error = f"Broker error: {type(e).__name__}: {e}"
+        finally:
+            self._finish(batch)
+
+    def _run_reads(self, batch: List[_Job]):
+        """Serve all read jobs of a batch from one read_planned() call."""
+        valid = []
+        addresses = []
+        for job in batch:
+            try:
+                addresses.append(job.addresses())
+                valid.append(job)
+            except (ValueError, TypeError, IndexError, KeyError) as e:
+                # Only this client's request fails, the rest of the batch runs
+                job.error = f"Bad arguments: {e}"
+        if not valid:
+            return
+
+        values = self.fpga.read_planned([a for group in addresses for a in group])
+        offset = 0
+        for job, group in zip(valid, addresses):
+            if values is None:
+                job.error = "Read failed"
+                continue
+            data = values[offset:offset + len(group)]
+            offset += len(group)
+            job.result = data[0] if job.op == 'read_register' else data
+
+    def _run(self, job: _Job):
+        """Execute a single non-read job."""
+        try:
+            if job.op == 'write_coalesced':
+                job.result = self.fpga.write_coalesced({int(a): int(d) for a, d in job.args[0]})
+            elif job.op in ('write_verify', 'write_block_verify'):
+                if job.op == 'write_verify':
+                    mismatches = self.fpga.write_verify({int(a): int(d) for a, d in job.args[0]})
+                else:
+                    mismatches = self.fpga.write_block_verify(*job.args)
+                if mismatches is None:
+                    job.error = "Write not verified"
+                else:
+                    # JSON has no integer keys or tuples: [address, written, read back]
+                    job.result = [[a, w, r] for a, (w, r) in sorted(mismatches.items())]
+            elif job.op == 'burst':
+                response = self.fpga.burst(bytes(job.args[0]), job.args[1], job.args[2])
+                if response is None:
+                    job.error = "Burst failed"
+                else:
+                    job.result = list(response)
+            else:
+                job.result = getattr(self.fpga, job.op)(*job.args)
+        except (ValueError, TypeError, IndexError) as e:
+            job.error = f"Bad arguments: {e}"
+
+    def _finish(self, batch: List[_Job]):
+        for job in batch:
+            job.client.record(job, len(batch))
+            job.done.set()
+
+
+class FPGABrokerClient(FPGAUartInterface):
+    """
+    FPGAUartInterface that forwards register access to an FPGABroker.
+
+    All helpers (set_pwm_duty, fields, dump_registers, transaction, ...) work
+    unchanged. The local cache is disabled since other clients share the board.
+    """
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET, timeout: float = 5.0, verbose: bool = True,
+                 name: Optional[str] = None, register_file: Optional[str] = None):
+        """
+        Args:
+            socket_path: Broker Unix socket
+            timeout: Reply timeout in seconds
+            verbose: Whether to print connection messages
+            name: Client name shown in broker statistics (default: script name and pid)
+            register_file: JSON register database (default: repo register map)
+        """
+        super().__init__(port=socket_path, timeout=timeout, verbose=verbose,
+                         register_file=register_file)
+        self.socket_path = socket_path
+        self.name = name or f"{os.path.basename(sys.argv[0]) or 'python'}-{os.getpid()}"
+        self.sock = None
+        self._rfile = None
+        self._request_id = 0
+        self._call_lock = threading.Lock()
+        self._lost = False      # Connection dropped after an error, reopen on the next call
+
+    def connect(self) -> bool:
+        """
+        Connect to the broker.
+
+        Returns:
+            True if connection successful, False otherwise
+        """
+        try:
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.sock.settimeout(self.timeout)
+            self.sock.connect(self.socket_path)
+            self._rfile = self.sock.makefile('rb')
+        except OSError as e:
+            print(f"Failed to connect to broker at {self.socket_path}: {e}")
+            self.sock = None
+            return False
+        self._call('hello', self.name)
+        if self.verbose:
+            print(f"Connected to FPGA broker at {self.socket_path}")
+        return True
+
+    def disconnect(self):
+        """Close the broker connection."""
+        self._lost = False
+        if self.sock:
+            self._rfile.close()
+            self.sock.close()
+            self.sock = None
+            if self.verbose:
+                print("Disconnected from FPGA broker")
+
+    def set_cache(self, enabled: bool):
+        """The shadow cache is not available through the broker."""
+        if enabled:
+            print("Cache not supported by broker clients")
+
+    def _call(self, op: str, *args):
+        """
+        Send one request and wait for its reply; None on error.
+
+        Replies carrying another request id (late answers to a request that
+        timed out) are skipped. After a transport error the connection is
+        closed and reopened by the next call, so a late reply can never be
+        taken as the answer to a later request.
+        """
+        if not self.sock and self._lost:
+            self._lost = False
+            if not self.connect():
+                return None
+        if not self.sock:
+            print("Broker not connected")
+            return None
+        with self._call_lock:
+            self._request_id += 1
+            request = {'id': self._request_id, 'op': op, 'args': list(args)}
+            try:
+                self.sock.sendall(json.dumps(request).encode() + b'\n')
+                while True:
+                    line = self._rfile.readline()
+                    if not line:
+                        break
+                    reply = json.loads(line)
+                    if reply.get('id') == request['id']:
+                        break
+            except (OSError, ValueError) as e:
+                print(f"Broker error: {e}")
+                self._drop_connection()
+                return None
+        if not line:
+            print("Broker closed the connection")
+            self._drop_connection()
+            return None
+        if 'error' in reply:
+            print(f"Broker: {reply['error']}")
+            return None
+        return reply['result']
+
+    def _drop_connection(self):
+        """Close a connection whose reply stream can no longer be trusted."""
+        if self.sock:
+            self._rfile.close()
+            self.sock.close()
+            self.sock = None
+            self._lost = True
+
+    def stats(self) -> Optional[Dict[str, Dict]]:
+        """Per-client statistics from the broker."""
+        return self._call('stats')
+
+    def write_register(self, address: int, data: int) -> bool:
+        if self._pending_writes is not None:
+            self._pending_writes[address & 0xFF] = data & 0xFF
+            return True
+        return bool(self._call('write_register', address & 0xFF, data & 0xFF))
+
+    def write_block(self, start_address: int, data: List[int]) -> bool:
+        if len(data) == 0 or len(data) > MAX_BLOCK_LENGTH:
+            print("Invalid block size (1-255 bytes)")
+            return False
+        if self._pending_writes is not None:
+            for n, value in enumerate(data):
+                self._pending_writes[(start_address + n) & 0xFF] = value & 0xFF
+            return True
+        return bool(self._call('write_block', start_address & 0xFF, [d & 0xFF for d in data]))
+
+    def write_coalesced(self, writes: Dict[int, int]) -> bool:
+        if len(writes) == 0:
+            return True
+        if self._pending_writes is not None:
+            for address, data in writes.items():
+                self._pending_writes[address & 0xFF] = data & 0xFF
+            return True
+        return bool(self._call('write_coalesced', [[a & 0xFF, d & 0xFF] for a, d in writes.items()]))
+
+    def write_verify(self, writes: Dict[int, int]) -> Optional[Dict[int, Tuple[int, int]]]:
+        if self._pending_writes is not None:
+            print("write_verify cannot be used inside a transaction")
+            return None
+        if len(writes) == 0:
+            return {}
+        result = self._call('write_verify', [[a & 0xFF, d & 0xFF] for a, d in writes.items()])
+        return None if result is None else {a: (w, r) for a, w, r in result}
+
+    def write_block_verify(self, start_address: int, data: List[int]) -> Optional[Dict[int, Tuple[int, int]]]:
+        if self._pending_writes is not None:
+            print("write_block_verify cannot be used inside a transaction")
+            return None
+        if len(data) == 0 or len(data) > MAX_BLOCK_LENGTH or start_address + len(data) > 256:
+            print("Invalid block size (1-255 bytes within 0x00-0xFF)")
+            return None
+        result = self._call('write_block_verify', start_address & 0xFF, [d & 0xFF for d in data])
+        return None if result is None else {a: (w, r) for a, w, r in result}
+
+    def burst(self, cmd: bytes, reply_length: int = 0, block_length: int = 0) -> Optional[bytes]:
+        if len(cmd) == 0:
+            print("Empty burst")
+            return None
+        result = self._call('burst', list(cmd), reply_length, block_length)
+        return None if result is None else bytes(result)
+
+    def read_register(self, address: int) -> Optional[int]:
+        return self._call('read_register', address & 0xFF)
+
+    def read_many(self, addresses: List[int]) -> Optional[List[int]]:
+        if len(addresses) == 0:
+            return []
+        return self._call('read_many', [a & 0xFF for a in addresses])
+
+    def read_planned(self, addresses: List[int]) -> Optional[List[int]]:
+        if len(addresses) == 0:
+            return []
+        return self._call('read_planned', [a & 0xFF for a in addresses])
+
+    def read_block(self, start_address: int, length: int) -> Optional[List[int]]:
+        if length == 0 or length > MAX_BLOCK_LENGTH:
+            print("Invalid block size (1-255 bytes)")
+            return None
+        return self._call('read_block', start_address & 0xFF, length)
+
+    def measure_rtt(self, samples: int = 5) -> Optional[float]:
+        self.rtt = self._call('measure_rtt', samples)
+        return self.rtt
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Share the FPGA serial port between local clients')
+    parser.add_argument('port', nargs='?', default='/dev/ttyUSB1', help='Serial port (default: /dev/ttyUSB1)')
+    parser.add_argument('-b', '--baud', type=int, help='Baud rate (default: saved link profile or 115200)')
+    parser.add_argument('-s', '--socket', default=DEFAULT_SOCKET, help=f'Unix socket (default: {DEFAULT_SOCKET})')
+    parser.add_argument('--write-mode', choices=[WRITE_MODE_SLEEP, WRITE_MODE_FENCED], default=WRITE_MODE_FENCED,
+                        help='Write completion strategy (default: fenced)')
+    parser.add_argument('--cache', action='store_true', help='Serve reads of written registers from a shadow cache')
+    parser.add_argument('--stats', action='store_true', help='Print client statistics of a running broker and exit')
+    args = parser.parse_args()
+
+    if args.stats:
+        client = FPGABrokerClient(socket_path=args.socket, verbose=False, name='stats')
+        if not client.connect():
+            sys.exit(1)
+        for name, summary in (client.stats() or {}).items():
+            print(f"{name:30s} {summary}")
+        client.disconnect()
+        return
+
+    fpga = FPGAUartInterface(port=args.port, baudrate=args.baud, write_mode=args.write_mode,
+                             cache=args.cache)
+    if not fpga.connect():
+        sys.exit(1)
+    broker = FPGABroker(fpga, socket_path=args.socket)
+    try:
+        broker.serve_forever()
+    except KeyboardInterrupt:
+        print("\nBroker stopped")
+    finally:
+        fpga.disconnect()
+
+
+if __name__ == "__main__":
+    main()
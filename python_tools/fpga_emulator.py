@@ -0,0 +1,361 @@
+#!/usr/bin/env python3
+"""
+FPGA Register Bank Emulator
+Opens a pseudo-terminal and answers the UART protocol of digital/uart_if/uart_if.v
+so FPGAUartInterface and the scripts in this directory can run without a
+Tang Nano attached (e.g. in CI or for throughput measurements).
+
+Protocol (same as uart_if.v):
+- Single Write: 'W' + address_byte + data_byte
+- Single Read:  'R' + address_byte → responds with data_byte
+- Block Write:  'B' + start_address + length + data0 + data1 + ... + dataN
+- Block Read:   'b' + start_address + length → responds with data0 + data1 + ... + dataN
+
+Modelled RTL behaviour:
+- Register contents start from the reset values in reg_file_fpga_template.json,
+  only mapped bits are stored and unmapped addresses read as 0 (flat=True turns
+  the whole space into plain RAM instead)
+- Every byte takes 10 bit times on the wire in both directions
+- Commands arriving while the TX queue still holds unsent bytes are ignored,
+  just like PROTO_IDLE / PROTO_BLOCK_READ_DRAIN in uart_if.v
+
+Fault injection:
+- block_read_extra: stale TX queue bytes sent ahead of every block read reply
+- drop_rate / corrupt_rate: per reply byte probability of loss / bit flip
+- debug_interval: period of unsolicited "DBG: " frames (as sent on button S2)
+- latency: extra delay before reply bytes reach the host, like the latency
+  timer of the FTDI USB bridge
+
+Usage:
+    python3 fpga_emulator.py [--baud 115200] [--extra 2] [--flat]
+    # prints the /dev/pts/N to pass as port to FPGAUartInterface
+"""
+
+import argparse
+import os
+import random
+import select
+import threading
+import time
+import tty
+from collections import deque
+from typing import Optional
+
+from register_map import compile_register_map
+
+# Debug sequence sent by fpga_template.sv: "DBG: " + 0x00..0x0F + CR LF
+DEBUG_FRAME = b'DBG: ' + bytes(range(16)) + b'\r\n'
+
+
+class FPGAEmulator:
+    """Pseudo-terminal stand-in for the uart_if.v register bank interface."""
+
+    def __init__(self, baudrate: int = 115200, register_file: Optional[str] = None,
+                 flat: bool = False, block_read_extra: int = 0, drop_rate: float = 0.0,
+                 corrupt_rate: float = 0.0, debug_interval: float = 0.0,
+                 latency: float = 0.0, seed: Optional[int] = None):
+        """
+        Create emulator (call start() to open the pty).
+
+        Args:
+            baudrate: Modelled baud rate, 0 disables wire time modelling
+            register_file: JSON register database (default: repo register map)
+            flat: Treat all 256 addresses as plain 8-bit RAM
+            block_read_extra: Stale bytes sent before each block read reply
+            drop_rate: Probability of dropping a reply byte
+            corrupt_rate: Probability of flipping one bit of a reply byte
+            debug_interval: Seconds between unsolicited debug frames (0 = off)
+            latency: Seconds added before reply bytes are delivered
+            seed: Random seed for reproducible fault injection
+        """
+        self.baudrate = baudrate
+        self.byte_time = 10.0 / baudrate if baudrate else 0.0
+        self.block_read_extra = block_read_extra
+        self.drop_rate = drop_rate
+        self.corrupt_rate = corrupt_rate
+        self.debug_interval = debug_interval
+        self.latency = latency
+        self.rng = random.Random(seed)
+
+        self.regmap = compile_register_map(register_file)
+        self.write_mask = list(self.regmap.writable)
+        self.readonly_mask = self.regmap.readonly
+        if flat:
+            self.write_mask = [0xFF & ~ro for ro in self.readonly_mask]
+        self.regs = bytearray(self.regmap.resets)
+        self.inputs = bytearray(256)  # Values driven onto readonly bits
+
+        # Circular TX queue like uart_if.v, used for stale block read bytes
+        self.tx_queue = bytearray(256)
+        self.tx_queue_write_ptr = 0
+
+        self.stats = {
+            'commands': 0,
+            'rx_bytes': 0,
+            'tx_bytes': 0,
+            'ignored_bytes': 0,
+            'dropped_bytes': 0,
+            'corrupted_bytes': 0,
+            'extra_bytes': 0,
+            'debug_frames': 0,
+        }
+
+        self.master_fd = None
+        self.slave_fd = None
+        self.port = None
+        self._thread = None
+        self._running = False
+        self._lock = threading.Lock()
+        self._reset_protocol()
+
+    def _reset_protocol(self):
+        """Reset protocol state machine and wire timing model."""
+        self._state = 'idle'
+        self._cmd = 0
+        self._addr = 0
+        self._length = 0
+        self._count = 0
+        self._rx_clock = 0.0        # Time the last received byte completed
+        self._tx_clock = 0.0        # Time the last scheduled TX byte completes
+        self._tx_last_start = 0.0   # Time the last queued TX byte leaves the queue
+        self._queue_clock = 0.0     # Reply schedule ignoring debug frames (tx_queue timing)
+        self._pending = deque()     # (completion_time, byte) awaiting release
+        self._next_debug = 0.0
+
+    # ------------------------------------------------------------------
+    # Register bank model
+    # ------------------------------------------------------------------
+    def read_reg(self, address: int) -> int:
+        """Return the value the register bank drives for an address."""
+        address &= 0xFF
+        return ((self.regs[address] & self.write_mask[address])
+                | (self.inputs[address] & self.readonly_mask[address]))
+
+    def write_reg(self, address: int, data: int):
+        """Write a register; only writable bits are stored."""
+        address &= 0xFF
+        self.regs[address] = data & self.write_mask[address]
+
+    def set_input(self, symbol: str, value: int):
+        """
+        Drive a readonly field (e.g. 'sys_cfg.monitor_flag') from the design side.
+
+        Args:
+            symbol: Field symbol from the register map
+            value: Field value
+        """
+        field = self.regmap.resolve(symbol)
+        with self._lock:
+            self.inputs[field.address] = field.insert(self.inputs[field.address], value)
+
+    # ------------------------------------------------------------------
+    # pty handling
+    # ------------------------------------------------------------------
+    def start(self) -> str:
+        """
+        Open the pseudo-terminal and start serving in a background thread.
+
+        Returns:
+            Slave device path to connect to (e.g. '/dev/pts/5')
+        """
+        self.master_fd, self.slave_fd = os.openpty()
+        # Raw mode so 0x0A/0x0D and control bytes pass through untouched.
+        # The slave stays open for our lifetime so the master never sees EIO
+        # when a client disconnects.
+        tty.setraw(self.slave_fd)
+        self.port = os.ttyname(self.slave_fd)
+        self._running = True
+        self._thread = threading.Thread(target=self._serve, name='fpga-emulator', daemon=True)
+        self._thread.start()
+        return self.port
+
+    def stop(self):
+        """Stop serving and close the pseudo-terminal."""
+        self._running = False
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        for fd in (self.master_fd, self.slave_fd):
+            if fd is not None:
+                os.close(fd)
+        self.master_fd = self.slave_fd = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def inject_debug_frame(self):
+        """Queue one unsolicited debug frame like button S2 on the board."""
+        with self._lock:
+            self._queue_tx(DEBUG_FRAME, time.monotonic(), debug=True)
+
+    def _serve(self):
+        """Background loop: receive command bytes, release due reply bytes."""
+        now = time.monotonic()
+        if self.debug_interval:
+            self._next_debug = now + self.debug_interval
+
+        while self._running:
+            now = time.monotonic()
+            with self._lock:
+                if self.debug_interval and now >= self._next_debug:
+                    self._queue_tx(DEBUG_FRAME, now, debug=True)
+                    self._next_debug = now + self.debug_interval
+                wait = 0.05
+                if self._pending:
+                    wait = max(0.0, min(wait, self._pending[0][0] - now))
+
+            readable, _, _ = select.select([self.master_fd], [], [], wait)
+            if readable:
+                try:
+                    data = os.read(self.master_fd, 4096)
+                except OSError:
+                    data = b''
+                now = time.monotonic()
+                with self._lock:
+                    for byte in data:
+                        self._rx_byte(byte, now)
+            self._release(time.monotonic())
+
+    def _release(self, now: float):
+        """Write all reply bytes whose wire time has elapsed."""
+        out = bytearray()
+        with self._lock:
+            while self._pending and self._pending[0][0] <= now:
+                out.append(self._pending.popleft()[1])
+        if out:
+            os.write(self.master_fd, bytes(out))
+            self.stats['tx_bytes'] += len(out)
+
+    # ------------------------------------------------------------------
+    # Protocol model (mirrors the proto_state machine in uart_if.v)
+    # ------------------------------------------------------------------
+    def _queue_busy(self, t: float) -> bool:
+        """True while the TX queue still holds reply bytes that have not started sending."""
+        return self._tx_last_start > t
+
+    def _queue_tx(self, data: bytes, t: float, debug: bool = False):
+        """Schedule bytes for transmission, applying fault injection."""
+        if debug:
+            self.stats['debug_frames'] += 1
+        for byte in data:
+            if not debug:
+                self.tx_queue[self.tx_queue_write_ptr] = byte
+                self.tx_queue_write_ptr = (self.tx_queue_write_ptr + 1) & 0xFF
+            start = max(t, self._tx_clock)
+            self._tx_clock = start + self.byte_time
+            if not debug:
+                # debug_send bypasses tx_queue in uart_if.v: a frame on the
+                # wire delays replies but does not keep the queue busy
+                queue_start = max(t, self._queue_clock)
+                self._queue_clock = queue_start + self.byte_time
+                self._tx_last_start = queue_start
+            if self.drop_rate and self.rng.random() < self.drop_rate:
+                self.stats['dropped_bytes'] += 1
+                continue
+            if self.corrupt_rate and self.rng.random() < self.corrupt_rate:
+                byte ^= 1 << self.rng.randrange(8)
+                self.stats['corrupted_bytes'] += 1
+            self._pending.append((self._tx_clock + self.latency, byte))
+
+    def _rx_byte(self, byte: int, now: float):
+        """Process one received byte at its modelled arrival time."""
+        t = max(now, self._rx_clock) + self.byte_time
+        self._rx_clock = t
+        self.stats['rx_bytes'] += 1
+
+        if self._state == 'drain':
+            if self._queue_busy(t):
+                # uart_if.v falls back to IDLE and the byte is lost
+                self._state = 'idle'
+                self.stats['ignored_bytes'] += 1
+                return
+            self._state = 'idle'
+
+        if self._state == 'idle':
+            if self._queue_busy(t) or byte not in b'WwRrBb':
+                self.stats['ignored_bytes'] += 1
+                return
+            self._cmd = byte
+            self._state = 'addr'
+            self.stats['commands'] += 1
+
+        elif self._state == 'addr':
+            self._addr = byte
+            if self._cmd in b'Ww':
+                self._state = 'data'
+            elif self._cmd in b'Rr':
+                self._queue_tx(bytes([self.read_reg(byte)]), t)
+                self._state = 'drain'
+            else:
+                self._state = 'length'
+
+        elif self._state == 'data':
+            self.write_reg(self._addr, byte)
+            self._state = 'idle'
+
+        elif self._state == 'length':
+            if self._cmd == ord('B'):
+                # Length 0 never terminates in the RTL; treat it as a full wrap
+                self._length = byte or 256
+                self._count = 0
+                self._state = 'block_write'
+            else:
+                # The RTL always sends at least one byte
+                length = max(byte, 1)
+                reply = bytes(self.read_reg(self._addr + i) for i in range(length))
+                if self.block_read_extra:
+                    start = self.tx_queue_write_ptr - self.block_read_extra
+                    stale = bytes(self.tx_queue[(start + i) & 0xFF]
+                                  for i in range(self.block_read_extra))
+                    self.stats['extra_bytes'] += len(stale)
+                    reply = stale + reply
+                self._queue_tx(reply, t)
+                self._state = 'drain'
+
+        elif self._state == 'block_write':
+            self.write_reg(self._addr + self._count, byte)
+            self._count += 1
+            if self._count >= self._length:
+                self._state = 'idle'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Emulate the FPGA UART register bank on a pty')
+    parser.add_argument('--baud', type=int, default=115200,
+                        help='modelled baud rate, 0 = no wire delay (default 115200)')
+    parser.add_argument('--regfile', default=None, help='JSON register database')
+    parser.add_argument('--flat', action='store_true', help='all 256 addresses are plain RAM')
+    parser.add_argument('--extra', type=int, default=0,
+                        help='stale bytes sent before each block read reply')
+    parser.add_argument('--drop', type=float, default=0.0, help='reply byte drop probability')
+    parser.add_argument('--corrupt', type=float, default=0.0, help='reply byte bit flip probability')
+    parser.add_argument('--debug-interval', type=float, default=0.0,
+                        help='seconds between unsolicited DBG frames (0 = off)')
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help='seconds added before replies reach the host (USB latency)')
+    parser.add_argument('--seed', type=int, default=None, help='fault injection random seed')
+    args = parser.parse_args()
+
+    emulator = FPGAEmulator(baudrate=args.baud, register_file=args.regfile, flat=args.flat,
+                            block_read_extra=args.extra, drop_rate=args.drop,
+                            corrupt_rate=args.corrupt, debug_interval=args.debug_interval,
+                            latency=args.latency, seed=args.seed)
+    port = emulator.start()
+    print(f"FPGA emulator listening on {port} ({args.baud} baud)")
+    print("Press Ctrl+C to exit")
+    try:
+        while True:
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        print()
+    finally:
+        emulator.stop()
+        print(f"Emulator stats: {emulator.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+FPGA Register Scope
+Samples a set of registers at a fixed rate on a background thread. Each
+sample is one batched read (read_planned, i.e. pipelined 'R' commands and/or
+a 'b' block read in a single burst) stored with its timestamp in a
+preallocated NumPy ring buffer, so the newest depth samples are always
+available without allocation in the sampling loop.
+
+Samples are scheduled on an absolute time grid (start + n / rate); a sample
+that cannot be taken in time is skipped and counted as missed rather than
+shifting all later samples. The report gives target and achieved rate,
+interval jitter and how late samples started against their slot.
+
+The interface must not be used by other threads while the scope runs.
+
+Requires numpy (pip install numpy).
+
+Usage:
+    scope = fpga.scope(['sys_cfg_control', 'pwm_duty', 0x04, 0x05, 0x06], rate_hz=500, depth=10000)
+    time.sleep(5)
+    scope.stop()
+    t, samples = scope.data()
+    python3 fpga_scope.py /dev/ttyUSB1 --rate 500 --duration 5 -o scope.npz
+"""
+
+import argparse
+import sys
+import threading
+import time
+from typing import Dict, List, Tuple, Union
+
+# Registers sampled by default: sys_cfg_control (incl. monitor_flag), pwm_duty,
+# debug_led and debug_data0..2
+DEFAULT_SCOPE_ADDRESSES = [0x00, 0x01, 0x02, 0x04, 0x05, 0x06]
+
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("fpga_scope needs numpy: pip install numpy")
+    return numpy
+
+
+def resolve_address(fpga, address: Union[int, str]) -> int:
+    """
+    Register address from an int, a name in fpga.registers or a field symbol.
+
+    Raises:
+        KeyError: Unknown name
+    """
+    if isinstance(address, int):
+        return address & 0xFF
+    if address in fpga.registers:
+        return fpga.registers[address]
+    return fpga.regmap.resolve(address).address
+
+
+class RegisterScope:
+    """Fixed-rate register sampler with a NumPy ring buffer."""
+
+    def __init__(self, fpga, addresses: List[Union[int, str]], rate_hz: float, depth: int = 10000):
+        """
+        Args:
+            fpga: Connected FPGAUartInterface
+            addresses: Registers to sample (addresses, register names or field symbols)
+            rate_hz: Target sample rate
+            depth: Samples kept in the ring buffer
+        """
+        np = _numpy()
+        if rate_hz <= 0 or depth <= 0:
+            raise ValueError("rate_hz and depth must be positive")
+        self.fpga = fpga
+        self.addresses = [resolve_address(fpga, a) for a in addresses]
+        self.rate_hz = rate_hz
+        self.depth = depth
+        self.timestamps = np.zeros(depth, dtype=np.float64)   # Seconds since start()
+        self.samples = np.zeros((depth, len(self.addresses)), dtype=np.uint8)
+        self._lateness = np.zeros(depth, dtype=np.float64)    # Sample start - scheduled slot
+        self._index = 0         # Next ring slot
+        self._count = 0         # Samples stored since start()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.start_time = None  # time.perf_counter() at start()
+        self.elapsed = 0.0
+        self.errors = 0
+        self.missed = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> 'RegisterScope':
+        """Clear the buffer and start sampling."""
+        if self.running:
+            return self
+        self._index = self._count = 0
+        self.errors = self.missed = 0
+        self._stop.clear()
+        self.start_time = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='fpga-scope', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop sampling (the buffer keeps its contents)."""
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        fpga = self.fpga
+        read = fpga.read_planned
+        addresses = self.addresses
+        period = 1.0 / self.rate_hz
+        start = self.start_time
+        slot = 0
+        while not self._stop.is_set():
+            due = start + slot * period
+            now = time.perf_counter()
+            if now < due:
+                if self._stop.wait(due - now):
+                    break
+                now = time.perf_counter()
+            elif now - due >= period:
+                # Too late for this slot: skip to the current one
+                skipped = int((now - due) / period)
+                self.missed += skipped
+                slot += skipped
+                due = start + slot * period
+            slot += 1
+
+            if fpga.cache_enabled:
+                # Sample the hardware, not the values last written or read
+                for address in addresses:
+                    fpga.invalidate_cache(address, address)
+            values = read(addresses)
+            done = time.perf_counter()
+            if values is None:
+                self.errors += 1
+                continue
+            with self._lock:
+                i = self._index
+                self.timestamps[i] = (now + done) / 2 - start
+                self.samples[i] = values
+                self._lateness[i] = now - due
+                self._index = (i + 1) % self.depth
+                self._count += 1
+            self.elapsed = done - start
+
+    def _ordered(self, array):
+        """Copy of the valid part of a ring array, oldest first."""
+        np = _numpy()
+        if self._count < self.depth:
+            return array[:self._count].copy()
+        return np.concatenate((array[self._index:], array[:self._index]))
+
+    def data(self) -> Tuple:
+        """
+        Samples in the buffer, oldest first (safe while running).
+
+        Returns:
+            (timestamps in seconds since start, uint8 array [samples, addresses])
+        """
+        with self._lock:
+            return self._ordered(self.timestamps), self._ordered(self.samples)
+
+    def fields(self):
+        """
+        Samples decoded into register map fields (see register_decode.py).
+
+        Returns:
+            Structured array with column 't' plus one column per field symbol
+        """
+        from register_decode import FieldDecoder
+        timestamps, samples = self.data()
+        return FieldDecoder(self.fpga.regmap, self.addresses).decode(samples, timestamps)
+
+    def stats(self) -> Dict:
+        """
+        Rate and timing statistics over the samples in the buffer.
+
+        Returns:
+            Dict with target/achieved rate, interval jitter and lateness in ms
+        """
+        np = _numpy()
+        with self._lock:
+            timestamps = self._ordered(self.timestamps)
+            lateness = self._ordered(self._lateness)
+            count = self._count
+        result = {'samples': count, 'target_hz': self.rate_hz, 'achieved_hz': None,
+                  'errors': self.errors, 'missed': self.missed,
+                  'jitter_ms': None, 'late_p99_ms': None, 'late_max_ms': None}
+        if len(timestamps) >= 2:
+            intervals = np.diff(timestamps)
+            result['achieved_hz'] = round(1.0 / float(intervals.mean()), 1)
+            result['jitter_ms'] = round(float(intervals.std()) * 1000.0, 4)
+        if len(lateness):
+            result['late_p99_ms'] = round(float(np.percentile(lateness, 99)) * 1000.0, 4)
+            result['late_max_ms'] = round(float(lateness.max()) * 1000.0, 4)
+        return result
+
+    def print_report(self):
+        s = self.stats()
+        print(f"Scope: {s['samples']} samples of {len(self.addresses)} registers, "
+              f"target {s['target_hz']:.1f} Hz, achieved {s['achieved_hz'] or 0:.1f} Hz")
+        print(f"  jitter {s['jitter_ms'] or 0:.3f} ms (interval std), late p99 {s['late_p99_ms'] or 0:.3f} ms, "
+              f"max {s['late_max_ms'] or 0:.3f} ms, missed {s['missed']}, errors {s['errors']}")
+
+    def save(self, path: str):
+        """Save timestamps, samples and addresses as .npz."""
+        np = _numpy()
+        timestamps, samples = self.data()
+        np.savez(path, timestamps=timestamps, samples=samples,
+                 addresses=np.array(self.addresses, dtype=np.uint8), rate_hz=self.rate_hz)
+
+
+def main():
+    from fpga_uart_interface import FPGAUartInterface
+
+    parser = argparse.ArgumentParser(description='Sample FPGA registers at a fixed rate')
+    parser.add_argument('port', nargs='?', default='/dev/ttyUSB1', help='Serial port (default: /dev/ttyUSB1)')
+    parser.add_argument('-b', '--baud', type=int, help='Baud rate (default: saved link profile or 115200)')
+    parser.add_argument('-r', '--rate', type=float, default=200.0, help='Sample rate in Hz (default: 200)')
+    parser.add_argument('--depth', type=int, default=10000, help='Ring buffer depth (default: 10000)')
+    parser.add_argument('-t', '--duration', type=float, default=5.0, help='Seconds to sample (default: 5)')
+    parser.add_argument('-a', '--addresses', nargs='+', help='Registers (hex addresses or names)')
+    parser.add_argument('-o', '--output', help='Save samples as .npz')
+    parser.add_argument('--emulate', action='store_true', help='Sample fpga_emulator.py on a local pty')
+    args = parser.parse_args()
+
+    addresses = DEFAULT_SCOPE_ADDRESSES
+    if args.addresses:
+        addresses = [int(a, 16) if a.lower().startswith('0x') else a for a in args.addresses]
+
+    emulator = None
+    port = args.port
+    if args.emulate:
+        from fpga_emulator import FPGAEmulator
+        emulator = FPGAEmulator(baudrate=args.baud or 115200)
+        port = emulator.start()
+
+    fpga = FPGAUartInterface(port=port, baudrate=args.baud, verbose=False)
+    if not fpga.connect():
+        sys.exit(1)
+    try:
+        scope = fpga.scope(addresses, args.rate, args.depth)
+        print(f"Sampling {', '.join(f'0x{a:02X}' for a in scope.addresses)} at {args.rate:g} Hz "
+              f"for {args.duration:g}s...")
+        try:
+            time.sleep(args.duration)
+        except KeyboardInterrupt:
+            pass
+        scope.stop()
+        scope.print_report()
+        if args.output:
+            scope.save(args.output)
+            print(f"Saved samples to {args.output}")
+    except (KeyError, ValueError, ImportError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    finally:
+        fpga.disconnect()
+        if emulator:
+            emulator.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -10,6 +10,11 @@ Protocol:
 - Block Write:  'B' + start_address + length + data0 + data1 + ... + dataN
 - Block Read:   'b' + start_address + length → responds with data0 + data1 + ... + dataN
 
+The FPGA never acknowledges writes. In write_mode='fenced' every write is
+followed by a single read of the last written address in the same burst; as
+uart_if.v handles commands strictly in order, the reply byte proves the write
+has been applied, so no fixed sleep is needed.
+
 Register Map (from reg_file_fpga_template):
 - sys_cfg.enable_stuf (0x00 bit 0): Enable stuf
 - sys_cfg.enable_other (0x00 bit 1): Enable other stuf
@@ -23,32 +28,257 @@ Register Map (from reg_file_fpga_template):
 Author: Claude Code
 """
 
+import functools
+import os
+import select
 import serial
+import statistics
+import sys
 import time
-from typing import List, Optional, Union
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from link_profile import default_baudrate
+from register_config import apply_config, load_config
+from register_map import RegisterMap, compile_register_map
+from rx_decoder import DEBUG_PREFIX, RxDecoder
+from uart_metrics import UartMetrics
+from uart_trace import TraceWriter
+
+# Protocol command bytes (see digital/uart_if/uart_if.v)
+CMD_WRITE = ord('W')
+CMD_READ = ord('R')
+CMD_BLOCK_WRITE = ord('B')
+CMD_BLOCK_READ = ord('b')
+
+# Write completion strategies
+WRITE_MODE_SLEEP = 'sleep'      # Fixed delay after each write (legacy behaviour)
+WRITE_MODE_FENCED = 'fenced'    # Read-back fence in the same burst, no sleep
+WRITE_SETTLE_TIME = 0.05        # Delay used by WRITE_MODE_SLEEP
+
+# Command sizes and wire format, used by the read planner cost model
+READ_CMD_BYTES = 2              # 'R' + address
+WRITE_CMD_BYTES = 3             # 'W' + address + data
+BLOCK_WRITE_HEADER_BYTES = 3    # 'B' + start_address + length
+BLOCK_READ_CMD_BYTES = 3        # 'b' + start_address + length
+MAX_BLOCK_LENGTH = 255
+BITS_PER_BYTE = 10              # Start bit + 8 data bits + stop bit
+DEFAULT_RTT = 0.002             # Round trip estimate until measure_rtt() runs
+BLOCK_OVERRUN_SETTLE = 0.002    # Wait for bytes a block read sends beyond its length
+RX_MARGIN = 0.05                # Slack on top of the wire time before a reply counts as lost
+RX_LOOKAHEAD = 0.002            # Slack for classifying a 'D' reply byte vs a debug frame
+
+
+def plan_reads(addresses: List[int], rtt: float = DEFAULT_RTT,
+               baudrate: int = 115200, block_settle: float = 0.0) -> Tuple[List[Tuple[str, int, int]], float]:
+    """
+    Choose between single 'R' reads and 'b' block reads for a set of addresses.
+
+    Single reads can be pipelined, so all of them plus one trailing block read
+    share one burst and one round trip. uart_if.v ignores commands while a
+    block read reply is still queued, so every further block read costs its
+    own round trip. Bytes on the wire cost 10 bit times each.
+
+    Args:
+        addresses: Register addresses to read (any order, duplicates allowed)
+        rtt: Round trip overhead per burst in seconds
+        baudrate: UART baud rate
+        block_settle: Extra wait per block read for over-send bytes in seconds
+
+    Returns:
+        (plan, cost) - plan is a list of ('R', address, 1) and
+        ('b', start_address, length) operations with the block read allowed to
+        share the first burst listed first; cost is the estimated time in seconds
+    """
+    unique = sorted(set(a & 0xFF for a in addresses))
+    if not unique:
+        return [], 0.0
+
+    byte_time = BITS_PER_BYTE / baudrate
+    single_cost = READ_CMD_BYTES * byte_time
+    count = len(unique)
+    inf = float('inf')
+
+    # cost[i][shared]: cheapest cover of unique[:i]; shared tells whether the
+    # block read riding on the single read burst has been used
+    cost = [[inf, inf] for _ in range(count + 1)]
+    choice = [[None, None] for _ in range(count + 1)]
+    cost[0][0] = 0.0
+    for i in range(count):
+        for shared in (0, 1):
+            if cost[i][shared] == inf:
+                continue
+            # Next address as a single read
+            c = cost[i][shared] + single_cost
+            if c < cost[i + 1][shared]:
+                cost[i + 1][shared] = c
+                choice[i + 1][shared] = (i, shared, 'R')
+            # Block read covering unique[i..j]
+            for j in range(i, count):
+                span = unique[j] - unique[i] + 1
+                if span > MAX_BLOCK_LENGTH:
+                    break
+                wire = (BLOCK_READ_CMD_BYTES + span) * byte_time + block_settle
+                for use_shared in ((0, 1) if shared == 0 else (1,)):
+                    extra_rtt = 0.0 if (use_shared and not shared) else rtt
+                    c = cost[i][shared] + wire + extra_rtt
+                    if c < cost[j + 1][use_shared]:
+                        cost[j + 1][use_shared] = c
+                        choice[j + 1][use_shared] = (i, shared, 'b' if extra_rtt else 'b0')
+
+    shared = 0 if cost[count][0] <= cost[count][1] else 1
+    total = cost[count][shared] + rtt
+
+    # Walk back through the choices to build the plan
+    plan = []
+    first_block = None
+    i = count
+    while i > 0:
+        prev, prev_shared, kind = choice[i][shared]
+        if kind == 'R':
+            plan.append(('R', unique[prev], 1))
+        else:
+            op = ('b', unique[prev], unique[i - 1] - unique[prev] + 1)
+            if kind == 'b0':
+                first_block = op
+            else:
+                plan.append(op)
+        i, shared = prev, prev_shared
+    plan.reverse()
+    if first_block:
+        plan.insert(0, first_block)
+    return plan, total
+
+
+def coalesce_writes(writes: Dict[int, int],
+                    fill: Optional[Callable[[int], Optional[int]]] = None) -> List[Tuple[int, List[int]]]:
+    """
+    Merge register writes into the fewest block writes.
+
+    Adjacent addresses form one run of up to MAX_BLOCK_LENGTH bytes. A gap is
+    bridged when every address in it has a known value from fill() and
+    resending those bytes is cheaper than a new command header.
+
+    Args:
+        writes: Address -> data byte (last value per address wins upstream)
+        fill: Returns the current value of an address, or None if unknown
+
+    Returns:
+        List of (start_address, data) runs in address order
+    """
+    runs = []
+    for address in sorted(writes):
+        if runs:
+            start, data = runs[-1]
+            end = start + len(data)
+            gap = range(end, address)
+            if len(gap) < BLOCK_WRITE_HEADER_BYTES and len(data) + len(gap) < MAX_BLOCK_LENGTH:
+                if len(gap) == 0:
+                    bridge = []
+                elif fill:
+                    bridge = [fill(a) for a in gap]
+                else:
+                    bridge = [None]
+                if None not in bridge:
+                    data.extend(bridge)
+                    data.append(writes[address] & 0xFF)
+                    continue
+        runs.append((address, [writes[address] & 0xFF]))
+    return runs
+
+
+def _instrumented(operation: str):
+    """Record total and phase times of an operation when metrics are attached."""
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            # Nested operations count towards the outermost one
+            if self.metrics is None or self._op is not None:
+                return method(self, *args, **kwargs)
+            self._op = operation
+            self._op_start = self._phase_start = time.perf_counter()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                self.metrics.observe(operation, 'total', time.perf_counter() - self._op_start)
+                self._op = None
+        return wrapper
+    return decorate
 
 
 class FPGAUartInterface:
     """UART interface for FPGA register bank communication."""
 
     # On tangnano9k ttyUSB1 is used for uart communication
-    def __init__(self, port: str = '/dev/ttyUSB1', baudrate: int = 115200, timeout: float = 1.0, verbose: bool = True):
+    def __init__(self, port: str = '/dev/ttyUSB1', baudrate: Optional[int] = None, timeout: float = 1.0, verbose: bool = True,
+                 write_mode: str = WRITE_MODE_SLEEP, register_file: Optional[str] = None,
+                 cache: bool = False, metrics: Optional[UartMetrics] = None, trace: Optional[str] = None):
         """
         Initialize UART connection to FPGA.
 
         Args:
             port: Serial port device (e.g., '/dev/ttyUSB0', '/dev/ttyUSB1')
-            baudrate: UART baud rate (default 115200, matching FPGA)
-            timeout: Read timeout in seconds
+            baudrate: UART baud rate (default: rate saved for this port by
+                      link_characterize.py, else 115200 matching uart_if.v)
+            timeout: Serial port timeout in seconds (reply deadlines are computed
+                     from the baud rate, see rx_margin)
             verbose: Whether to print connection messages
+            write_mode: 'sleep' (fixed delay after writes) or 'fenced' (read-back fence)
+            register_file: JSON register database (default: repo register map)
+            cache: Serve reads of registers we wrote from a local shadow copy
+            metrics: Record phase timings and transport events (see uart_metrics.py)
+            trace: Record all TX/RX bytes to this trace file from connect() on
+                   (see uart_trace.py)
         """
+        if write_mode not in (WRITE_MODE_SLEEP, WRITE_MODE_FENCED):
+            raise ValueError(f"Unknown write mode '{write_mode}'")
+
         self.port = port
-        self.baudrate = baudrate
+        self.baudrate = baudrate or default_baudrate(port)
         self.timeout = timeout
         self.serial = None
         self.verbose = verbose
-
-        # Register map for convenience
+        self.write_mode = write_mode
+        self.rtt = None  # Measured round trip overhead, see measure_rtt()
+        # WORKAROUND: the FPGA may send more bytes than requested on block
+        # reads (correct data last); set to 0 for bitstreams without the issue
+        self.block_overrun_settle = BLOCK_OVERRUN_SETTLE
+        # Replies are due after their wire time plus rtt and this margin
+        self.rx_margin = RX_MARGIN
+        # Wait for the rest of a possible "DBG: " frame before taking a 'D'
+        # as reply data
+        self.rx_lookahead = RX_LOOKAHEAD
+        # Splits received bytes into replies and unsolicited debug frames
+        self.rx_decoder = RxDecoder()
+
+        # Optional instrumentation; _op is the operation being timed
+        self.metrics = metrics
+        self._op = None
+        self._op_start = self._phase_start = 0.0
+        # Optional binary TX/RX recording, see start_trace()
+        self.trace_file = trace
+        self.tracer = None
+        self.register_file = register_file
+        self._regmap = None  # Compiled register map, loaded on first use
+
+        # Write-through shadow of the 256-byte register space. Only writable
+        # bits are kept; addresses with readonly fields are always read from
+        # hardware but their writable bits still serve read-modify-writes.
+        self.cache_enabled = cache
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._cache = bytearray(256)
+        self._cache_valid = bytearray(256)
+
+        # Pending writes of an open transaction(), address -> data
+        self._pending_writes = None
+        self.last_transaction_ok = True
+
+        # Symbol-addressed access to every field of the register map,
+        # e.g. fpga.fields['dsp_cfg.bp_filter_enable'] = 1
+        self.fields = FieldAccessor(self)
+
+        # Register map for convenience (see self.fields for all symbols)
         self.registers = {
             # sys_cfg section (0x00-0x0F)
             'sys_cfg_control': 0x00,      # bits 0,1,2 for enable_stuf, enable_other, monitor_flag
@@ -59,10 +289,15 @@ class FPGAUartInterface:
             'dsp_cfg_control': 0x40,      # DSP filter enables and placeholders
         }
 
-    def connect(self) -> bool:
+    def connect(self, quiet: bool = False, exclusive: bool = True) -> bool:
         """
         Establish UART connection to FPGA.
 
+        Args:
+            quiet: Do not print connection errors (e.g. while probing ports)
+            exclusive: Lock the port (flock on POSIX), so other exclusive
+                       opens, such as port probing, fail while it is in use
+
         Returns:
             True if connection successful, False otherwise
         """
@@ -73,16 +308,21 @@ class FPGAUartInterface:
                 bytesize=serial.EIGHTBITS,
                 parity=serial.PARITY_NONE,
                 stopbits=serial.STOPBITS_ONE,
-                timeout=self.timeout
+                timeout=self.timeout,
+                exclusive=exclusive
             )
+            if self.trace_file and not self.tracer:
+                self.start_trace(self.trace_file)
             # Clear any existing data in buffers
-            self.serial.reset_input_buffer()
+            self._discard_input()
             self.serial.reset_output_buffer()
+            self.invalidate_cache()
             if self.verbose:
                 print(f"Connected to FPGA on {self.port} at {self.baudrate} baud")
             return True
         except serial.SerialException as e:
-            print(f"Failed to connect to {self.port}: {e}")
+            if not quiet:
+                print(f"Failed to connect to {self.port}: {e}")
             return False
 
     def disconnect(self):
@@ -91,7 +331,347 @@ class FPGAUartInterface:
             self.serial.close()
             if self.verbose:
                 print("Disconnected from FPGA")
+        self.stop_trace()
+
+    def start_trace(self, path: str) -> TraceWriter:
+        """
+        Record every byte sent and received to a binary trace file.
+
+        Args:
+            path: Trace file; an existing trace is appended to
+
+        Returns:
+            TraceWriter (use mark() to annotate test steps)
+        """
+        self.stop_trace()
+        self.tracer = TraceWriter(path, self.baudrate, self.port)
+        if self.verbose:
+            print(f"Tracing UART traffic to {path}")
+        return self.tracer
+
+    def stop_trace(self):
+        """Stop recording and close the trace file."""
+        if self.tracer:
+            self.tracer.close()
+            self.tracer = None
+
+    @property
+    def regmap(self) -> RegisterMap:
+        """Compiled register map (loaded on first use, empty if unavailable)."""
+        if self._regmap is None:
+            try:
+                self._regmap = compile_register_map(self.register_file)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Register map not available: {e}")
+                self._regmap = RegisterMap([])
+        return self._regmap
+
+    def set_cache(self, enabled: bool):
+        """
+        Enable or disable the shadow register cache (contents are invalidated).
+
+        Args:
+            enabled: True to serve reads of non-volatile registers locally
+        """
+        self.cache_enabled = enabled
+        self.invalidate_cache()
+
+    def invalidate_cache(self, start_addr: int = 0x00, end_addr: int = 0xFF):
+        """
+        Forget cached values so the next reads go to hardware.
+
+        Args:
+            start_addr: First address to invalidate
+            end_addr: Last address to invalidate
+        """
+        self._cache_valid[start_addr:end_addr + 1] = bytes(end_addr - start_addr + 1)
+
+    def refresh_cache(self, start_addr: int = 0x00, end_addr: int = 0xFF) -> bool:
+        """
+        Reload cached values from hardware with block reads.
+
+        Args:
+            start_addr: First address to refresh
+            end_addr: Last address to refresh
+
+        Returns:
+            True if successful, False otherwise
+        """
+        self.invalidate_cache(start_addr, end_addr)
+        return self.read_range(start_addr, end_addr) is not None
+
+    def _cache_lookup(self, address: int) -> Optional[int]:
+        """Return the cached value of a non-volatile register, None on a miss."""
+        if not self.cache_enabled:
+            return None
+        address &= 0xFF
+        if self._cache_valid[address] and not self.regmap.readonly[address]:
+            self.cache_hits += 1
+            return self._cache[address]
+        self.cache_misses += 1
+        return None
+
+    def _cache_store(self, address: int, value: int):
+        """Record a value read from or written to hardware."""
+        if self.cache_enabled:
+            address &= 0xFF
+            self._cache[address] = value & self.regmap.writable[address]
+            self._cache_valid[address] = 1
+
+    def _read_writable(self, address: int) -> Optional[int]:
+        """
+        Current value of the writable bits of a register for read-modify-write.
+
+        Served from the cache when valid, including addresses that also hold
+        readonly bits, since writes ignore those bits anyway.
+        """
+        address &= 0xFF
+        if self._pending_writes is not None and address in self._pending_writes:
+            return self._pending_writes[address]
+        if self.cache_enabled and self._cache_valid[address]:
+            self.cache_hits += 1
+            return self._cache[address]
+        return self.read_register(address)
+
+    def _cached_value(self, address: int) -> Optional[int]:
+        """Cached writable bits of a register without touching hardware, None if unknown."""
+        if self.cache_enabled and self._cache_valid[address & 0xFF]:
+            return self._cache[address & 0xFF]
+        return None
+
+    @property
+    def in_transaction(self) -> bool:
+        """True inside a transaction() block, where writes are only recorded."""
+        return self._pending_writes is not None
+
+    @contextmanager
+    def transaction(self):
+        """
+        Buffer writes and send them as the fewest block writes on exit.
+
+        Inside the block write_register, write_block and the set_* helpers only
+        record the data; repeated writes to one address keep the last value.
+        Read-modify-write helpers see the buffered values. On normal exit the
+        writes go out in one burst with a single sleep or fence; if the block
+        raises, the buffered writes are discarded. Nested transactions join
+        the outermost one. The result of the flush is in last_transaction_ok.
+
+        Example:
+            with fpga.transaction():
+                fpga.set_pwm_duty(25.0)
+                fpga.set_debug_leds(0x15)
+        """
+        if self._pending_writes is not None:
+            yield self
+            return
+
+        self._pending_writes = {}
+        try:
+            yield self
+        except BaseException:
+            self._pending_writes = None
+            raise
+
+        pending, self._pending_writes = self._pending_writes, None
+        self.last_transaction_ok = self.write_coalesced(pending)
+        if not self.last_transaction_ok:
+            print("Transaction flush failed")
+
+    @_instrumented('write_coalesced')
+    def write_coalesced(self, writes: Dict[int, int]) -> bool:
+        """
+        Write a set of registers using the fewest commands in one burst.
+
+        Runs of adjacent addresses become 'B' block writes, lone addresses 'W'
+        writes; small gaps are bridged with cached values when that saves a
+        command. The burst completes with one sleep or fence (see write_mode).
+
+        Args:
+            writes: Address -> data byte
+
+        Returns:
+            True if successful, False otherwise
+        """
+        if not self.serial or not self.serial.is_open:
+            print("UART not connected")
+            return False
+
+        if len(writes) == 0:
+            return True
+
+        if self._pending_writes is not None:
+            for address, data in writes.items():
+                self._pending_writes[address & 0xFF] = data & 0xFF
+            return True
+
+        runs = coalesce_writes({a & 0xFF: d for a, d in writes.items()}, fill=self._cached_value)
+        cmd = bytearray()
+        for start, data in runs:
+            if len(data) == 1:
+                cmd += bytes([CMD_WRITE, start, data[0]])
+            else:
+                cmd += bytes([CMD_BLOCK_WRITE, start, len(data)])
+                cmd += bytes(data)
+
+        try:
+            last_start, last_data = runs[-1]
+            if not self._complete_write(bytes(cmd), last_start + len(last_data) - 1):
+                return False
+        except serial.SerialException as e:
+            print(f"Write error: {e}")
+            return False
+
+        for start, data in runs:
+            for n, value in enumerate(data):
+                self._cache_store(start + n, value)
+        return True
+
+    def _complete_write(self, cmd: bytes, last_address: int) -> bool:
+        """
+        Send write command bytes and wait until the FPGA has applied them.
 
+        Args:
+            cmd: Encoded 'W' / 'B' command(s)
+            last_address: Last register address written by cmd (fence target)
+
+        Returns:
+            True if the write was sent (and confirmed in fenced mode)
+        """
+        if self.write_mode == WRITE_MODE_FENCED:
+            # Drop stale bytes so the fence reply is the first byte we see
+            self._discard_input()
+            self._transmit(cmd + bytes([CMD_READ, last_address & 0xFF]))
+            if len(self._receive(1, len(cmd) + READ_CMD_BYTES)) != 1:
+                print(f"Write not confirmed: no fence reply for address 0x{last_address & 0xFF:02X}")
+                return False
+            return True
+
+        self._transmit(cmd)
+        time.sleep(WRITE_SETTLE_TIME) # Wait for FPGA to process
+        if self._op:
+            self._mark('sleep')
+        self._discard_input() # Clear any response
+        return True
+
+    def _receive(self, length: int, sent: int = 0, settle: float = 0.0, block_length: int = 0) -> memoryview:
+        """
+        Receive a reply of known length through the RX decoder.
+
+        Blocks in select() on the port until the reply bytes are in or the
+        reply deadline passes: the wire time of the command and reply at the
+        current baud rate plus the measured rtt and rx_margin. No polling or
+        sleeps, so a lost byte fails after milliseconds instead of seconds.
+        Unsolicited "DBG: " frames are removed from the reply stream.
+
+        Args:
+            length: Reply bytes expected
+            sent: Command bytes just written (their wire time precedes the reply)
+            settle: Keep collecting bytes that arrive within this time after
+                    the reply (block read over-send)
+            block_length: The last block_length reply bytes are a block read
+                          reply; with settle only its last bytes are kept
+
+        Returns:
+            View of the reply bytes, shorter than length on timeout. Only
+            valid until the next receive.
+        """
+        fd = self.serial.fileno()
+        decoder = self.rx_decoder
+        decoder.reset()
+        keep_last = bool(settle and block_length)
+        if keep_last and length > block_length:
+            decoder.expect(length - block_length)
+        decoder.expect(block_length if keep_last else length, keep_last=keep_last)
+
+        wire = (sent + length) * BITS_PER_BYTE / self.baudrate
+        deadline = time.perf_counter() + wire + (self.rtt or 0.0) + self.rx_margin
+        lookahead = len(DEBUG_PREFIX) * BITS_PER_BYTE / self.baudrate + self.rx_lookahead
+        first_byte = True
+        while decoder.received < length:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            if not select.select([fd], [], [], min(remaining, lookahead) if decoder.waiting else remaining)[0]:
+                if not decoder.waiting:
+                    break
+                # A reply byte that looked like the start of a debug frame
+                decoder.decode(final=True)
+                continue
+            if self._fill(fd) == 0:
+                break
+            if first_byte and self._op:
+                self._mark('first_byte')
+            first_byte = False
+            decoder.decode()
+
+        if self.metrics is not None:
+            if self._op and not first_byte:
+                self._mark('receive')
+            if decoder.received == 0:
+                self.metrics.count('timeouts')
+            elif decoder.received < length:
+                self.metrics.count('short_reads')
+
+        if keep_last and decoder.received >= length:
+            overrun = decoder.stats['overrun_bytes']
+            while select.select([fd], [], [], settle)[0] and self._fill(fd):
+                decoder.decode()
+            decoder.decode(final=True)
+            decoder.close()
+            if self.metrics is not None:
+                if self._op:
+                    self._mark('settle')
+                if decoder.stats['overrun_bytes'] > overrun:
+                    self.metrics.count('overlong_block_reads')
+                    self.metrics.count('overrun_bytes', decoder.stats['overrun_bytes'] - overrun)
+        return decoder.view(min(decoder.received, length))
+
+    def _transmit(self, cmd: bytes):
+        """Send command bytes (write + flush)."""
+        if self._op:
+            self._mark('encode')
+        if self.tracer:
+            self.tracer.tx(cmd)
+        self.serial.write(cmd)
+        self.serial.flush()
+        if self._op:
+            self._mark('write')
+
+    def _discard_input(self):
+        """
+        Drop pending input bytes (recorded as RX first when tracing).
+
+        The bytes go through the RX decoder, so a debug frame cut in half by
+        the discard is still removed when the rest of it arrives.
+        """
+        pending = self.serial.in_waiting
+        data = self.serial.read(pending) if pending else b''
+        if self.tracer and data:
+            self.tracer.rx(data)
+        self.rx_decoder.discard(data)
+
+    def _mark(self, phase: str):
+        """Record the phase of the current operation that ends now."""
+        now = time.perf_counter()
+        self.metrics.observe(self._op, phase, now - self._phase_start)
+        self._phase_start = now
+
+    def _fill(self, fd: int) -> int:
+        """Read available port bytes into the RX decoder, 0 if the port went away."""
+        try:
+            if self.tracer:
+                # Copy path so the trace sees the bytes
+                data = os.read(fd, self.rx_decoder.free)
+                self.rx_decoder.feed(data)
+                self.tracer.rx(data)
+                return len(data)
+            return self.rx_decoder.fill(fd)
+        except BlockingIOError:
+            return 0
+        except OSError as e:
+            raise serial.SerialException(f"read failed: {e}")
+
+    @_instrumented('write_register')
     def write_register(self, address: int, data: int) -> bool:
         """
         Write single byte to register.
@@ -107,18 +687,22 @@ class FPGAUartInterface:
             print("UART not connected")
             return False
 
+        if self._pending_writes is not None:
+            self._pending_writes[address & 0xFF] = data & 0xFF
+            return True
+
         try:
             # Send: 'W' + address + data
-            cmd = bytes([ord('W'), address & 0xFF, data & 0xFF])
-            self.serial.write(cmd)
-            self.serial.flush()
-            time.sleep(0.05) # Wait for FPGA to process
-            self.serial.reset_input_buffer() # Clear any response
+            cmd = bytes([CMD_WRITE, address & 0xFF, data & 0xFF])
+            if not self._complete_write(cmd, address):
+                return False
+            self._cache_store(address, data)
             return True
         except serial.SerialException as e:
             print(f"Write error: {e}")
             return False
 
+    @_instrumented('read_register')
     def read_register(self, address: int) -> Optional[int]:
         """
         Read single byte from register.
@@ -133,18 +717,22 @@ class FPGAUartInterface:
             print("UART not connected")
             return None
 
+        cached = self._cache_lookup(address)
+        if cached is not None:
+            return cached
+
         try:
             # Clear input buffer before read
-            self.serial.reset_input_buffer()
+            self._discard_input()
 
             # Send: 'R' + address
-            cmd = bytes([ord('R'), address & 0xFF])
-            self.serial.write(cmd)
-            self.serial.flush()
+            cmd = bytes([CMD_READ, address & 0xFF])
+            self._transmit(cmd)
 
             # Read response
-            response = self.serial.read(1)
+            response = self._receive(1, READ_CMD_BYTES)
             if len(response) == 1:
+                self._cache_store(address, response[0])
                 return response[0]
             else:
                 print(f"Read timeout on address 0x{address:02X}")
@@ -154,6 +742,165 @@ class FPGAUartInterface:
             print(f"Read error: {e}")
             return None
 
+    @_instrumented('read_many')
+    def read_many(self, addresses: List[int]) -> Optional[List[int]]:
+        """
+        Read several registers with one pipelined burst of single reads.
+
+        All 'R' + address commands are written at once and the replies are
+        taken in order from the same stream, so N reads cost about one round
+        trip instead of N. The whole burst shares one read timeout.
+
+        Args:
+            addresses: Register addresses (0-255), duplicates allowed
+
+        Returns:
+            List of data bytes in the order of addresses, None if error
+        """
+        if not self.serial or not self.serial.is_open:
+            print("UART not connected")
+            return None
+
+        values = [self._cache_lookup(address) for address in addresses]
+        misses = [address for address, value in zip(addresses, values) if value is None]
+        if len(misses) == 0:
+            return values
+
+        try:
+            # Clear input buffer so replies line up with the commands
+            self._discard_input()
+
+            # Send: 'R' + address for every address in a single write
+            cmd = bytearray()
+            for address in misses:
+                cmd += bytes([CMD_READ, address & 0xFF])
+            self._transmit(cmd)
+
+            # Read all replies against a single deadline
+            response = self._receive(len(misses), len(cmd))
+            if len(response) < len(misses):
+                print(f"Read timeout: got {len(response)} of {len(misses)} replies")
+                return None
+
+            replies = iter(response)
+            for n, value in enumerate(values):
+                if value is None:
+                    values[n] = next(replies)
+                    self._cache_store(addresses[n], values[n])
+            return values
+
+        except serial.SerialException as e:
+            print(f"Read error: {e}")
+            return None
+
+    def measure_rtt(self, samples: int = 5) -> Optional[float]:
+        """
+        Measure the round trip overhead of a single read beyond its wire time.
+
+        Args:
+            samples: Number of 'R' round trips to time (median is used)
+
+        Returns:
+            Round trip overhead in seconds (also stored in self.rtt), None if error
+        """
+        wire = (READ_CMD_BYTES + 1) * BITS_PER_BYTE / self.baudrate
+        times = []
+        cache_enabled, self.cache_enabled = self.cache_enabled, False
+        try:
+            for _ in range(samples):
+                start = time.perf_counter()
+                if self.read_register(0x00) is None:
+                    return None
+                times.append(time.perf_counter() - start)
+        finally:
+            self.cache_enabled = cache_enabled
+        self.rtt = max(statistics.median(times) - wire, 0.0)
+        return self.rtt
+
+    @_instrumented('read_planned')
+    def read_planned(self, addresses: List[int]) -> Optional[List[int]]:
+        """
+        Read an arbitrary set of registers with the cheapest mix of commands.
+
+        plan_reads() decides, from the measured round trip time and the wire
+        cost per byte, which addresses are read with pipelined 'R' commands
+        and which ranges are covered by 'b' block reads.
+
+        Args:
+            addresses: Register addresses (0-255), any order, duplicates allowed
+
+        Returns:
+            List of data bytes in the order of addresses, None if error
+        """
+        if not self.serial or not self.serial.is_open:
+            print("UART not connected")
+            return None
+
+        if len(addresses) == 0:
+            return []
+
+        values = {}
+        for address in set(a & 0xFF for a in addresses):
+            cached = self._cache_lookup(address)
+            if cached is not None:
+                values[address] = cached
+        misses = [a for a in addresses if (a & 0xFF) not in values]
+        if len(misses) == 0:
+            return [values[address & 0xFF] for address in addresses]
+
+        if self.rtt is None and self.measure_rtt() is None:
+            return None
+
+        plan, _ = plan_reads(misses, self.rtt, self.baudrate, self.block_overrun_settle)
+        singles = [op for op in plan if op[0] == 'R']
+        blocks = [op for op in plan if op[0] == 'b']
+
+        # First burst: all single reads plus the block read that shares the burst
+        shared = blocks.pop(0) if blocks and plan[0][0] == 'b' else None
+        if singles or shared:
+            try:
+                self._discard_input()
+                cmd = bytearray()
+                for _, address, _ in singles:
+                    cmd += bytes([CMD_READ, address])
+                expected = len(singles)
+                if shared:
+                    # The block read goes last: uart_if.v drops commands
+                    # that arrive while its reply is queued
+                    cmd += bytes([CMD_BLOCK_READ, shared[1], shared[2]])
+                    expected += shared[2]
+                self._transmit(cmd)
+
+                # Block read over-send: correct data is at the end
+                response = self._receive(expected, len(cmd), self.block_overrun_settle,
+                                         shared[2] if shared else 0)
+                if len(response) < expected:
+                    print(f"Planned read timeout: got {len(response)} of {expected} bytes")
+                    return None
+
+                for n, (_, address, _) in enumerate(singles):
+                    values[address] = response[n]
+                if shared:
+                    for n, value in enumerate(response[len(singles):]):
+                        values[(shared[1] + n) & 0xFF] = value
+
+            except serial.SerialException as e:
+                print(f"Planned read error: {e}")
+                return None
+
+        # Remaining block reads each need their own round trip
+        for _, start, length in blocks:
+            data = self.read_block(start, length)
+            if data is None:
+                return None
+            for n, value in enumerate(data):
+                values[(start + n) & 0xFF] = value
+
+        for address in misses:
+            self._cache_store(address, values[address & 0xFF])
+        return [values[address & 0xFF] for address in addresses]
+
+    @_instrumented('write_block')
     def write_block(self, start_address: int, data: List[int]) -> bool:
         """
         Write block of bytes to consecutive registers.
@@ -173,19 +920,25 @@ class FPGAUartInterface:
             print("Invalid block size (1-255 bytes)")
             return False
 
+        if self._pending_writes is not None:
+            for n, value in enumerate(data):
+                self._pending_writes[(start_address + n) & 0xFF] = value & 0xFF
+            return True
+
         try:
             # Send: 'B' + start_address + length + data[0] + data[1] + ...
-            cmd = bytes([ord('B'), start_address & 0xFF, len(data)])
+            cmd = bytes([CMD_BLOCK_WRITE, start_address & 0xFF, len(data)])
             cmd += bytes([d & 0xFF for d in data])
-            self.serial.write(cmd)
-            self.serial.flush()
-            time.sleep(0.05) # Wait for FPGA to process
-            self.serial.reset_input_buffer() # Clear any response
+            if not self._complete_write(cmd, start_address + len(data) - 1):
+                return False
+            for n, value in enumerate(data):
+                self._cache_store(start_address + n, value)
             return True
         except serial.SerialException as e:
             print(f"Block write error: {e}")
             return False
 
+    @_instrumented('read_block')
     def read_block(self, start_address: int, length: int) -> Optional[List[int]]:
         """
         Read block of bytes from consecutive registers.
@@ -207,51 +960,192 @@ class FPGAUartInterface:
 
         try:
             # Clear input buffer before read
-            self.serial.reset_input_buffer()
+            self._discard_input()
 
             # Send: 'b' + start_address + length
-            cmd = bytes([ord('b'), start_address & 0xFF, length])
-            self.serial.write(cmd)
-            self.serial.flush()
-
-            # WORKAROUND: FPGA sends too much data, need to find the correct bytes
-            # Use a shorter timeout per byte and read with inter-byte timeout
-            # Read in chunks with small delays to handle FPGA buffer issues
-            response = b''
-            start_time = time.time()
-            # Scale timeout with length: 100ms base + 50ms per byte, max 1 second
-            max_wait = min(0.1 + (length * 0.05), 1.0)
-
-            # Read available data in small bursts
-            while len(response) < length and (time.time() - start_time) < max_wait:
-                if self.serial.in_waiting > 0:
-                    chunk = self.serial.read(self.serial.in_waiting)
-                    response += chunk
-                else:
-                    time.sleep(0.01)  # Small delay between checks
-
-            # If we still haven't got enough, try one more blocking read
-            if len(response) < length:
-                remaining = length - len(response)
-                response += self.serial.read(remaining)
+            cmd = bytes([CMD_BLOCK_READ, start_address & 0xFF, length])
+            self._transmit(cmd)
 
+            # WORKAROUND: FPGA may send more bytes than requested, the
+            # decoder keeps the last length bytes (the correct data)
+            response = self._receive(length, BLOCK_READ_CMD_BYTES, self.block_overrun_settle, length)
             if len(response) < length:
                 print(f"Block read timeout: got {len(response)} of {length} bytes")
                 return None
+            data = list(response)
 
-            # FPGA sends correct data at the end of the response
-            # Find the last occurrence of the expected length
-            if len(response) > length:
-                # Take the last 'length' bytes which should be the correct data
-                correct_data = response[-length:]
-                return list(correct_data)
-            else:
-                return list(response[:length])
+            for n, value in enumerate(data):
+                self._cache_store(start_address + n, value)
+            return data
 
         except serial.SerialException as e:
             print(f"Block read error: {e}")
             return None
 
+    @_instrumented('burst')
+    def burst(self, cmd: bytes, reply_length: int = 0, block_length: int = 0) -> Optional[bytes]:
+        """
+        Send raw command bytes as one burst and receive their replies.
+
+        For tools that build their own command sequences. Pending input is
+        discarded first and the replies are received like those of every
+        other operation: against the wire-time deadline, with debug frames
+        removed, and recorded by metrics and traces. A block read must be
+        the last command of the burst (uart_if.v ignores commands while its
+        reply is queued). The commands may write any register, so the
+        shadow cache is invalidated.
+
+        Args:
+            cmd: Encoded 'W' / 'R' / 'B' / 'b' commands
+            reply_length: Total reply bytes expected
+            block_length: Length of a trailing block read reply (0 if none);
+                          its over-send bytes are dropped
+
+        Returns:
+            Reply bytes, shorter than reply_length on timeout; None if not
+            connected or on a serial error
+        """
+        if not self.serial or not self.serial.is_open:
+            print("UART not connected")
+            return None
+
+        self.invalidate_cache()
+        try:
+            self._discard_input()
+            self._transmit(bytes(cmd))
+            settle = self.block_overrun_settle if block_length else 0.0
+            return bytes(self._receive(reply_length, len(cmd), settle, block_length))
+        except serial.SerialException as e:
+            print(f"Burst error: {e}")
+            return None
+
+    @_instrumented('write_verify')
+    def write_verify(self, writes: Dict[int, int]) -> Optional[Dict[int, Tuple[int, int]]]:
+        """
+        Write a set of registers and read them back in the same burst.
+
+        The writes go out as in write_coalesced(), followed by pipelined 'R'
+        readbacks (at most one trailing 'b' where plan_reads() prefers a block
+        read), so verification costs one round trip and no sleep. Values are
+        compared under the writable bits of mapped registers (readonly fields
+        are skipped) and all bits of unmapped addresses.
+
+        Args:
+            writes: Address -> data byte
+
+        Returns:
+            Dictionary address -> (written, read back) of mismatching
+            registers (empty if all verified), None if error
+        """
+        if not self.serial or not self.serial.is_open:
+            print("UART not connected")
+            return None
+
+        if self._pending_writes is not None:
+            print("write_verify cannot be used inside a transaction")
+            return None
+
+        if len(writes) == 0:
+            return {}
+
+        writes = {a & 0xFF: d & 0xFF for a, d in writes.items()}
+        runs = coalesce_writes(writes, fill=self._cached_value)
+
+        # One burst: expand all but the first shared block read into single reads
+        plan, _ = plan_reads(list(writes), self.rtt or DEFAULT_RTT, self.baudrate, self.block_overrun_settle)
+        block = plan[0] if plan[0][0] == 'b' else None
+        singles = [address for op, start, length in plan if (op, start, length) != block
+                   for address in range(start, start + length)]
+        return self._write_and_verify(runs, singles, block, writes)
+
+    @_instrumented('write_block_verify')
+    def write_block_verify(self, start_address: int, data: List[int]) -> Optional[Dict[int, Tuple[int, int]]]:
+        """
+        Block write followed by a block read of the same range in one burst.
+
+        Args:
+            start_address: Starting register address
+            data: List of data bytes to write (1-255)
+
+        Returns:
+            Dictionary address -> (written, read back) of mismatching
+            registers (empty if all verified), None if error
+        """
+        if not self.serial or not self.serial.is_open:
+            print("UART not connected")
+            return None
+
+        if self._pending_writes is not None:
+            print("write_block_verify cannot be used inside a transaction")
+            return None
+
+        if len(data) == 0 or len(data) > 255 or start_address + len(data) > 256:
+            print("Invalid block size (1-255 bytes within 0x00-0xFF)")
+            return None
+
+        data = [d & 0xFF for d in data]
+        writes = {start_address + n: value for n, value in enumerate(data)}
+        if len(data) == 1:
+            return self._write_and_verify([(start_address, data)], [start_address], None, writes)
+        return self._write_and_verify([(start_address, data)], [], ('b', start_address, len(data)), writes)
+
+    def _write_and_verify(self, runs: List[Tuple[int, List[int]]], singles: List[int],
+                          block: Optional[Tuple[str, int, int]],
+                          writes: Dict[int, int]) -> Optional[Dict[int, Tuple[int, int]]]:
+        """
+        Send write runs plus readbacks as one burst and compare.
+
+        Args:
+            runs: (start_address, data) write runs, sent in order
+            singles: Addresses read back with 'R'
+            block: Trailing ('b', start, length) readback or None
+            writes: Address -> data byte to verify
+
+        Returns:
+            Mismatch dictionary, None if error
+        """
+        cmd = bytearray()
+        for start, data in runs:
+            if len(data) == 1:
+                cmd += bytes([CMD_WRITE, start, data[0]])
+            else:
+                cmd += bytes([CMD_BLOCK_WRITE, start, len(data)])
+                cmd += bytes(data)
+        for address in singles:
+            cmd += bytes([CMD_READ, address])
+        expected = len(singles)
+        if block:
+            # The block read goes last: uart_if.v drops commands while its reply is queued
+            cmd += bytes([CMD_BLOCK_READ, block[1], block[2]])
+            expected += block[2]
+
+        try:
+            self._discard_input()
+            self._transmit(bytes(cmd))
+            response = self._receive(expected, len(cmd), self.block_overrun_settle if block else 0.0,
+                                     block[2] if block else 0)
+            if len(response) < expected:
+                print(f"Write not verified: got {len(response)} of {expected} readback bytes")
+                return None
+        except serial.SerialException as e:
+            print(f"Write error: {e}")
+            return None
+
+        readback = dict(zip(singles, response))
+        if block:
+            for n, value in enumerate(response[len(singles):]):
+                readback[block[1] + n] = value
+
+        regmap = self.regmap
+        mismatches = {}
+        for address, data in writes.items():
+            value = readback[address]
+            self._cache_store(address, value)
+            mask = regmap.writable[address] if address in regmap.by_address else 0xFF
+            if (value ^ data) & mask:
+                mismatches[address] = (data, value)
+        return mismatches
+
     def set_pwm_duty(self, duty_percent: float) -> bool:
         """
         Set PWM duty cycle as percentage.
@@ -318,25 +1212,14 @@ class FPGAUartInterface:
         Returns:
             True if successful, False otherwise
         """
-        # Read current value
-        current = self.read_register(self.registers['sys_cfg_control'])
-        if current is None:
-            return False
-
-        # Modify bits as requested
+        values = {}
         if enable_stuf is not None:
-            if enable_stuf:
-                current |= 0x01  # Set bit 0
-            else:
-                current &= ~0x01  # Clear bit 0
-
+            values['sys_cfg.enable_stuf'] = int(bool(enable_stuf))
         if enable_other is not None:
-            if enable_other:
-                current |= 0x02  # Set bit 1
-            else:
-                current &= ~0x02  # Clear bit 1
+            values['sys_cfg.enable_other'] = int(bool(enable_other))
 
-        return self.write_register(self.registers['sys_cfg_control'], current)
+        # One read-modify-write of the sys_cfg control register
+        return self.fields.update(values)
 
     def get_sys_cfg_status(self) -> Optional[dict]:
         """
@@ -345,19 +1228,110 @@ class FPGAUartInterface:
         Returns:
             Dictionary with status bits if successful, None if error
         """
-        value = self.read_register(self.registers['sys_cfg_control'])
-        if value is not None:
-            return {
-                'enable_stuf': bool(value & 0x01),
-                'enable_other': bool(value & 0x02),
-                'monitor_flag': bool(value & 0x04)  # Read-only bit
-            }
+        values = self.fields.read(['sys_cfg.enable_stuf', 'sys_cfg.enable_other',
+                                   'sys_cfg.monitor_flag'])  # monitor_flag is read-only
+        if values is not None:
+            return {symbol.split('.')[-1]: bool(value) for symbol, value in values.items()}
         return None
 
+    def _read_chunks(self, start_addr: int, end_addr: int) -> Iterator[Tuple[int, int, Optional[List[int]]]]:
+        """
+        Read an address range with block reads of at most MAX_BLOCK_LENGTH bytes.
+
+        Yields:
+            (chunk_start, chunk_length, data) - data is None if that chunk failed
+        """
+        addr = start_addr
+        while addr <= end_addr:
+            length = min(end_addr - addr + 1, MAX_BLOCK_LENGTH)
+            yield addr, length, self.read_block(addr, length)
+            addr += length
+
+    def read_range(self, start_addr: int, end_addr: int) -> Optional[List[int]]:
+        """
+        Read an inclusive address range using chunked block reads.
+
+        Args:
+            start_addr: First address (0-255)
+            end_addr: Last address (0-255, >= start_addr)
+
+        Returns:
+            List of data bytes if successful, None if any chunk failed
+        """
+        values = []
+        for _, _, data in self._read_chunks(start_addr, end_addr):
+            if data is None:
+                return None
+            values.extend(data)
+        return values
+
+    def apply_config(self, path: str, dry_run: bool = False) -> Optional[Dict]:
+        """
+        Apply a JSON or TOML file of field values, writing only what differs.
+
+        The affected registers are read in one planned burst and the changed
+        bytes written with write_coalesced() (see register_config.py).
+
+        Args:
+            path: Configuration file ({symbol: value}, nested tables allowed)
+            dry_run: Read and diff but do not write
+
+        Returns:
+            Report dict (changed / unchanged fields, registers written), None if error
+        """
+        try:
+            values = load_config(path)
+        except (OSError, ValueError) as e:
+            print(f"Cannot load {path}: {e}")
+            return None
+        return apply_config(self, values, dry_run)
+
+    def scope(self, addresses: List[Union[int, str]], rate_hz: float, depth: int = 10000):
+        """
+        Start sampling registers at a fixed rate on a background thread.
+
+        Args:
+            addresses: Registers (addresses, names in self.registers or field symbols)
+            rate_hz: Target sample rate
+            depth: Samples kept in the ring buffer
+
+        Returns:
+            Running RegisterScope (see fpga_scope.py, needs numpy); do not use
+            this interface from other threads until scope.stop()
+        """
+        from fpga_scope import RegisterScope
+        return RegisterScope(self, addresses, rate_hz, depth).start()
+
+    def describe_register(self, address: int, value: int) -> str:
+        """
+        Describe a register value using the register map.
+
+        Args:
+            address: Register address
+            value: Register value
+
+        Returns:
+            Symbol and description for single-field registers, decoded field
+            values for registers holding several fields, '' if unmapped
+        """
+        fields = self.regmap.by_address.get(address)
+        if not fields:
+            return ""
+        if len(fields) == 1:
+            return f"{fields[0].symbol}: {fields[0].description}"
+
+        section = fields[0].symbol.split('.')[0]
+        parts = [f"{f.name}={f.extract(value)}{' (ro)' if f.readonly else ''}" for f in fields]
+        return f"{section}: {' '.join(parts)}"
+
     def dump_registers(self, start_addr: int = 0x00, end_addr: int = 0x4F) -> bool:
         """
         Dump register contents for debugging.
 
+        The range is fetched with block reads of up to 255 bytes, so the whole
+        0x00-0xFF space takes two transfers; a failed chunk only marks its own
+        addresses as ERROR.
+
         Args:
             start_addr: Starting address
             end_addr: Ending address
@@ -365,52 +1339,138 @@ class FPGAUartInterface:
         Returns:
             True if successful, False otherwise
         """
-        print(f"\nRegister dump (0x{start_addr:02X} - 0x{end_addr:02X}):")
-        print("Addr  Value  Binary   Description")
-        print("-" * 40)
+        lines = [f"\nRegister dump (0x{start_addr:02X} - 0x{end_addr:02X}):",
+                 "Addr  Value  Binary    Description",
+                 "-" * 60]
 
         success = True
-        for addr in range(start_addr, end_addr + 1):
-            value = self.read_register(addr)
-            if value is not None:
-                binary = f"{value:08b}"
-
-                # Add description for known registers
-                desc = ""
-                if addr == 0x00:
-                    desc = "sys_cfg control"
-                elif addr == 0x01:
-                    desc = f"PWM duty ({(value/255*100):.1f}%)"
-                elif addr == 0x02:
-                    desc = f"Debug LEDs (0x{value:02X})"
-                elif addr == 0x40:
-                    desc = "dsp_cfg control"
-
-                print(f"0x{addr:02X}  0x{value:02X}   {binary}  {desc}")
-            else:
-                print(f"0x{addr:02X}  ERROR")
+        for chunk_start, length, data in self._read_chunks(start_addr, end_addr):
+            if data is None:
                 success = False
+                lines.extend(f"0x{addr:02X}  ERROR" for addr in range(chunk_start, chunk_start + length))
+                continue
+            for addr, value in enumerate(data, chunk_start):
+                lines.append(f"0x{addr:02X}  0x{value:02X}   {value:08b}  {self.describe_register(addr, value)}")
 
+        print('\n'.join(lines))
         return success
 
 
+class FieldAccessor:
+    """
+    Symbol-addressed register field access for an FPGAUartInterface.
+
+    Fields are looked up by full symbol ('dsp_cfg.bp_filter_enable') or by an
+    unambiguous short name ('bp_filter_enable') in the compiled register map.
+    Several fields of one register given to update() are merged into a single
+    read-modify-write; registers that are fully covered need no read at all.
+    """
+
+    __slots__ = ('_fpga',)
+
+    def __init__(self, fpga: 'FPGAUartInterface'):
+        self._fpga = fpga
+
+    def __getitem__(self, symbol: str) -> Optional[int]:
+        field = self._fpga.regmap.resolve(symbol)
+        value = self._fpga.read_register(field.address)
+        return None if value is None else field.extract(value)
+
+    def __setitem__(self, symbol: str, value: int):
+        if not self.update({symbol: value}):
+            print(f"Failed to set {symbol}")
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._fpga.regmap
+
+    def __iter__(self):
+        return iter(self._fpga.regmap)
+
+    def __len__(self) -> int:
+        return len(self._fpga.regmap)
+
+    def read(self, symbols: List[str]) -> Optional[Dict[str, int]]:
+        """
+        Read several fields with one planned read of their registers.
+
+        Args:
+            symbols: Field symbols
+
+        Returns:
+            Dictionary symbol -> field value if successful, None if error
+        """
+        fields = [self._fpga.regmap.resolve(symbol) for symbol in symbols]
+        addresses = sorted(set(field.address for field in fields))
+        values = self._fpga.read_planned(addresses)
+        if values is None:
+            return None
+        by_address = dict(zip(addresses, values))
+        return {symbol: field.extract(by_address[field.address])
+                for symbol, field in zip(symbols, fields)}
+
+    def update(self, values: Dict[str, int]) -> bool:
+        """
+        Write several fields, merging fields of one register into one write.
+
+        Args:
+            values: Dictionary symbol -> field value
+
+        Returns:
+            True if successful, False otherwise
+        """
+        regmap = self._fpga.regmap
+        by_address = {}
+        for symbol, value in values.items():
+            field = regmap.resolve(symbol)
+            if field.readonly:
+                print(f"Field {field.symbol} is read-only")
+                return False
+            if not (0 <= value <= field.max_value):
+                print(f"Value {value} out of range for {field.symbol} (0-{field.max_value})")
+                return False
+            by_address.setdefault(field.address, []).append((field, value))
+
+        writes = {}
+        for address, updates in by_address.items():
+            covered = 0
+            for field, _ in updates:
+                covered |= field.mask
+            if covered & regmap.writable[address] == regmap.writable[address]:
+                current = 0  # Every writable bit is replaced, no read needed
+            else:
+                current = self._fpga._read_writable(address)
+                if current is None:
+                    return False
+            for field, value in updates:
+                current = field.insert(current, value)
+            writes[address] = current & 0xFF
+
+        if len(writes) == 1:
+            (address, data), = writes.items()
+            return self._fpga.write_register(address, data)
+        return self._fpga.write_coalesced(writes)
+
+
 def main():
     """Example usage and test of the FPGA UART interface."""
     print("FPGA UART Interface Test")
     print("========================")
 
-    # Try different common USB-to-serial ports
-    ports_to_try = ['/dev/ttyUSB0', '/dev/ttyUSB1', '/dev/ttyACM0']
-
-    fpga = None
-    for port in ports_to_try:
-        fpga = FPGAUartInterface(port=port)
-        if fpga.connect():
-            break
-        fpga = None
-
-    if not fpga:
-        print("Could not connect to FPGA on any port")
+    # Use the port given (e.g. an emulator pty) or find the board (see port_discovery.py)
+    from port_discovery import discover_port, forget
+    if len(sys.argv) > 1:
+        port = sys.argv[1]
+    else:
+        port = discover_port()
+        if port is None:
+            print("Could not find an FPGA on any port")
+            return
+
+    fpga = FPGAUartInterface(port=port)
+    if not fpga.connect():
+        if len(sys.argv) <= 1:
+            forget(port)  # Probe again next time
+        print(f"Could not connect to FPGA on {port}")
         return
 
     try:
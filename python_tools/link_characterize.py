@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+UART Link Characterization
+Sweeps candidate baud rates and runs pseudo-random loopback patterns against
+the writable registers of the register bank: each burst chains many random
+'W'/'B' writes, each read back with pipelined 'R' commands (a 'b' block read
+for the last one), and bursts repeat until --bytes pattern bytes were tested.
+For every rate it reports the bytes tested, throughput, bit error rate
+(compared under the writable bit masks) and round trip latency percentiles,
+then saves the fastest reliable rate as link profile, which
+FPGAUartInterface uses by default for that port.
+
+uart_if.v runs at the BAUD_RATE it was built with, so each rate needs a
+matching bitstream. Use --program to load one before each rate, e.g.
+    --program "openFPGALoader -b tangnano9k build/fpga_template_{baud}.fs"
+Without --program every rate is tried against the loaded bitstream and rates
+that do not match are reported as unreachable.
+
+Usage:
+    python3 link_characterize.py /dev/ttyUSB1 --rates 115200 460800 921600
+    python3 link_characterize.py /dev/pts/5 --bytes 5000 --no-save
+"""
+
+import argparse
+import random
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+import serial
+
+from fpga_uart_interface import (BITS_PER_BYTE, CMD_BLOCK_READ, CMD_BLOCK_WRITE, CMD_READ, CMD_WRITE,
+                                 FPGAUartInterface, MAX_BLOCK_LENGTH)
+from link_profile import load_link_profile, save_link_profile
+from uart_stats import latency_summary
+
+CLK_FREQ = 27000000          # System clock of uart_if.v (CLK_FREQ parameter)
+MAX_CLOCK_ERROR = 0.02       # Baud rate error a UART receiver tolerates
+DEFAULT_RATES = [115200, 230400, 460800, 921600, 1000000, 1500000, 3000000]
+DEFAULT_TEST_BYTES = 20000   # Pattern bytes looped back per rate
+BURST_PATTERN_BYTES = 64     # Pattern bytes per loopback burst
+
+
+def clock_error(baudrate: int, clk_freq: int = CLK_FREQ) -> float:
+    """
+    Relative baud rate error of uart_if.v.
+
+    BIT_TIMER = CLK_FREQ / BAUD_RATE (truncated) is loaded into the bit
+    divider, which counts down to 0, so every bit takes BIT_TIMER + 1 clocks.
+
+    Returns:
+        Actual / requested rate - 1
+    """
+    bit_timer = clk_freq // baudrate
+    return clk_freq / (bit_timer + 1) / baudrate - 1.0
+
+
+def writable_runs(fpga: FPGAUartInterface) -> List[Tuple[int, List[int]]]:
+    """
+    Runs of consecutive addresses that hold writable bits.
+
+    Returns:
+        List of (start_address, [writable mask per address])
+    """
+    runs = []
+    writable = fpga.regmap.writable
+    for address in range(256):
+        if not writable[address]:
+            continue
+        if runs and runs[-1][0] + len(runs[-1][1]) == address and len(runs[-1][1]) < MAX_BLOCK_LENGTH:
+            runs[-1][1].append(writable[address])
+        else:
+            runs.append((address, [writable[address]]))
+    return runs
+
+
+def loopback_burst(fpga: FPGAUartInterface, runs: List[Tuple[int, List[int]]], pattern_bytes: int,
+                   rng: random.Random) -> Tuple[Optional[int], int, int, int, float]:
+    """
+    Send one burst of random loopback segments and check the data read back.
+
+    Each segment writes a random pattern to a random register run with 'W'
+    or 'B' commands and reads it back before the next segment overwrites it,
+    with pipelined 'R' commands, or a 'b' block read for the last segment
+    since uart_if.v drops commands behind it. Segments are added until the
+    burst covers pattern_bytes bytes.
+
+    Returns:
+        (bit_errors or None if replies were lost, bits compared, bytes tested,
+         wire bytes, round trip seconds)
+    """
+    cmd = bytearray()
+    pattern = []
+    masks = []
+    while True:
+        start, run_masks = rng.choice(runs)
+        data = [rng.randrange(256) & mask for mask in run_masks]
+        if len(run_masks) > 1 and rng.random() < 0.5:
+            cmd += bytes([CMD_BLOCK_WRITE, start, len(data)]) + bytes(data)
+        else:
+            for n, value in enumerate(data):
+                cmd += bytes([CMD_WRITE, start + n, value])
+        pattern += data
+        masks += run_masks
+        if len(pattern) >= pattern_bytes:
+            cmd += bytes([CMD_BLOCK_READ, start, len(data)])
+            block_length = len(data)
+            break
+        for n in range(len(data)):
+            cmd += bytes([CMD_READ, start + n])
+    bits = sum(bin(mask).count('1') for mask in masks)
+
+    # burst() drains stale input (and partial debug frames) before sending
+    begin = time.perf_counter()
+    response = fpga.burst(cmd, len(pattern), block_length)
+    elapsed = time.perf_counter() - begin
+    if response is None or len(response) < len(pattern):
+        return None, bits, len(pattern), len(cmd) + len(response or b''), elapsed
+
+    errors = sum(bin((expected ^ got) & mask).count('1')
+                 for expected, got, mask in zip(pattern, response, masks))
+    return errors, bits, len(pattern), len(cmd) + len(pattern), elapsed
+
+
+def run_pattern(fpga: FPGAUartInterface, runs: List[Tuple[int, List[int]]], test_bytes: int,
+                rng: random.Random, result: Dict):
+    """Run loopback bursts until test_bytes pattern bytes were checked and fill in the result statistics."""
+    latencies = []
+    wire_bytes = 0
+    begin = time.perf_counter()
+    while result['bytes_tested'] < test_bytes:
+        pattern_bytes = min(BURST_PATTERN_BYTES, test_bytes - result['bytes_tested'])
+        errors, bits, tested, nbytes, elapsed = loopback_burst(fpga, runs, pattern_bytes, rng)
+        result['bursts'] += 1
+        result['bits'] += bits
+        result['bytes_tested'] += tested
+        wire_bytes += nbytes
+        if errors is None:
+            result['lost_replies'] += 1
+            continue
+        result['bit_errors'] += errors
+        latencies.append(elapsed)
+    total = time.perf_counter() - begin
+
+    result['ber'] = result['bit_errors'] / result['bits'] if result['bits'] else None
+    result['bytes_per_s'] = round(wire_bytes / total, 1) if total > 0 else 0.0
+    result['efficiency'] = round(result['bytes_per_s'] * BITS_PER_BYTE / fpga.baudrate, 3)
+    result['latency_ms'] = latency_summary(latencies)
+
+
+def characterize_rate(port: str, baudrate: int, test_bytes: int, seed: int,
+                      register_file: Optional[str] = None) -> Dict:
+    """
+    Run the loopback pattern at one baud rate.
+
+    Args:
+        test_bytes: Pattern bytes to write and read back
+
+    Returns:
+        Result dict (reachable, ber, throughput, latency percentiles, ...)
+    """
+    result = {'baudrate': baudrate, 'clock_error_pct': round(clock_error(baudrate) * 100.0, 3),
+              'reachable': False, 'bursts': 0, 'bytes_tested': 0, 'bit_errors': 0, 'bits': 0, 'lost_replies': 0,
+              'ber': None, 'bytes_per_s': 0.0, 'efficiency': 0.0, 'latency_ms': latency_summary([])}
+
+    fpga = FPGAUartInterface(port=port, baudrate=baudrate, verbose=False, register_file=register_file)
+    if not fpga.connect():
+        return result
+
+    rng = random.Random(seed)
+    runs = writable_runs(fpga)
+    if not runs:
+        print("No writable registers in the register map")
+        fpga.disconnect()
+        return result
+    try:
+        # Keep the current contents; a rate that cannot read them is unreachable
+        original = {}
+        for start, masks in runs:
+            original[start] = fpga.read_block(start, len(masks))
+            if original[start] is None:
+                return result
+
+        # Handshake: one loopback on the first run must come back intact
+        errors = loopback_burst(fpga, runs[:1], len(runs[0][1]), rng)[0]
+        if errors == 0:
+            result['reachable'] = True
+            run_pattern(fpga, runs, test_bytes, rng, result)
+
+        # Put back what was there before the test
+        for start, data in original.items():
+            fpga.write_block(start, data)
+    except serial.SerialException as e:
+        print(f"{baudrate} baud: {e}")
+    finally:
+        fpga.disconnect()
+    return result
+
+
+def is_reliable(result: Dict, max_ber: float) -> bool:
+    """
+    A rate is reliable when no reply was lost, the BER is within max_ber and
+    the FPGA clock divider hits the rate within MAX_CLOCK_ERROR.
+    """
+    return (result['reachable'] and result['lost_replies'] == 0 and result['ber'] is not None
+            and result['ber'] <= max_ber and abs(result['clock_error_pct']) <= MAX_CLOCK_ERROR * 100.0)
+
+
+def print_results(results: List[Dict], max_ber: float):
+    """Print one line per characterized rate."""
+    print(f"\n{'Baud':>8}  {'ClkErr%':>7}  {'Bytes':>7}  {'BER':>9}  {'Lost':>4}  {'Bytes/s':>9}  {'Eff':>5}  "
+          f"{'p50 ms':>7}  {'p95 ms':>7}  {'p99 ms':>7}  Status")
+    print("-" * 101)
+    for r in results:
+        if not r['reachable']:
+            print(f"{r['baudrate']:>8}  {r['clock_error_pct']:>7.2f}  {'-':>7}  {'-':>9}  {'-':>4}  {'-':>9}  {'-':>5}  "
+                  f"{'-':>7}  {'-':>7}  {'-':>7}  unreachable")
+            continue
+        lat = r['latency_ms']
+        if abs(r['clock_error_pct']) > MAX_CLOCK_ERROR * 100.0:
+            status = 'clock error'
+        else:
+            status = 'ok' if is_reliable(r, max_ber) else 'unreliable'
+        print(f"{r['baudrate']:>8}  {r['clock_error_pct']:>7.2f}  {r['bytes_tested']:>7}  {r['ber']:>9.2e}  {r['lost_replies']:>4}  "
+              f"{r['bytes_per_s']:>9.0f}  {r['efficiency']:>5.2f}  {lat['p50'] or 0:>7.3f}  "
+              f"{lat['p95'] or 0:>7.3f}  {lat['p99'] or 0:>7.3f}  {status}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Characterize the FPGA UART link and pick the fastest reliable baud rate')
+    parser.add_argument('port', nargs='?', default='/dev/ttyUSB1', help='Serial port (default: /dev/ttyUSB1)')
+    parser.add_argument('--rates', type=int, nargs='+', default=DEFAULT_RATES, help='Baud rates to test')
+    parser.add_argument('--bytes', type=int, default=DEFAULT_TEST_BYTES,
+                        help=f'Pattern bytes to loop back per rate (default: {DEFAULT_TEST_BYTES})')
+    parser.add_argument('--seed', type=int, default=1, help='Pattern seed (default: 1)')
+    parser.add_argument('--max-ber', type=float, default=0.0, help='Highest acceptable bit error rate (default: 0)')
+    parser.add_argument('--program', help="Command run before each rate, '{baud}' is replaced by the rate")
+    parser.add_argument('--regfile', help='JSON register database (default: repo register map)')
+    parser.add_argument('--no-save', action='store_true', help='Do not save the selected rate')
+    args = parser.parse_args()
+
+    print(f"Characterizing {args.port}: {len(args.rates)} rates, {args.bytes} bytes each")
+    results = []
+    for baudrate in sorted(args.rates):
+        if args.program:
+            command = args.program.format(baud=baudrate)
+            print(f"Loading bitstream: {command}")
+            if subprocess.run(command, shell=True).returncode != 0:
+                print(f"Programming failed, skipping {baudrate} baud")
+                continue
+        print(f"Testing {baudrate} baud...")
+        results.append(characterize_rate(args.port, baudrate, args.bytes, args.seed, args.regfile))
+
+    print_results(results, args.max_ber)
+
+    reliable = [r for r in results if is_reliable(r, args.max_ber)]
+    if not reliable:
+        print("\nNo reliable rate found")
+        sys.exit(1)
+    best = max(reliable, key=lambda r: r['baudrate'])
+    print(f"\nFastest reliable rate: {best['baudrate']} baud ({best['bytes_per_s']:.0f} bytes/s)")
+
+    if not args.no_save:
+        previous = load_link_profile(args.port)
+        path = save_link_profile(args.port, {
+            'baudrate': best['baudrate'],
+            'measured': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'results': results,
+        })
+        if previous and previous.get('baudrate') != best['baudrate']:
+            print(f"Default rate for {args.port} changed from {previous.get('baudrate')} baud")
+        print(f"Saved link profile to {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+UART Link Profile
+Per-port link settings saved by link_characterize.py. FPGAUartInterface uses
+the saved baud rate when none is given, so a board whose bitstream runs
+uart_if.v at a faster BAUD_RATE is used at that rate automatically.
+
+Profiles live in ~/.config/fpga_template/link.json ($XDG_CONFIG_HOME is
+respected), keyed by port name:
+    {"/dev/ttyUSB1": {"baudrate": 921600, "measured": "...", "results": [...]}}
+"""
+
+import json
+import os
+from typing import Dict, Optional
+
+# Rate of uart_if.v as shipped (BAUD_RATE parameter)
+DEFAULT_BAUDRATE = 115200
+
+
+def profile_file() -> str:
+    """Path of the link profile file."""
+    base = os.environ.get('XDG_CONFIG_HOME') or os.path.join(os.path.expanduser('~'), '.config')
+    return os.path.join(base, 'fpga_template', 'link.json')
+
+
+def _load_all() -> Dict[str, Dict]:
+    try:
+        with open(profile_file()) as f:
+            profiles = json.load(f)
+        return profiles if isinstance(profiles, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def load_link_profile(port: str) -> Optional[Dict]:
+    """
+    Saved link profile of a port.
+
+    Args:
+        port: Serial port device as passed to FPGAUartInterface
+
+    Returns:
+        Profile dict, None if the port was never characterized
+    """
+    return _load_all().get(port)
+
+
+def save_link_profile(port: str, profile: Dict) -> str:
+    """
+    Store the link profile of a port, keeping those of other ports.
+
+    Args:
+        port: Serial port device
+        profile: Profile dict, must contain 'baudrate'
+
+    Returns:
+        Path of the profile file
+    """
+    profiles = _load_all()
+    profiles[port] = profile
+    path = profile_file()
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(profiles, f, indent=2)
+    os.replace(tmp_path, path)
+    return path
+
+
+def default_baudrate(port: str) -> int:
+    """Saved baud rate of a port, DEFAULT_BAUDRATE if none was saved."""
+    profile = load_link_profile(port)
+    try:
+        return int(profile['baudrate'])
+    except (TypeError, KeyError, ValueError):
+        return DEFAULT_BAUDRATE
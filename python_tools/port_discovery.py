@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+FPGA Port Discovery
+Finds the serial port(s) of boards running the register bank by probing all
+candidate ports in parallel with a short handshake, and caches the result so
+later connects skip probing.
+
+Candidates are /dev/ttyUSB* and /dev/ttyACM*. USB details come from sysfs:
+the JTAG interface of the Tang Nano's FT2232H (0403:6010, interface 0) is
+skipped without opening it.
+
+Handshake: one burst 'R' 0x03 'R' 0x00 'R' 0x02. Address 0x03 is unmapped
+and reads 0; registers 0x00 and 0x02 (debug_led) must have no bits set
+outside their register map fields. All three replies must arrive within the
+probe timeout. Writable registers are not compared against fixed values
+(their contents depend on what ran before), so the check is only
+plausibility: a device that answers every 'R' + address with exactly one
+0x00 byte would pass. Such false positives are possible; the cache keys
+them by USB identity, and `port_discovery.py --forget` clears them.
+
+Ports are opened with exclusive=True (flock) and skipped if that fails, so
+a port owned by a running tool or broker (FPGAUartInterface locks the ports
+it connects to) never sees probe commands.
+
+The mapping is cached in ~/.cache/fpga_template/ports.json keyed by USB
+serial number and interface (sysfs path for devices without serial number;
+non-USB ports are always probed), so a board is found again after it moved
+from ttyUSB1 to ttyUSB3.
+
+Usage:
+    port = discover_port()                  # cached or probed
+    python3 port_discovery.py [--no-cache] [--timeout 0.2] [port ...]
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import serial
+
+from fpga_uart_interface import CMD_READ, FPGAUartInterface
+
+SYSFS_TTY = '/sys/class/tty'
+CANDIDATE_PATTERNS = ['/dev/ttyUSB*', '/dev/ttyACM*']
+JTAG_INTERFACES = {('0403', '6010'): 0}     # (vendor, product) -> interface used for JTAG
+PROBE_TIMEOUT = 0.2
+SIGNATURE_ADDRESS = 0x03                     # Unmapped, reads 0
+CONTROL_ADDRESS = 0x00
+LED_ADDRESS = 0x02
+
+
+def cache_file() -> str:
+    """Path of the port mapping cache."""
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'fpga_template', 'ports.json')
+
+
+def _read_attr(directory: str, name: str) -> Optional[str]:
+    try:
+        with open(os.path.join(directory, name)) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def port_info(port: str) -> Dict:
+    """
+    USB details of a serial port from sysfs.
+
+    Returns:
+        Dict with port, key (cache key), sysfs, vendor, product, serial,
+        interface (None for fields that do not apply, e.g. non-USB ports)
+    """
+    info = {'port': port, 'key': port, 'sysfs': None, 'vendor': None, 'product': None,
+            'serial': None, 'interface': None}
+    device = os.path.join(SYSFS_TTY, os.path.basename(port), 'device')
+    if not os.path.exists(device):
+        return info
+
+    # Walk up to the USB interface (has bInterfaceNumber), its parent is the USB device
+    path = os.path.realpath(device)
+    while path != '/' and not os.path.exists(os.path.join(path, 'bInterfaceNumber')):
+        path = os.path.dirname(path)
+    if path == '/':
+        return info
+    usb_device = os.path.dirname(path)
+    interface = _read_attr(path, 'bInterfaceNumber')
+    info.update(sysfs=path, vendor=_read_attr(usb_device, 'idVendor'),
+                product=_read_attr(usb_device, 'idProduct'), serial=_read_attr(usb_device, 'serial'),
+                interface=int(interface, 16) if interface else None)
+    if info['serial']:
+        info['key'] = f"usb:{info['vendor']}:{info['product']}:{info['serial']}:{info['interface']}"
+    else:
+        info['key'] = f"sysfs:{path}"
+    return info
+
+
+def is_jtag(info: Dict) -> bool:
+    """True for the JTAG interface of a known programmer chip."""
+    jtag = JTAG_INTERFACES.get((info['vendor'], info['product']))
+    return jtag is not None and info['interface'] == jtag
+
+
+def candidate_ports() -> List[str]:
+    """Serial ports that may belong to a board, sorted by name."""
+    ports = []
+    for pattern in CANDIDATE_PATTERNS:
+        ports.extend(glob.glob(pattern))
+    return sorted(ports)
+
+
+def probe_port(port: str, baudrate: Optional[int] = None, timeout: float = PROBE_TIMEOUT) -> bool:
+    """
+    Check whether a port answers like the register bank.
+
+    Args:
+        port: Serial port
+        baudrate: Baud rate (default: saved link profile or 115200)
+        timeout: Reply deadline slack in seconds
+
+    Returns:
+        True if the handshake succeeded
+    """
+    fpga = FPGAUartInterface(port=port, baudrate=baudrate, timeout=timeout, verbose=False)
+    fpga.rx_margin = timeout
+    # A silent or busy port is expected here and must not print errors. A
+    # port locked by its owner (e.g. fpga_broker.py) is skipped untouched.
+    if not fpga.connect(quiet=True, exclusive=True):
+        return False
+    try:
+        cmd = bytes([CMD_READ, SIGNATURE_ADDRESS, CMD_READ, CONTROL_ADDRESS, CMD_READ, LED_ADDRESS])
+        values = fpga.burst(cmd, 3)
+        if values is None or len(values) < 3:
+            return False
+        regmap = fpga.regmap
+        for address, value in zip((CONTROL_ADDRESS, LED_ADDRESS), values[1:]):
+            if value & ~(regmap.writable[address] | regmap.readonly[address]) & 0xFF:
+                return False
+        return values[0] == 0
+    except (serial.SerialException, OSError):
+        return False
+    finally:
+        fpga.disconnect()
+
+
+def _load_cache() -> Dict[str, Dict]:
+    try:
+        with open(cache_file()) as f:
+            cache = json.load(f)
+        return cache if isinstance(cache, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(cache: Dict[str, Dict]):
+    path = cache_file()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(cache, f, indent=2)
+        os.replace(tmp_path, path)
+    except OSError:
+        pass
+
+
+def discover_ports(candidates: Optional[List[str]] = None, use_cache: bool = True,
+                   timeout: float = PROBE_TIMEOUT, verbose: bool = False,
+                   first_cached: bool = False) -> List[str]:
+    """
+    Find all ports with a responding board.
+
+    Cached boards whose USB identity is present again are returned without
+    probing; the remaining candidates are probed in parallel.
+
+    Args:
+        candidates: Ports to consider (default: candidate_ports())
+        use_cache: Use and update the port cache
+        timeout: Probe timeout in seconds
+        verbose: Print what happens per port
+        first_cached: Return only the first cached board if there is one,
+                      without probing the others
+
+    Returns:
+        Ports of boards, sorted by name
+    """
+    infos = [port_info(port) for port in (candidate_ports() if candidates is None else candidates)]
+    cache = _load_cache() if use_cache else {}
+    if first_cached:
+        for info in infos:
+            if info['sysfs'] and info['key'] in cache and not is_jtag(info):
+                if verbose:
+                    print(f"{info['port']}: cached board ({info['key']})")
+                return [info['port']]
+
+    found = []
+    to_probe = []
+    for info in infos:
+        if is_jtag(info):
+            if verbose:
+                print(f"{info['port']}: JTAG interface, skipped")
+        elif info['sysfs'] and info['key'] in cache:
+            if verbose:
+                print(f"{info['port']}: cached board ({info['key']})")
+            found.append(info)
+        else:
+            to_probe.append(info)
+
+    if to_probe:
+        with ThreadPoolExecutor(max_workers=len(to_probe)) as pool:
+            results = list(pool.map(lambda info: probe_port(info['port'], timeout=timeout), to_probe))
+        for info, ok in zip(to_probe, results):
+            if verbose:
+                print(f"{info['port']}: {'board found' if ok else 'no answer'}")
+            if ok:
+                found.append(info)
+
+    if use_cache:
+        # Only USB ports have an identity that survives renumbering
+        probed = [info for info in found if info['sysfs'] and info in to_probe]
+        for info in probed:
+            cache[info['key']] = {'port': info['port'], 'sysfs': info['sysfs'], 'serial': info['serial'],
+                                  'interface': info['interface'],
+                                  'verified': time.strftime('%Y-%m-%dT%H:%M:%S')}
+        if probed:
+            _save_cache(cache)
+    return sorted(info['port'] for info in found)
+
+
+def discover_port(candidates: Optional[List[str]] = None, use_cache: bool = True,
+                  timeout: float = PROBE_TIMEOUT, verbose: bool = False) -> Optional[str]:
+    """
+    Find the port of one board (the first by name if several respond).
+
+    Returns:
+        Port name, None if no board was found
+    """
+    ports = discover_ports(candidates, use_cache, timeout, verbose, first_cached=True)
+    return ports[0] if ports else None
+
+
+def forget(port: Optional[str] = None):
+    """Drop a port (default: all ports) from the cache, e.g. after a failed connect."""
+    cache = _load_cache()
+    if port is None:
+        cache = {}
+    else:
+        cache = {key: entry for key, entry in cache.items() if entry.get('port') != port}
+    _save_cache(cache)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Find serial ports of boards running the register bank')
+    parser.add_argument('ports', nargs='*', help='Ports to check (default: /dev/ttyUSB* and /dev/ttyACM*)')
+    parser.add_argument('--no-cache', action='store_true', help='Probe every port, ignore the cache')
+    parser.add_argument('--forget', action='store_true', help='Clear the cache before discovery')
+    parser.add_argument('--timeout', type=float, default=PROBE_TIMEOUT,
+                        help=f'Probe timeout in seconds (default: {PROBE_TIMEOUT})')
+    args = parser.parse_args()
+
+    if args.forget:
+        forget()
+    start = time.perf_counter()
+    ports = discover_ports(args.ports or None, not args.no_cache, args.timeout, verbose=True)
+    elapsed = time.perf_counter() - start
+    if not ports:
+        print(f"No board found ({elapsed * 1000:.0f} ms)")
+        return 1
+    print(f"Boards: {' '.join(ports)} ({elapsed * 1000:.0f} ms)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
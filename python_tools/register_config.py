@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Register Configuration Files
+Symbol-level board configurations in JSON or TOML, applied as a diff:
+the fields are packed into register bytes with the register map, the
+current contents of the affected registers are read in one planned burst,
+and only bytes whose writable bits change are written, merged into block
+writes in one burst.
+
+Keys are field symbols ('sys_cfg.pwm_duty') or unique short names; nested
+tables are joined with '.', so both files below are equivalent:
+
+    {"sys_cfg.pwm_duty": 64, "dsp_cfg": {"dc_filter_enable": true}}
+
+    [sys_cfg]
+    pwm_duty = 64
+    [dsp_cfg]
+    dc_filter_enable = true
+
+Values are integers, booleans or integer strings ("0x40").
+
+Usage:
+    report = fpga.apply_config('board.toml')
+    python3 register_config.py board.toml /dev/ttyUSB1 --dry-run
+"""
+
+import argparse
+import json
+import sys
+from typing import Dict, Optional
+
+
+def _flatten(table: Dict, prefix: str = '') -> Dict[str, object]:
+    values = {}
+    for key, value in table.items():
+        symbol = f"{prefix}{key}"
+        if isinstance(value, dict):
+            values.update(_flatten(value, symbol + '.'))
+        else:
+            values[symbol] = value
+    return values
+
+
+def load_config(path: str) -> Dict[str, int]:
+    """
+    Load a JSON or TOML (.toml, needs Python 3.11+) configuration file.
+
+    Args:
+        path: Configuration file
+
+    Returns:
+        Dictionary symbol -> field value
+
+    Raises:
+        ValueError: Unparsable file or value
+    """
+    if path.endswith('.toml'):
+        try:
+            import tomllib
+        except ImportError:
+            raise ValueError("TOML configurations need Python 3.11+ (tomllib)")
+        with open(path, 'rb') as f:
+            try:
+                table = tomllib.load(f)
+            except tomllib.TOMLDecodeError as e:
+                raise ValueError(f"{path}: {e}")
+    else:
+        with open(path) as f:
+            try:
+                table = json.load(f)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"{path}: {e}")
+    if not isinstance(table, dict):
+        raise ValueError(f"{path}: expected a table of field values")
+
+    values = {}
+    for symbol, value in _flatten(table).items():
+        if isinstance(value, bool):
+            value = int(value)
+        elif isinstance(value, str):
+            try:
+                value = int(value, 0)
+            except ValueError:
+                raise ValueError(f"{symbol}: invalid value '{value}'")
+        elif not isinstance(value, int):
+            raise ValueError(f"{symbol}: invalid value {value!r}")
+        values[symbol] = value
+    return values
+
+
+def apply_config(fpga, values: Dict[str, int], dry_run: bool = False) -> Optional[Dict]:
+    """
+    Write field values, touching only registers whose writable bits change.
+
+    Args:
+        fpga: Connected FPGAUartInterface
+        values: Dictionary symbol -> field value
+        dry_run: Read and diff but do not write
+
+    Returns:
+        Report dict, None if the configuration is invalid or a transfer failed:
+            changed   {symbol: (old, new)} fields that get a new value
+            unchanged [symbol] fields already at their value
+            registers {address: (old, new)} register bytes written
+            written   True if the writes were sent
+    """
+    regmap = fpga.regmap
+    by_address = {}
+    for symbol, value in values.items():
+        try:
+            field = regmap.resolve(symbol)
+        except KeyError:
+            print(f"Unknown field {symbol}")
+            return None
+        if field.readonly:
+            print(f"Field {field.symbol} is read-only")
+            return None
+        if not (0 <= value <= field.max_value):
+            print(f"Value {value} out of range for {field.symbol} (0-{field.max_value})")
+            return None
+        by_address.setdefault(field.address, []).append((field, value))
+
+    report = {'changed': {}, 'unchanged': [], 'registers': {}, 'written': False}
+    if not by_address:
+        return report
+
+    addresses = sorted(by_address)
+    current = fpga.read_planned(addresses)
+    if current is None:
+        print("Failed to read current register values")
+        return None
+
+    writes = {}
+    for address, old in zip(addresses, current):
+        new = old
+        for field, value in by_address[address]:
+            new = field.insert(new, value)
+            old_value = field.extract(old)
+            if old_value == value:
+                report['unchanged'].append(field.symbol)
+            else:
+                report['changed'][field.symbol] = (old_value, value)
+        if (new ^ old) & regmap.writable[address]:
+            writes[address] = new & 0xFF
+            report['registers'][address] = (old, new & 0xFF)
+
+    if writes and not dry_run:
+        if not fpga.write_coalesced(writes):
+            return None
+        report['written'] = True
+    return report
+
+
+def print_report(report: Dict):
+    """Print the changes of an apply_config() report."""
+    for symbol, (old, new) in sorted(report['changed'].items()):
+        print(f"  {symbol:<28} {old:>4} -> {new}")
+    registers = ', '.join(f"0x{a:02X}" for a in sorted(report['registers'])) or 'none'
+    print(f"{len(report['changed'])} fields changed, {len(report['unchanged'])} unchanged; "
+          f"registers {'written' if report['written'] else 'to write'}: {registers}")
+
+
+def main():
+    from fpga_uart_interface import FPGAUartInterface, WRITE_MODE_FENCED
+
+    parser = argparse.ArgumentParser(description='Apply a symbolic register configuration')
+    parser.add_argument('config', help='JSON or TOML configuration file')
+    parser.add_argument('port', nargs='?', default='/dev/ttyUSB1', help='Serial port (default: /dev/ttyUSB1)')
+    parser.add_argument('-b', '--baud', type=int, help='Baud rate (default: saved link profile or 115200)')
+    parser.add_argument('-n', '--dry-run', action='store_true', help='Show the changes without writing')
+    parser.add_argument('--regfile', help='JSON register database (default: repo register map)')
+    args = parser.parse_args()
+
+    try:
+        values = load_config(args.config)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    fpga = FPGAUartInterface(port=args.port, baudrate=args.baud, verbose=False,
+                             write_mode=WRITE_MODE_FENCED, register_file=args.regfile)
+    if not fpga.connect():
+        sys.exit(1)
+    try:
+        report = apply_config(fpga, values, args.dry_run)
+    finally:
+        fpga.disconnect()
+    if report is None:
+        sys.exit(1)
+    print_report(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Vectorized Register Field Decoding
+Decodes many register snapshots at once into a NumPy structured array with
+one column per register map field ('sys_cfg.pwm_duty',
+'dsp_cfg.dc_filter_enable', ...). The column index, mask and shift of every
+field are precomputed into arrays, so decoding N snapshots is a single
+gather + mask + shift over an (N, fields) array instead of per-value bit
+tests in Python.
+
+A snapshot is one row of register bytes; its layout is given by the list of
+addresses of its columns (e.g. range(0x00, 0x50) for block reads of
+0x00-0x4F, or the addresses sampled by fpga_scope.py). Fields whose register
+is not in the layout are left out.
+
+Requires numpy (pip install numpy).
+
+Usage:
+    decoder = FieldDecoder(fpga.regmap, range(0x00, 0x50))
+    fields = decoder.decode(snapshots)            # snapshots: uint8 [N, 0x50]
+    fields['dsp_cfg.dc_filter_enable'].mean()
+    python3 register_decode.py snapshots.bin --start 0x00 --length 0x50
+"""
+
+import argparse
+import sys
+import time
+from typing import Iterable, List, Optional, Sequence
+
+import numpy as np
+from numpy.lib import recfunctions
+
+from register_map import RegisterMap, compile_register_map
+
+
+class FieldDecoder:
+    """Precomputed column/mask/shift tables for decoding snapshots of a register layout."""
+
+    def __init__(self, regmap: RegisterMap, addresses: Iterable[int] = range(256),
+                 symbols: Optional[List[str]] = None):
+        """
+        Args:
+            regmap: Compiled register map
+            addresses: Register address of each snapshot column
+            symbols: Fields to decode (default: all fields in the layout);
+                     full symbols or unique short names
+
+        Raises:
+            KeyError: Unknown symbol or a requested field outside the layout
+        """
+        self.addresses = [a & 0xFF for a in addresses]
+        column_of = {}
+        for column, address in enumerate(self.addresses):
+            column_of.setdefault(address, column)
+
+        if symbols is None:
+            fields = [f for f in regmap.fields.values() if f.address in column_of]
+            fields.sort(key=lambda f: (f.address, f.shift))
+        else:
+            fields = [regmap.resolve(symbol) for symbol in symbols]
+            for field in fields:
+                if field.address not in column_of:
+                    raise KeyError(f"{field.symbol} (0x{field.address:02X}) is not in the snapshot layout")
+        self.fields = fields
+        self.symbols = [f.symbol for f in fields]
+        self.columns = np.array([column_of[f.address] for f in fields], dtype=np.intp)
+        self.masks = np.array([f.mask for f in fields], dtype=np.uint8)
+        self.shifts = np.array([f.shift for f in fields], dtype=np.uint8)
+        self.dtype = np.dtype([(symbol, np.uint8) for symbol in self.symbols])
+
+    def decode_array(self, snapshots) -> np.ndarray:
+        """
+        Decode into a plain uint8 array, one column per field (in self.symbols order).
+
+        Args:
+            snapshots: uint8 array-like [N, len(addresses)] (or one snapshot)
+        """
+        raw = np.asarray(snapshots, dtype=np.uint8)
+        if raw.ndim == 1:
+            raw = raw.reshape(1, -1)
+        if raw.shape[1] != len(self.addresses):
+            raise ValueError(f"snapshots have {raw.shape[1]} columns, layout has {len(self.addresses)}")
+        return (raw[:, self.columns] & self.masks) >> self.shifts
+
+    def decode(self, snapshots, timestamps: Optional[Sequence[float]] = None) -> np.ndarray:
+        """
+        Decode snapshots into a structured array with one column per field symbol.
+
+        Args:
+            snapshots: uint8 array-like [N, len(addresses)] (or one snapshot)
+            timestamps: Optional N timestamps, added as float64 column 't'
+
+        Returns:
+            Structured array of N records
+        """
+        values = recfunctions.unstructured_to_structured(self.decode_array(snapshots), self.dtype)
+        if timestamps is None:
+            return values
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        if len(timestamps) != len(values):
+            raise ValueError(f"{len(timestamps)} timestamps for {len(values)} snapshots")
+        result = np.empty(len(values), dtype=[('t', np.float64)] + self.dtype.descr)
+        result['t'] = timestamps
+        for symbol in self.symbols:
+            result[symbol] = values[symbol]
+        return result
+
+
+def read_snapshots(fpga, count: int, start_addr: int = 0x00, end_addr: int = 0x4F) -> Optional[np.ndarray]:
+    """
+    Take repeated block read snapshots of a register range.
+
+    Args:
+        fpga: Connected FPGAUartInterface
+        count: Number of snapshots
+        start_addr: First register
+        end_addr: Last register (inclusive)
+
+    Returns:
+        uint8 array [count, end_addr - start_addr + 1], None if a read failed
+    """
+    snapshots = np.empty((count, end_addr - start_addr + 1), dtype=np.uint8)
+    for n in range(count):
+        values = fpga.read_range(start_addr, end_addr)
+        if values is None:
+            return None
+        snapshots[n] = values
+    return snapshots
+
+
+def print_field_summary(fields: np.ndarray):
+    """Min/max/mean and number of value changes per field."""
+    print(f"{'Field':<32} {'min':>5} {'max':>5} {'mean':>9} {'changes':>8}")
+    print("-" * 63)
+    for symbol in fields.dtype.names:
+        if symbol == 't':
+            continue
+        column = fields[symbol]
+        changes = int(np.count_nonzero(np.diff(column))) if len(column) > 1 else 0
+        print(f"{symbol:<32} {column.min():>5} {column.max():>5} {column.mean():>9.3f} {changes:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Decode raw register snapshots into register map fields')
+    parser.add_argument('snapshots', help='Raw file of concatenated snapshots (or .npy uint8 [N, length])')
+    parser.add_argument('--start', type=lambda s: int(s, 0), default=0x00, help='First address (default: 0x00)')
+    parser.add_argument('--length', type=lambda s: int(s, 0), default=0x50, help='Bytes per snapshot (default: 0x50)')
+    parser.add_argument('--fields', nargs='+', help='Fields to decode (default: all in range)')
+    parser.add_argument('--regfile', help='JSON register database (default: repo register map)')
+    parser.add_argument('-o', '--output', help='Save the decoded structured array as .npy')
+    args = parser.parse_args()
+
+    try:
+        if args.snapshots.endswith('.npy'):
+            raw = np.load(args.snapshots)
+        else:
+            raw = np.fromfile(args.snapshots, dtype=np.uint8)
+            if len(raw) % args.length:
+                print(f"Warning: ignoring {len(raw) % args.length} trailing bytes")
+            raw = raw[:len(raw) - len(raw) % args.length].reshape(-1, args.length)
+        decoder = FieldDecoder(compile_register_map(args.regfile),
+                               range(args.start, args.start + raw.shape[1]), args.fields)
+    except (OSError, KeyError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    begin = time.perf_counter()
+    fields = decoder.decode(raw)
+    elapsed = time.perf_counter() - begin
+    print(f"Decoded {len(fields)} snapshots x {len(decoder.symbols)} fields in {elapsed * 1000:.1f} ms\n")
+    print_field_summary(fields)
+    if args.output:
+        np.save(args.output, fields)
+        print(f"\nSaved decoded fields to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Register Image
+Local 256-byte mirror of the FPGA register space. Code changes the image
+(as bytes, through a writable memoryview or as a NumPy array) and pays UART
+cost only for what actually differs from the hardware:
+
+    flush()        sends the changed bytes as the fewest 'B' block writes in
+                   one burst (runs of dirty bytes, small clean gaps bridged)
+    sync(ranges)   refreshes address ranges from hardware with 'b' reads
+
+Changes are found by comparing the image with a shadow copy of the last
+values read from or written to the hardware, under the writable bit mask of
+each mapped register (all bits for unmapped addresses), plus a 32-byte
+bitmap of addresses written through image[address] = value, which are sent
+even when equal to the shadow. Addresses never synced have a zero shadow,
+so sync() what you intend to modify through the memoryview.
+
+Usage:
+    image = RegisterImage(fpga)
+    image.sync([(0x00, 0x06), (0x40, 0x40)])
+    image[0x01] = 0x40
+    regs = image.array()          # NumPy view, writes go to the image
+    regs[0x02] = 0x15
+    image.flush()                 # one burst: 'B' 0x01 2 0x40 0x15
+"""
+
+from typing import List, Optional, Tuple
+
+from fpga_uart_interface import FPGAUartInterface, coalesce_writes
+
+Range = Tuple[int, int]     # Inclusive (start, end) address range
+
+
+class RegisterImage:
+    """Writable mirror of the register space with dirty tracking."""
+
+    def __init__(self, fpga: FPGAUartInterface):
+        """
+        Args:
+            fpga: Connected FPGAUartInterface
+        """
+        self.fpga = fpga
+        self._image = bytearray(256)
+        self.view = memoryview(self._image)    # Writable, e.g. numpy.frombuffer(image.view, 'u1')
+        self._shadow = bytearray(256)          # Last known hardware contents
+        self._known = bytearray(32)            # Bitmap: shadow holds hardware data
+        self._dirty = bytearray(32)            # Bitmap: explicitly written addresses
+        regmap = fpga.regmap
+        self._masks = bytes(regmap.writable[a] if a in regmap.by_address else 0xFF for a in range(256))
+        self.stats = {'flushes': 0, 'bytes_written': 0, 'block_writes': 0,
+                      'syncs': 0, 'bytes_read': 0}
+
+    @staticmethod
+    def _test(bitmap: bytearray, address: int) -> bool:
+        return bool(bitmap[address >> 3] & (1 << (address & 7)))
+
+    @staticmethod
+    def _set(bitmap: bytearray, start: int, end: int):
+        for address in range(start, end + 1):
+            bitmap[address >> 3] |= 1 << (address & 7)
+
+    @staticmethod
+    def _clear(bitmap: bytearray, start: int, end: int):
+        for address in range(start, end + 1):
+            bitmap[address >> 3] &= ~(1 << (address & 7)) & 0xFF
+
+    def __len__(self) -> int:
+        return 256
+
+    def __getitem__(self, key):
+        return self._image[key]
+
+    def __setitem__(self, key, value):
+        """Write bytes to the image and mark them dirty (int or slice key)."""
+        self._image[key] = value
+        if isinstance(key, slice):
+            start, stop, step = key.indices(256)
+            for address in range(start, stop, step):
+                self._set(self._dirty, address, address)
+        else:
+            address = key % 256
+            self._set(self._dirty, address, address)
+
+    def array(self):
+        """Writable NumPy uint8 view of the image (requires numpy)."""
+        import numpy
+        return numpy.frombuffer(self.view, dtype=numpy.uint8)
+
+    def mark_dirty(self, start: int, end: int):
+        """Force an inclusive address range to be written by the next flush()."""
+        self._set(self._dirty, start, end)
+
+    def dirty_addresses(self) -> List[int]:
+        """Addresses whose writable bits differ from the hardware or that were written explicitly."""
+        image, shadow, masks, dirty = self._image, self._shadow, self._masks, self._dirty
+        return [a for a in range(256)
+                if (image[a] ^ shadow[a]) & masks[a] or dirty[a >> 3] & (1 << (a & 7))]
+
+    def dirty_ranges(self) -> List[Range]:
+        """Dirty addresses as inclusive (start, end) ranges."""
+        ranges = []
+        for address in self.dirty_addresses():
+            if ranges and ranges[-1][1] == address - 1:
+                ranges[-1] = (ranges[-1][0], address)
+            else:
+                ranges.append((address, address))
+        return ranges
+
+    def flush(self) -> bool:
+        """
+        Write all dirty bytes in one burst of block writes.
+
+        Clean bytes between dirty runs are resent when that saves a command
+        header and their hardware value is known. Not available inside an
+        fpga.transaction(): the writes would only be buffered there, so the
+        image could not tell whether they reached the hardware.
+
+        Returns:
+            True if successful (or nothing to do), False otherwise
+        """
+        if self.fpga.in_transaction:
+            print("flush() cannot be used inside a transaction")
+            return False
+        addresses = self.dirty_addresses()
+        if not addresses:
+            return True
+
+        image = self._image
+        runs = coalesce_writes({a: image[a] for a in addresses},
+                               fill=lambda a: image[a] if self._test(self._known, a) else None)
+        fpga = self.fpga
+        with fpga.transaction():
+            for start, data in runs:
+                fpga.write_block(start, data)
+        if not fpga.last_transaction_ok:
+            return False
+
+        for start, data in runs:
+            end = start + len(data) - 1
+            self._shadow[start:end + 1] = image[start:end + 1]
+            self._set(self._known, start, end)
+            self._clear(self._dirty, start, end)
+            self.stats['bytes_written'] += len(data)
+        self.stats['block_writes'] += len(runs)
+        self.stats['flushes'] += 1
+        return True
+
+    def sync(self, ranges: Optional[List[Range]] = None) -> bool:
+        """
+        Refresh address ranges from the hardware with block reads.
+
+        Local changes in these ranges are discarded.
+
+        Args:
+            ranges: Inclusive (start, end) ranges (default: whole 0x00-0xFF space)
+
+        Returns:
+            True if all ranges were read, False otherwise
+        """
+        ok = True
+        for start, end in ranges or [(0x00, 0xFF)]:
+            values = self.fpga.read_range(start, end)
+            if values is None:
+                ok = False
+                continue
+            self._image[start:end + 1] = bytes(values)
+            self._shadow[start:end + 1] = bytes(values)
+            self._set(self._known, start, end)
+            self._clear(self._dirty, start, end)
+            self.stats['bytes_read'] += len(values)
+        self.stats['syncs'] += 1
+        return ok
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Register Map Loader
+Reads the register database generated for the register bank
+(digital/rb_fpga_template/reg_file_fpga_template.json) so that host tools
+share one source of truth for addresses, bit positions, reset values and
+read-only flags.
+
+load_register_fields() returns the raw fields as dicts:
+    symbol, address, pos, size, reset, readonly, description
+
+compile_register_map() turns them into RegisterField descriptors with
+precomputed mask/shift plus per-address mask tables. The compiled form is
+cached on disk keyed by the SHA-256 of the JSON file, so tools skip parsing
+when the register database has not changed.
+"""
+
+import hashlib
+import json
+import marshal
+import os
+from typing import Dict, List, Optional
+
+# Default location of the JSON register database, relative to this directory
+DEFAULT_REGISTER_FILE = os.path.normpath(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    '..', 'digital', 'rb_fpga_template', 'reg_file_fpga_template.json'))
+
+# Bump when the cached tuple layout changes
+CACHE_VERSION = 1
+
+
+def load_register_fields(path: Optional[str] = None) -> List[Dict]:
+    """
+    Load register fields from the JSON register database.
+
+    Args:
+        path: Path to reg_file_<project>.json (default: DEFAULT_REGISTER_FILE)
+
+    Returns:
+        List of field dicts in file order
+    """
+    with open(path or DEFAULT_REGISTER_FILE, 'rb') as f:
+        return _parse_register_fields(f.read())
+
+
+def _parse_register_fields(content: bytes) -> List[Dict]:
+    """Parse the JSON register database contents."""
+    # The generator writes a '//' comment header which is not valid JSON
+    lines = [line for line in content.decode('utf-8').splitlines()
+             if not line.lstrip().startswith('//')]
+    data = json.loads('\n'.join(lines))
+
+    fields = []
+    for reg in data.get('registers', []):
+        fields.append({
+            'symbol': reg['symbol'],
+            'address': int(reg['address'], 16),
+            'pos': int(reg.get('pos', 0)),
+            'size': int(reg.get('size', 8)),
+            'reset': int(reg.get('reset', 0)),
+            'readonly': reg.get('readonly', '0') == '1',
+            'description': reg.get('description', ''),
+        })
+    return fields
+
+
+class RegisterField:
+    """One register field with precomputed in-register mask and shift."""
+
+    __slots__ = ('symbol', 'name', 'address', 'shift', 'size', 'mask', 'max_value',
+                 'reset', 'readonly', 'description')
+
+    def __init__(self, symbol: str, address: int, pos: int, size: int, reset: int,
+                 readonly: bool, description: str):
+        self.symbol = symbol
+        self.name = symbol.split('.')[-1]
+        self.address = address
+        self.shift = pos
+        self.size = size
+        self.max_value = (1 << size) - 1
+        self.mask = (self.max_value << pos) & 0xFF
+        self.reset = reset
+        self.readonly = readonly
+        self.description = description
+
+    def extract(self, register_value: int) -> int:
+        """Field value from a register byte."""
+        return (register_value & self.mask) >> self.shift
+
+    def insert(self, register_value: int, field_value: int) -> int:
+        """Register byte with this field replaced by field_value."""
+        return (register_value & ~self.mask) | ((field_value << self.shift) & self.mask)
+
+    def __repr__(self):
+        return f"RegisterField({self.symbol}, 0x{self.address:02X}, pos={self.shift}, size={self.size})"
+
+
+class RegisterMap:
+    """Compiled register map: field descriptors plus per-address tables."""
+
+    __slots__ = ('fields', 'by_address', 'writable', 'readonly', 'resets', '_short_names')
+
+    def __init__(self, fields: List[RegisterField]):
+        self.fields = {f.symbol: f for f in fields}
+        self.by_address = {}
+        self.writable = [0] * 256   # Writable bits per address
+        self.readonly = [0] * 256   # Readonly bits per address
+        self.resets = [0] * 256     # Reset value per address
+        short_names = {}
+        for field in fields:
+            self.by_address.setdefault(field.address, []).append(field)
+            if field.readonly:
+                self.readonly[field.address] |= field.mask
+            else:
+                self.writable[field.address] |= field.mask
+            self.resets[field.address] = field.insert(self.resets[field.address], field.reset)
+            short_names.setdefault(field.name, []).append(field)
+        # Short names ('pwm_duty') are accepted when they are unambiguous
+        self._short_names = {name: group[0] for name, group in short_names.items() if len(group) == 1}
+
+    def resolve(self, symbol: str) -> RegisterField:
+        """
+        Look up a field by full symbol ('sys_cfg.pwm_duty') or unique short name.
+
+        Raises:
+            KeyError: Unknown or ambiguous symbol
+        """
+        field = self.fields.get(symbol) or self._short_names.get(symbol)
+        if field is None:
+            raise KeyError(symbol)
+        return field
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self.fields or symbol in self._short_names
+
+    def __iter__(self):
+        return iter(self.fields)
+
+    def __len__(self) -> int:
+        return len(self.fields)
+
+
+def _default_cache_dir() -> str:
+    """Per-user cache directory for compiled register maps."""
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'fpga_template')
+
+
+# In-process memo: (path, mtime_ns, size) -> RegisterMap
+_compiled = {}
+
+
+def compile_register_map(path: Optional[str] = None, cache_dir: Optional[str] = None) -> RegisterMap:
+    """
+    Compile the JSON register database into a RegisterMap.
+
+    The compiled field tuples are stored in cache_dir under the SHA-256 of the
+    JSON file; cache problems are ignored and fall back to parsing.
+
+    Args:
+        path: Path to reg_file_<project>.json (default: DEFAULT_REGISTER_FILE)
+        cache_dir: Directory for compiled maps (default: ~/.cache/fpga_template)
+
+    Returns:
+        Compiled RegisterMap
+    """
+    path = os.path.abspath(path or DEFAULT_REGISTER_FILE)
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    if key in _compiled:
+        return _compiled[key]
+
+    with open(path, 'rb') as f:
+        content = f.read()
+    digest = hashlib.sha256(content).hexdigest()
+    cache_file = os.path.join(cache_dir or _default_cache_dir(), f"regmap-{digest[:32]}.bin")
+
+    rows = None
+    try:
+        with open(cache_file, 'rb') as f:
+            version, rows = marshal.load(f)
+        if version != CACHE_VERSION:
+            rows = None
+    except (OSError, EOFError, ValueError, TypeError):
+        rows = None
+
+    if rows is None:
+        rows = tuple((f['symbol'], f['address'], f['pos'], f['size'], f['reset'],
+                      f['readonly'], f['description'])
+                     for f in _parse_register_fields(content))
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+            with open(tmp_file, 'wb') as f:
+                marshal.dump((CACHE_VERSION, rows), f)
+            os.replace(tmp_file, cache_file)
+        except OSError:
+            pass
+
+    regmap = RegisterMap([RegisterField(*row) for row in rows])
+    _compiled[key] = regmap
+    return regmap
@@ -0,0 +1,576 @@
+#!/usr/bin/env python3
+"""
+Register Programs
+Small scripted register sequences (bring-up, smoke tests) that run as a few
+pipelined protocol bursts instead of one command plus sleep per step.
+
+Text format, one step per line ('#' starts a comment). Targets are
+addresses, register names (pwm_duty, sys_cfg_control, ...) or field symbols
+(sys_cfg.enable_stuf); values are decimal or 0x hex:
+
+    write pwm_duty 0x40                  # register or field write
+    write 0x10 0xAA 0xBB 0xCC            # block write from an address
+    read sys_cfg_control                 # read, value goes to the results
+    read 0x00 7                          # block read of 7 bytes
+    expect debug_led 0x15                # read and compare
+    expect 0x00 0x02 mask 0x03           # compare under a mask
+    poll sys_cfg.monitor_flag 1 timeout 1.0 interval 0.01
+    delay 0.1                            # seconds
+
+The same program as JSON is a list of objects with the keys op, target,
+value / values, length, mask, timeout, interval and seconds.
+
+The compiler packs consecutive steps into one burst until a dependency
+forces the burst to end: a block read (uart_if.v ignores commands while its
+reply is sent), a poll or delay, or a field write whose other bits are only
+known once a read in the current burst has returned. Bursts ending in
+writes get a read-back fence, so the reply of every burst proves that all
+of its commands were applied.
+
+Usage:
+    python3 register_program.py bringup.txt /dev/ttyUSB1 -o results.json
+    python3 register_program.py bringup.txt --emulate --show-bursts
+"""
+
+import argparse
+import json
+import sys
+import time
+from typing import Dict, List, Optional, Tuple, Union
+
+from fpga_uart_interface import (CMD_BLOCK_READ, CMD_BLOCK_WRITE, CMD_READ, CMD_WRITE,
+                                 FPGAUartInterface, MAX_BLOCK_LENGTH)
+
+OPS = ('write', 'read', 'expect', 'poll', 'delay')
+DEFAULT_POLL_TIMEOUT = 1.0
+DEFAULT_POLL_INTERVAL = 0.01
+
+
+class Step:
+    """One program step."""
+
+    __slots__ = ('op', 'target', 'values', 'length', 'mask', 'timeout', 'interval', 'seconds',
+                 'line', 'text', 'address', 'field')
+
+    def __init__(self, op: str, target: Union[int, str, None] = None, values: Optional[List[int]] = None,
+                 length: int = 1, mask: int = 0xFF, timeout: float = DEFAULT_POLL_TIMEOUT,
+                 interval: float = DEFAULT_POLL_INTERVAL, seconds: float = 0.0,
+                 line: int = 0, text: str = ''):
+        if op not in OPS:
+            raise ValueError(f"line {line}: unknown operation '{op}'")
+        self.op = op
+        self.target = target
+        self.values = values or []
+        self.length = length
+        self.mask = mask
+        self.timeout = timeout
+        self.interval = interval
+        self.seconds = seconds
+        self.line = line
+        self.text = text or op
+        self.address = None     # Resolved by compile()
+        self.field = None
+
+
+def _number(token: str, line: int) -> int:
+    try:
+        return int(token, 0)
+    except ValueError:
+        raise ValueError(f"line {line}: invalid number '{token}'")
+
+
+def _seconds(token: str, line: int) -> float:
+    try:
+        return float(token)
+    except ValueError:
+        raise ValueError(f"line {line}: invalid time '{token}'")
+
+
+def _options(tokens: List[str], allowed: Tuple[str, ...], line: int) -> Dict[str, str]:
+    if len(tokens) % 2:
+        raise ValueError(f"line {line}: options must be 'name value' pairs")
+    options = dict(zip(tokens[0::2], tokens[1::2]))
+    for name in tokens[0::2]:
+        if name not in allowed:
+            raise ValueError(f"line {line}: unknown option '{name}'")
+    return options
+
+
+def _check_arguments(args: List[str], minimum: int, maximum: int, op: str, line: int):
+    if len(args) < minimum:
+        raise ValueError(f"line {line}: missing arguments for '{op}'")
+    if len(args) > maximum:
+        raise ValueError(f"line {line}: unexpected '{args[maximum]}'")
+
+
+def parse_program(text: str) -> List[Step]:
+    """
+    Parse the text program format.
+
+    Raises:
+        ValueError: Syntax error (message names the line)
+    """
+    steps = []
+    for line, raw in enumerate(text.splitlines(), 1):
+        source = raw.split('#', 1)[0].strip()
+        if not source:
+            continue
+        op, *args = source.split()
+        op = op.lower()
+        if op == 'delay':
+            _check_arguments(args, 1, 1, op, line)
+            step = Step(op, seconds=_seconds(args[0], line), line=line, text=source)
+        elif op == 'write':
+            _check_arguments(args, 2, 1 + MAX_BLOCK_LENGTH, op, line)
+            step = Step(op, args[0], [_number(a, line) for a in args[1:]], line=line, text=source)
+        elif op == 'read':
+            _check_arguments(args, 1, 2, op, line)
+            length = _number(args[1], line) if len(args) > 1 else 1
+            step = Step(op, args[0], length=length, line=line, text=source)
+        elif op in ('expect', 'poll'):
+            _check_arguments(args, 2, len(args), op, line)
+            options = _options(args[2:], ('mask',) if op == 'expect' else ('mask', 'timeout', 'interval'), line)
+            step = Step(op, args[0], [_number(args[1], line)],
+                        mask=_number(options.get('mask', '0xFF'), line),
+                        timeout=_seconds(options.get('timeout', str(DEFAULT_POLL_TIMEOUT)), line),
+                        interval=_seconds(options.get('interval', str(DEFAULT_POLL_INTERVAL)), line),
+                        line=line, text=source)
+        else:
+            raise ValueError(f"line {line}: unknown operation '{op}'")
+        steps.append(step)
+    return steps
+
+
+JSON_KEYS = ('op', 'target', 'value', 'values', 'length', 'mask', 'timeout', 'interval', 'seconds')
+
+
+def _json_int(item: Dict, key: str, default: Optional[int], line: int) -> Optional[int]:
+    value = item.get(key, default)
+    if isinstance(value, str):
+        return _number(value, line)
+    if not isinstance(value, int) or isinstance(value, bool):
+        raise ValueError(f"line {line}: '{key}' must be an integer")
+    return value
+
+
+def _json_seconds(item: Dict, key: str, default: float, line: int) -> float:
+    value = item.get(key, default)
+    if not isinstance(value, (int, float)) or isinstance(value, bool):
+        raise ValueError(f"line {line}: '{key}' must be a number of seconds")
+    return float(value)
+
+
+def parse_json_program(items: List[Dict]) -> List[Step]:
+    """
+    Build steps from the JSON program format.
+
+    Steps are numbered from 1 in error messages ("line N").
+
+    Raises:
+        ValueError: Invalid step
+    """
+    if not isinstance(items, list):
+        raise ValueError("JSON program must be a list of steps")
+    steps = []
+    for n, item in enumerate(items, 1):
+        if not isinstance(item, dict):
+            raise ValueError(f"line {n}: step must be an object")
+        unknown = [key for key in item if key not in JSON_KEYS]
+        if unknown:
+            raise ValueError(f"line {n}: unknown key '{unknown[0]}'")
+        op = item.get('op')
+        if op not in OPS:
+            raise ValueError(f"line {n}: unknown operation '{op}'")
+
+        target = item.get('target')
+        if op != 'delay' and (target is None or isinstance(target, bool)
+                              or not isinstance(target, (int, str))):
+            raise ValueError(f"line {n}: '{op}' needs a target address or name")
+        if 'values' in item:
+            values = item['values']
+            if not isinstance(values, list):
+                raise ValueError(f"line {n}: 'values' must be a list")
+            values = [_json_int({'value': v}, 'value', None, n) for v in values]
+        elif 'value' in item:
+            values = [_json_int(item, 'value', None, n)]
+        else:
+            values = []
+        if (op == 'write' and not values) or (op in ('expect', 'poll') and len(values) != 1):
+            raise ValueError(f"line {n}: '{op}' needs {'values' if op == 'write' else 'one value'}")
+
+        text = ' '.join(str(x) for x in [op, target] + values if x is not None)
+        steps.append(Step(op, target, values,
+                          length=_json_int(item, 'length', 1, n), mask=_json_int(item, 'mask', 0xFF, n),
+                          timeout=_json_seconds(item, 'timeout', DEFAULT_POLL_TIMEOUT, n),
+                          interval=_json_seconds(item, 'interval', DEFAULT_POLL_INTERVAL, n),
+                          seconds=_json_seconds(item, 'seconds', 0.0, n), line=n, text=text))
+    return steps
+
+
+def load_program(path: str) -> List[Step]:
+    """Load a text or JSON (.json) program file."""
+    with open(path) as f:
+        content = f.read()
+    if path.endswith('.json'):
+        try:
+            items = json.loads(content)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"{path}: {e}")
+        return parse_json_program(items)
+    return parse_program(content)
+
+
+class _Burst:
+    """Commands sent together, with the steps whose replies they carry."""
+
+    def __init__(self):
+        self.items = []         # (kind, step): 'write', 'read', 'block', 'fence', 'poll', 'delay'
+        self.written = []       # Addresses written, for the fence
+
+    def ends_with_write(self) -> bool:
+        return bool(self.items) and self.items[-1][0] == 'write'
+
+
+class RegisterProgram:
+    """Compiles program steps into bursts and runs them on an FPGAUartInterface."""
+
+    def __init__(self, fpga: FPGAUartInterface, steps: List[Step]):
+        """
+        Raises:
+            ValueError: Unknown target or invalid step for its target
+        """
+        self.fpga = fpga
+        self.steps = steps
+        self.bursts = self.compile()
+
+    def _resolve(self, step: Step):
+        target = step.target
+        if isinstance(target, str):
+            try:
+                target = int(target, 0)
+            except ValueError:
+                pass
+        if isinstance(target, int):
+            if not 0 <= target <= 0xFF:
+                raise ValueError(f"line {step.line}: address {target} out of range (0-255)")
+            step.address = target
+        elif target in self.fpga.registers:
+            step.address = self.fpga.registers[target]
+        else:
+            try:
+                step.field = self.fpga.regmap.resolve(target)
+            except KeyError:
+                raise ValueError(f"line {step.line}: unknown target '{target}'")
+            step.address = step.field.address
+        if step.field and (step.length != 1 or len(step.values) > 1):
+            raise ValueError(f"line {step.line}: fields take a single value")
+        if step.op == 'write' and step.field and step.field.readonly:
+            raise ValueError(f"line {step.line}: {step.field.symbol} is read-only")
+        if step.op == 'write' and step.address + len(step.values) > 256:
+            raise ValueError(f"line {step.line}: block write beyond 0xFF")
+        if not 1 <= step.length <= MAX_BLOCK_LENGTH:
+            raise ValueError(f"line {step.line}: read length must be 1-{MAX_BLOCK_LENGTH}")
+        if step.field:
+            symbol, max_value = step.field.symbol, step.field.max_value
+        else:
+            symbol, max_value = f"0x{step.address:02X}", 0xFF
+        for value in step.values:
+            if not 0 <= value <= max_value:
+                raise ValueError(f"line {step.line}: value {value} out of range for {symbol} (0-{max_value})")
+        if not 0 <= step.mask <= 0xFF:
+            raise ValueError(f"line {step.line}: mask {step.mask} out of range (0-255)")
+
+    def compile(self) -> List[_Burst]:
+        """Group the steps into as few bursts as their dependencies allow."""
+        writable = self.fpga.regmap.writable
+        bursts = [_Burst()]
+        known = set()       # Addresses whose value is known when the current burst is built
+        reading = set()     # Addresses read in the current burst (known after it)
+
+        def new_burst():
+            bursts.append(_Burst())
+            known.update(reading)
+            reading.clear()
+
+        for step in self.steps:
+            if step.op == 'delay':
+                # A burst of its own, after the fenced previous burst
+                if bursts[-1].items:
+                    new_burst()
+                bursts[-1].items.append(('delay', step))
+                new_burst()
+                continue
+            self._resolve(step)
+            burst = bursts[-1]
+
+            if step.op == 'write':
+                field = step.field
+                if field and field.mask & writable[step.address] != writable[step.address] \
+                        and step.address not in known:
+                    # Needs the other bits of the register first
+                    if step.address not in reading:
+                        burst.items.append(('load', step))
+                        reading.add(step.address)
+                    new_burst()
+                    burst = bursts[-1]
+                burst.items.append(('write', step))
+                addresses = range(step.address, step.address + len(step.values))
+                burst.written.extend(addresses)
+                known.update(addresses)
+            elif step.op == 'read' and step.length > 1:
+                burst.items.append(('block', step))
+                reading.update(range(step.address, step.address + step.length))
+                new_burst()
+            elif step.op == 'poll':
+                burst.items.append(('poll', step))
+                reading.add(step.address)
+                new_burst()
+            else:
+                burst.items.append(('read', step))
+                reading.add(step.address)
+
+        for burst in bursts:
+            if burst.ends_with_write():
+                burst.items.append(('fence', None))
+        return [burst for burst in bursts if burst.items]
+
+    def describe(self) -> List[str]:
+        """Human-readable burst listing."""
+        lines = []
+        for n, burst in enumerate(self.bursts):
+            parts = []
+            for kind, step in burst.items:
+                if kind == 'fence':
+                    parts.append(f"fence R 0x{burst.written[-1]:02X}")
+                elif kind == 'load':
+                    parts.append(f"R 0x{step.address:02X} (for line {step.line})")
+                else:
+                    parts.append(f"{step.text} (line {step.line})")
+            lines.append(f"burst {n}: " + '; '.join(parts))
+        return lines
+
+    def run(self, stop_on_failure: bool = False) -> Dict:
+        """
+        Execute the program.
+
+        Args:
+            stop_on_failure: Stop at the first failed expect/poll
+
+        Returns:
+            Result dict with per-step records (times in ms from program start)
+        """
+        fpga = self.fpga
+        fpga.invalidate_cache()
+        self._shadow = {}
+        self._records = {id(step): {'line': step.line, 'step': step.text, 'burst': None,
+                                    'start_ms': None, 'end_ms': None, 'ok': None}
+                         for step in self.steps}
+        self._start = time.perf_counter()
+        error = None
+        for n, burst in enumerate(self.bursts):
+            ok = self._run_burst(n, burst)
+            if ok is None:
+                error = f"no reply to burst {n}"
+                break
+            if not ok and stop_on_failure:
+                break
+        fpga.invalidate_cache()
+
+        records = [self._records[id(step)] for step in self.steps]
+        return {
+            'port': fpga.port,
+            'baudrate': fpga.baudrate,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'total_ms': round((time.perf_counter() - self._start) * 1000.0, 3),
+            'bursts': len(self.bursts),
+            'passed': error is None and all(r['ok'] is not False for r in records),
+            'error': error,
+            'steps': records,
+        }
+
+    def _ms(self, t: float) -> float:
+        return round((t - self._start) * 1000.0, 3)
+
+    def _record(self, step: Step, burst: int, start: float, end: float, ok: bool, **extra):
+        record = self._records[id(step)]
+        record.update(burst=burst, start_ms=self._ms(start), end_ms=self._ms(end), ok=ok, **extra)
+
+    def _register_value(self, step: Step) -> int:
+        """Byte to write for a single-value write step."""
+        if step.field is None:
+            return step.values[0]
+        return step.field.insert(self._shadow.get(step.address, 0), step.values[0])
+
+    def _check(self, step: Step, value: int) -> bool:
+        got = step.field.extract(value) if step.field else value
+        return (got & step.mask) == (step.values[0] & step.mask)
+
+    def _run_burst(self, index: int, burst: _Burst) -> Optional[bool]:
+        """Send one burst and assign its replies; None if replies were lost."""
+        fpga = self.fpga
+        start = time.perf_counter()
+        items = burst.items
+        if items[0][0] == 'delay':
+            time.sleep(items[0][1].seconds)
+            self._record(items[0][1], index, start, time.perf_counter(), True)
+            return True
+
+        cmd = bytearray()
+        replies = []        # (kind, step, reply length)
+        block_length = 0
+        for kind, step in items:
+            if kind == 'write':
+                if len(step.values) == 1:
+                    value = self._register_value(step)
+                    cmd += bytes([CMD_WRITE, step.address, value])
+                    self._shadow[step.address] = value
+                else:
+                    cmd += bytes([CMD_BLOCK_WRITE, step.address, len(step.values)])
+                    cmd += bytes(step.values)
+                    for n, v in enumerate(step.values):
+                        self._shadow[step.address + n] = v
+            elif kind == 'fence':
+                cmd += bytes([CMD_READ, burst.written[-1]])
+                replies.append((kind, step, 1))
+            elif kind == 'block':
+                cmd += bytes([CMD_BLOCK_READ, step.address, step.length])
+                replies.append((kind, step, step.length))
+                block_length = step.length
+            else:
+                cmd += bytes([CMD_READ, step.address])
+                replies.append((kind, step, 1))
+
+        total = sum(length for _, _, length in replies)
+        response = fpga.burst(bytes(cmd), total, block_length)
+        end = time.perf_counter()
+        if response is None or len(response) < total:
+            for kind, step in items:
+                if step is not None and kind != 'load':
+                    self._record(step, index, start, end, False, error='no reply')
+            return None
+
+        ok = True
+        offset = 0
+        for kind, step, length in replies:
+            data = response[offset:offset + length]
+            offset += length
+            if kind == 'block':
+                for n, value in enumerate(data):
+                    self._shadow[step.address + n] = value
+                self._record(step, index, start, end, True, value=list(data))
+                continue
+            value = data[0]
+            if kind == 'fence':
+                continue
+            self._shadow[step.address] = value
+            if kind == 'load':
+                continue
+            if kind == 'read':
+                if step.op == 'expect':
+                    passed = self._check(step, value)
+                    ok &= passed
+                    self._record(step, index, start, end, passed, value=value, expected=step.values[0])
+                else:
+                    self._record(step, index, start, end, True,
+                                 value=step.field.extract(value) if step.field else value)
+            elif kind == 'poll':
+                passed = self._poll(step, value, start)
+                ok &= passed
+                self._record(step, index, start, time.perf_counter(), passed,
+                             value=self._last_poll_value, expected=step.values[0], polls=self._polls)
+        for kind, step in items:
+            if kind == 'write':
+                self._record(step, index, start, end, True)
+        return ok
+
+    def _poll(self, step: Step, value: int, start: float) -> bool:
+        """Repeat single reads until the step matches or its timeout passes."""
+        fpga = self.fpga
+        self._polls = 1
+        deadline = start + step.timeout
+        while True:
+            self._last_poll_value = step.field.extract(value) if step.field else value
+            if self._check(step, value):
+                return True
+            if time.perf_counter() + step.interval > deadline:
+                return False
+            time.sleep(step.interval)
+            response = fpga.burst(bytes([CMD_READ, step.address]), 1)
+            self._polls += 1
+            if not response:
+                continue
+            value = response[0]
+            self._shadow[step.address] = value
+
+
+def print_results(results: Dict):
+    """One line per step."""
+    for r in results['steps']:
+        status = {True: 'ok', False: 'FAIL', None: '-'}[r['ok']]
+        detail = ''
+        if 'value' in r:
+            value = r['value']
+            detail = ' '.join(f"{v:02X}" for v in value) if isinstance(value, list) else f"0x{value:02X}"
+            if 'expected' in r:
+                detail += f" (expected 0x{r['expected']:02X})"
+            if 'polls' in r:
+                detail += f" after {r['polls']} reads"
+        elif 'error' in r:
+            detail = r['error']
+        start = '' if r['start_ms'] is None else f"{r['start_ms']:9.3f}"
+        print(f"{r['line']:>4}  {r['step']:<36} {status:<4} {start:>9} ms  {detail}")
+    print(f"\n{len(results['steps'])} steps in {results['bursts']} bursts, {results['total_ms']:.1f} ms: "
+          f"{'PASSED' if results['passed'] else 'FAILED'}{' (' + results['error'] + ')' if results['error'] else ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run a register program')
+    parser.add_argument('program', help='Text or JSON (.json) register program')
+    parser.add_argument('port', nargs='?', default='/dev/ttyUSB1', help='Serial port (default: /dev/ttyUSB1)')
+    parser.add_argument('-b', '--baud', type=int, help='Baud rate (default: saved link profile or 115200)')
+    parser.add_argument('-o', '--output', help='Save per-step results as JSON')
+    parser.add_argument('--stop-on-failure', action='store_true', help='Stop at the first failed check')
+    parser.add_argument('--show-bursts', action='store_true', help='Print the compiled bursts')
+    parser.add_argument('--emulate', action='store_true', help='Run against fpga_emulator.py on a local pty')
+    args = parser.parse_args()
+
+    try:
+        steps = load_program(args.program)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(2)
+
+    emulator = None
+    port = args.port
+    if args.emulate:
+        from fpga_emulator import FPGAEmulator
+        emulator = FPGAEmulator(baudrate=args.baud or 115200)
+        port = emulator.start()
+
+    fpga = FPGAUartInterface(port=port, baudrate=args.baud, verbose=False)
+    try:
+        program = RegisterProgram(fpga, steps)
+        if args.show_bursts:
+            print('\n'.join(program.describe()) + '\n')
+        if not fpga.connect():
+            sys.exit(2)
+        results = program.run(args.stop_on_failure)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(2)
+    finally:
+        fpga.disconnect()
+        if emulator:
+            emulator.stop()
+
+    results['program'] = args.program
+    print_results(results)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Saved results to {args.output}")
+    sys.exit(0 if results['passed'] else 1)
+
+
+if __name__ == "__main__":
+    main()
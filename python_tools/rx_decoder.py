@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+UART RX Stream Decoder
+Incremental decoder for the byte stream received from uart_if.v. Reply bytes
+are assigned to outstanding requests in FIFO order; unsolicited "DBG: "
+frames from the debug_send/debug_data path (button S2) are set apart, and
+anything that belongs to neither is counted as an anomaly.
+
+Received bytes go into a preallocated ring buffer (readv straight from the
+port fd) and reply bytes are copied once, span by span, into a reusable
+output buffer; there is no per-byte allocation.
+
+Debug frames are recognised by their 5-byte prefix. A reply byte equal to
+'D' followed by fewer than 4 more bytes cannot be classified yet: decode()
+holds it (see waiting) until more bytes arrive or the caller decides the
+stream is quiet and calls decode(final=True). Frames are assumed to be sent
+contiguously, i.e. not interleaved with reply bytes.
+
+Usage:
+    decoder = RxDecoder()
+    decoder.expect(3)
+    while decoder.received < 3:
+        decoder.fill(fd)
+        decoder.decode()
+    reply = decoder.take()
+"""
+
+import os
+from collections import deque
+from typing import Optional
+
+# Debug sequence sent by fpga_template.sv: "DBG: " + 0x00..0x0F + CR LF
+DEBUG_PREFIX = b'DBG: '
+DEBUG_PAYLOAD_BYTES = 16
+DEBUG_FRAME_END = b'\r\n'
+DEBUG_FRAME_LENGTH = len(DEBUG_PREFIX) + DEBUG_PAYLOAD_BYTES + len(DEBUG_FRAME_END)
+
+_PREFIX_START = DEBUG_PREFIX[0]
+
+
+class _Expectation:
+    """Reply slot in the output buffer."""
+
+    __slots__ = ('offset', 'length', 'got', 'keep_last')
+
+    def __init__(self, offset: int, length: int, keep_last: bool):
+        self.offset = offset
+        self.length = length
+        self.got = 0
+        self.keep_last = keep_last
+
+
+class RxDecoder:
+    """Splits received bytes into replies, debug frames and anomalies."""
+
+    def __init__(self, capacity: int = 1024, frame_history: int = 16):
+        """
+        Args:
+            capacity: Ring buffer size in bytes (also initial output size)
+            frame_history: Number of recent debug frames kept in self.frames
+        """
+        self._ring = bytearray(capacity)
+        self._ring_view = memoryview(self._ring)
+        self._head = 0      # First unclassified byte
+        self._count = 0     # Unclassified bytes in the ring
+        self._out = bytearray(capacity)
+        self._out_view = memoryview(self._out)
+        self._out_used = 0
+        self._expected = deque()    # Replies still receiving bytes
+        self._done = deque()        # Completed replies not yet taken
+        self._frame = bytearray(DEBUG_FRAME_LENGTH)
+        self._frame_got = 0         # > 0 while inside a debug frame
+        self._stale = 0             # Held ring bytes from before reset() (never reply data)
+        self.received = 0           # Reply bytes delivered since reset()
+        self.waiting = False        # decode() holds a possible frame start
+        self.frames = deque(maxlen=frame_history)
+        self.stats = {'replies': 0, 'reply_bytes': 0, 'debug_frames': 0, 'bad_frames': 0,
+                      'unsolicited_bytes': 0, 'overrun_bytes': 0, 'dropped_bytes': 0}
+
+    def reset(self):
+        """
+        Drop outstanding replies (stats are kept).
+
+        The frame parser state survives: a debug frame in progress, or a held
+        possible frame start, is still recognised when the rest arrives. Held
+        bytes that turn out not to start a frame are counted as unsolicited,
+        never delivered as a reply.
+        """
+        self._expected.clear()
+        self._done.clear()
+        self._out_used = 0
+        self.decode()
+        self._stale = self._count
+        self.received = 0
+
+    def discard(self, data: bytes):
+        """Drop stale input bytes, passing them through the frame parser."""
+        self.reset()
+        view = memoryview(data)
+        while len(view):
+            n = min(len(view), self.free)
+            self.feed(view[:n])
+            self.decode()
+            view = view[n:]
+        self._stale = self._count
+
+    def expect(self, length: int, keep_last: bool = False):
+        """
+        Queue a reply of length bytes behind the outstanding ones.
+
+        Args:
+            length: Reply length in bytes
+            keep_last: Block read over-send mode: further bytes keep arriving
+                       into this reply (keeping the last length) until close()
+        """
+        end = self._out_used + length
+        if end > len(self._out):
+            self._compact()
+            end = self._out_used + length
+        if end > len(self._out):
+            # Views handed out earlier keep referencing the old buffer
+            out = bytearray(max(end, 2 * len(self._out)))
+            out[:self._out_used] = self._out_view[:self._out_used]
+            self._out = out
+            self._out_view = memoryview(out)
+        self._expected.append(_Expectation(self._out_used, length, keep_last))
+        self._out_used = end
+
+    def _compact(self):
+        """Move the replies not yet taken to the start of the output buffer."""
+        live = self._done or self._expected
+        start = live[0].offset if live else self._out_used
+        if start == 0:
+            return
+        self._out[:self._out_used - start] = self._out[start:self._out_used]
+        for exp in self._done:
+            exp.offset -= start
+        for exp in self._expected:
+            exp.offset -= start
+        self._out_used -= start
+
+    @property
+    def head_complete(self) -> bool:
+        """True when the oldest receiving reply has all of its bytes."""
+        return bool(self._expected) and self._expected[0].got >= self._expected[0].length
+
+    def close(self):
+        """Finish an over-send reply at the head, keeping its last bytes."""
+        if not self.head_complete:
+            return
+        exp = self._expected.popleft()
+        if exp.got > exp.length:
+            self.stats['overrun_bytes'] += exp.got - exp.length
+            split = exp.offset + exp.got % exp.length
+            end = exp.offset + exp.length
+            if split != exp.offset:
+                self._out_view[exp.offset:end] = bytes(self._out_view[split:end]) + bytes(self._out_view[exp.offset:split])
+            exp.got = exp.length
+        self._finish(exp)
+
+    def take(self) -> Optional[memoryview]:
+        """
+        Oldest completed reply, None if none.
+
+        The view is valid until the next expect(), which may reuse the space
+        of taken replies.
+        """
+        if not self._done:
+            return None
+        exp = self._done.popleft()
+        if not self._done and not self._expected:
+            self._out_used = 0
+        return self._out_view[exp.offset:exp.offset + exp.length]
+
+    def view(self, length: int) -> memoryview:
+        """First length reply bytes since reset(), contiguous across replies."""
+        return self._out_view[:length]
+
+    @property
+    def free(self) -> int:
+        """Bytes the ring buffer can take before fill() stops reading."""
+        return len(self._ring) - self._count
+
+    def fill(self, fd: int) -> int:
+        """
+        Read available bytes from fd into the ring buffer.
+
+        Returns:
+            Number of bytes read (0 on end of file or full ring)
+
+        Raises:
+            BlockingIOError: Non-blocking fd without data
+        """
+        segments = self._free_segments()
+        if not segments:
+            return 0
+        n = os.readv(fd, segments)
+        self._count += n
+        return n
+
+    def feed(self, data: bytes):
+        """Copy bytes into the ring buffer (for sources without an fd)."""
+        view = memoryview(data)
+        for segment in self._free_segments():
+            n = min(len(segment), len(view))
+            segment[:n] = view[:n]
+            self._count += n
+            view = view[n:]
+        if len(view):
+            self.stats['dropped_bytes'] += len(view)
+
+    def _free_segments(self):
+        capacity = len(self._ring)
+        if self._count == capacity:
+            return []
+        tail = (self._head + self._count) % capacity
+        if tail >= self._head:
+            segments = [self._ring_view[tail:]]
+            if self._head:
+                segments.append(self._ring_view[:self._head])
+            return segments
+        return [self._ring_view[tail:self._head]]
+
+    def decode(self, final: bool = False):
+        """
+        Classify all buffered bytes.
+
+        Args:
+            final: The stream is quiet; resolve a held possible frame start
+                   as reply data
+        """
+        ring = self._ring
+        capacity = len(ring)
+        self.waiting = False
+        while self._count:
+            head = self._head
+            contiguous = min(self._count, capacity - head)
+
+            if self._frame_got:
+                n = min(contiguous, DEBUG_FRAME_LENGTH - self._frame_got)
+                self._frame[self._frame_got:self._frame_got + n] = self._ring_view[head:head + n]
+                self._frame_got += n
+                self._advance(n)
+                if self._frame_got == DEBUG_FRAME_LENGTH:
+                    self._finish_frame()
+                continue
+
+            if ring[head] == _PREFIX_START:
+                available = min(self._count, len(DEBUG_PREFIX))
+                matched = 1
+                while matched < available and ring[(head + matched) % capacity] == DEBUG_PREFIX[matched]:
+                    matched += 1
+                if matched == len(DEBUG_PREFIX):
+                    self._frame[:matched] = DEBUG_PREFIX
+                    self._frame_got = matched
+                    self._advance(matched)
+                    continue
+                if matched == available and not final:
+                    self.waiting = True
+                    return
+                self._deliver(head, 1)
+                continue
+
+            end = ring.find(_PREFIX_START, head, head + contiguous)
+            self._deliver(head, (end if end >= 0 else head + contiguous) - head)
+
+    def _advance(self, n: int):
+        self._head = (self._head + n) % len(self._ring)
+        self._count -= n
+        self._stale = max(0, self._stale - n)
+
+    def _deliver(self, start: int, n: int):
+        """Hand n contiguous ring bytes to the receiving replies."""
+        stale = min(n, self._stale)
+        self._advance(n)
+        if stale:
+            self.stats['unsolicited_bytes'] += stale
+            start += stale
+            n -= stale
+        while n:
+            if not self._expected:
+                self.stats['unsolicited_bytes'] += n
+                return
+            exp = self._expected[0]
+            if exp.keep_last:
+                pos = exp.got % exp.length
+                k = min(n, exp.length - pos)
+            else:
+                pos = exp.got
+                k = min(n, exp.length - exp.got)
+            dst = exp.offset + pos
+            self._out_view[dst:dst + k] = self._ring_view[start:start + k]
+            exp.got += k
+            self.received += k
+            self.stats['reply_bytes'] += k
+            start += k
+            n -= k
+            if not exp.keep_last and exp.got == exp.length:
+                self._expected.popleft()
+                self._finish(exp)
+
+    def _finish(self, exp: _Expectation):
+        self._done.append(exp)
+        self.stats['replies'] += 1
+
+    def _finish_frame(self):
+        self._frame_got = 0
+        if self._frame[-len(DEBUG_FRAME_END):] != DEBUG_FRAME_END:
+            self.stats['bad_frames'] += 1
+            return
+        self.stats['debug_frames'] += 1
+        self.frames.append(bytes(self._frame[len(DEBUG_PREFIX):len(DEBUG_PREFIX) + DEBUG_PAYLOAD_BYTES]))
@@ -1,26 +1,38 @@
 #!/usr/bin/env python3
 """
 Debug block read issues specifically
+
+Usage:
+    python3 test_block_read_debug.py [port] [trace_file]
+
+With a trace file all UART traffic is recorded (see uart_trace.py); attach it
+to bug reports instead of copying the console output.
 """
 
 import serial
+import sys
 import time
 from fpga_uart_interface import FPGAUartInterface
 
-def test_block_read_debug():
+def test_block_read_debug(port='/dev/ttyUSB1', trace=None):
     """Debug block read functionality step by step"""
 
     print("Block Read Debug Test")
     print("====================")
 
-    fpga = FPGAUartInterface(port='/dev/ttyUSB1', verbose=True)
+    fpga = FPGAUartInterface(port=port, verbose=True, trace=trace)
     if not fpga.connect():
         print("Failed to connect")
         return
 
+    def step(title):
+        print(title)
+        if fpga.tracer:
+            fpga.tracer.mark(title.strip())
+
     try:
         # First, write some known data using single writes
-        print("\n1. Writing test data using single writes...")
+        step("\n1. Writing test data using single writes...")
         test_addresses = [0x10, 0x11, 0x12]
         test_values = [0xAA, 0xBB, 0xCC]
 
@@ -30,7 +42,7 @@ def test_block_read_debug():
             time.sleep(0.1)
 
         # Verify with single reads
-        print("\n2. Verifying with single reads...")
+        step("\n2. Verifying with single reads...")
         for addr, expected in zip(test_addresses, test_values):
             value = fpga.read_register(addr)
             if value is not None:
@@ -44,15 +56,14 @@ def test_block_read_debug():
         print("\n3. Testing block read...")
 
         # Debug the raw serial communication
-        print("\n3a. Raw serial block read test...")
-        fpga.serial.reset_input_buffer()
+        step("\n3a. Raw serial block read test...")
+        fpga._discard_input()
 
         # Send block read command: 'b' + start_addr + length
         cmd = bytes([ord('b'), 0x10, 3])  # Read 3 bytes starting at 0x10
         print(f"  Sending command: {cmd.hex().upper()}")
 
-        fpga.serial.write(cmd)
-        fpga.serial.flush()
+        fpga._transmit(cmd)
 
         # Wait for response and show what we get back
         print("  Waiting for response...")
@@ -62,6 +73,8 @@ def test_block_read_debug():
         while len(received_bytes) < 3 and (time.time() - start_time) < 5:
             if fpga.serial.in_waiting > 0:
                 new_bytes = fpga.serial.read(fpga.serial.in_waiting)
+                if fpga.tracer:
+                    fpga.tracer.rx(new_bytes)
                 received_bytes.extend(new_bytes)
                 print(f"  Got {len(new_bytes)} bytes: {new_bytes.hex().upper()}")
             time.sleep(0.1)
@@ -71,7 +84,7 @@ def test_block_read_debug():
             print(f"  Data: {[hex(b) for b in received_bytes]}")
 
         # Test with the class method
-        print("\n3b. Using class method...")
+        step("\n3b. Using class method...")
         result = fpga.read_block(0x10, 3)
         if result:
             print(f"  Block read result: {[hex(x) for x in result]}")
@@ -85,7 +98,7 @@ def test_block_read_debug():
             print("  Block read: FAILED")
 
         # Test with different sizes
-        print("\n4. Testing different block sizes...")
+        step("\n4. Testing different block sizes...")
 
         # Test single byte block read
         result = fpga.read_block(0x10, 1)
@@ -96,7 +109,7 @@ def test_block_read_debug():
         print(f"  2-byte block read: {[hex(x) for x in result] if result else 'FAILED'}")
 
         # Test timing with delays
-        print("\n5. Testing with longer timeout...")
+        step("\n5. Testing with longer timeout...")
         fpga.serial.timeout = 5.0  # Increase timeout
         result = fpga.read_block(0x10, 3)
         print(f"  5s timeout result: {[hex(x) for x in result] if result else 'FAILED'}")
@@ -105,4 +118,5 @@ def test_block_read_debug():
         fpga.disconnect()
 
 if __name__ == "__main__":
-    test_block_read_debug()
\ No newline at end of file
+    test_block_read_debug(sys.argv[1] if len(sys.argv) > 1 else '/dev/ttyUSB1',
+                          sys.argv[2] if len(sys.argv) > 2 else None)
\ No newline at end of file
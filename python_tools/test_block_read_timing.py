@@ -4,16 +4,17 @@ Debug block read timing issues
 """
 
 import serial
+import sys
 import time
 
-def test_block_read_timing():
+def test_block_read_timing(port='/dev/ttyUSB1'):
     """Test block read with careful timing analysis"""
 
     print("Block Read Timing Debug")
     print("======================")
 
     try:
-        ser = serial.Serial('/dev/ttyUSB1', 115200, timeout=0.1)
+        ser = serial.Serial(port, 115200, timeout=0.1)
         ser.reset_input_buffer()
         ser.reset_output_buffer()
         time.sleep(0.1)
@@ -122,4 +123,4 @@ def test_block_read_timing():
         print(f"Error: {e}")
 
 if __name__ == "__main__":
-    test_block_read_timing()
\ No newline at end of file
+    test_block_read_timing(sys.argv[1] if len(sys.argv) > 1 else '/dev/ttyUSB1')
\ No newline at end of file
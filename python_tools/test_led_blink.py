@@ -4,9 +4,10 @@ Test script to verify FPGA is working by observing LED changes
 We'll try to write to the debug LED register and see if anything changes
 """
 
+import sys
 import time
 
-def test_led_pattern():
+def test_led_pattern(port='/dev/ttyUSB1'):
     """Test if we can control LEDs to verify FPGA is working"""
 
     print("FPGA LED Test")
@@ -20,7 +21,7 @@ def test_led_pattern():
         from fpga_uart_interface import FPGAUartInterface
 
         # Try to connect
-        fpga = FPGAUartInterface(port='/dev/ttyUSB1')  # Use the UART interface
+        fpga = FPGAUartInterface(port=port)  # Use the UART interface
 
         if not fpga.connect():
             print("Could not connect to UART interface")
@@ -82,4 +83,4 @@ def test_led_pattern():
         print(f"Error during LED test: {e}")
 
 if __name__ == "__main__":
-    test_led_pattern()
\ No newline at end of file
+    test_led_pattern(sys.argv[1] if len(sys.argv) > 1 else '/dev/ttyUSB1')
\ No newline at end of file
@@ -8,12 +8,9 @@ import serial
 import time
 import sys
 
-def test_uart_simple():
+def test_uart_simple(port='/dev/ttyUSB1'):
     """Test the most basic UART functionality"""
 
-    # Based on the USB device names, ttyUSB1 should be the UART interface
-    port = '/dev/ttyUSB1'
-
     print(f"Testing UART on {port}")
     print("According to USB device names:")
     print("  /dev/ttyUSB0 = if00 = JTAG interface")
@@ -112,4 +109,5 @@ def test_uart_simple():
         print(f"Error: {e}")
 
 if __name__ == "__main__":
-    test_uart_simple()
\ No newline at end of file
+    # Based on the USB device names, ttyUSB1 should be the UART interface
+    test_uart_simple(sys.argv[1] if len(sys.argv) > 1 else '/dev/ttyUSB1')
\ No newline at end of file
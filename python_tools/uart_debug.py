@@ -135,8 +135,8 @@ def main():
     print("FPGA UART Debug Tool")
     print("===================")
 
-    # Test both USB ports
-    ports = ['/dev/ttyUSB0', '/dev/ttyUSB1']
+    # Test both USB ports (or the ports given, e.g. an emulator pty)
+    ports = sys.argv[1:] or ['/dev/ttyUSB0', '/dev/ttyUSB1']
 
     for port in ports:
         if test_uart_port(port):
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+UART Transaction Metrics
+Instrumentation for FPGAUartInterface. Attach a UartMetrics object and every
+operation records the time spent in each phase plus event counters:
+
+Phases (histograms per operation and phase, in seconds):
+    encode      building the command bytes
+    write       serial write + flush
+    first_byte  from end of write until the first reply byte arrives
+    receive     from the first reply byte until the reply is complete
+    settle      waiting for block read over-send bytes
+    sleep       fixed settle delay after writes (write_mode='sleep')
+    total       whole operation
+
+Counters: timeouts (no reply byte), short_reads (incomplete reply) and
+overlong_block_reads / overrun_bytes (block reads returning extra bytes).
+
+Results are available as a dict (summary()), Prometheus text exposition
+(prometheus()) or JSON lines (json_lines()).
+
+Usage:
+    metrics = UartMetrics()
+    fpga = FPGAUartInterface('/dev/ttyUSB1', metrics=metrics)
+    ...
+    print(metrics.prometheus())
+"""
+
+import json
+import time
+from typing import Dict, Optional, Tuple
+
+# Upper bounds of the latency buckets in seconds (Prometheus 'le' labels)
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                   0.05, 0.1, 0.25, 0.5, 1.0)
+
+COUNTERS = ('timeouts', 'short_reads', 'overlong_block_reads', 'overrun_bytes')
+
+
+class Histogram:
+    """Latency histogram with fixed bucket bounds."""
+
+    __slots__ = ('buckets', 'counts', 'count', 'sum')
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)   # Last entry: above the largest bucket
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        index = 0
+        for bound in self.buckets:
+            if value <= bound:
+                break
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, fraction: float) -> Optional[float]:
+        """Upper bucket bound containing the given quantile (None if empty or above all buckets)."""
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for bound, n in zip(self.buckets, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return None
+
+    def summary(self) -> Dict:
+        return {'count': self.count, 'sum': round(self.sum, 6),
+                'mean': round(self.sum / self.count, 6) if self.count else None,
+                'p50': self.quantile(0.50), 'p95': self.quantile(0.95), 'p99': self.quantile(0.99)}
+
+
+class UartMetrics:
+    """Phase histograms per operation plus event counters."""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.histograms = {}     # (operation, phase) -> Histogram
+        self.counters = {name: 0 for name in COUNTERS}
+
+    def observe(self, operation: str, phase: str, seconds: float):
+        """Record the duration of one phase of an operation."""
+        key = (operation, phase)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram(self.buckets)
+        histogram.observe(seconds)
+
+    def count(self, name: str, n: int = 1):
+        """Increment an event counter."""
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def reset(self):
+        """Clear all histograms and counters."""
+        self.histograms.clear()
+        self.counters = {name: 0 for name in COUNTERS}
+
+    def summary(self) -> Dict:
+        """
+        Nested dict of all metrics.
+
+        Returns:
+            {'counters': {...}, 'operations': {operation: {phase: histogram summary}}}
+        """
+        operations = {}
+        for (operation, phase), histogram in sorted(self.histograms.items()):
+            operations.setdefault(operation, {})[phase] = histogram.summary()
+        return {'counters': dict(self.counters), 'operations': operations}
+
+    def prometheus(self, prefix: str = 'fpga_uart') -> str:
+        """Metrics in the Prometheus text exposition format."""
+        lines = [f"# HELP {prefix}_phase_seconds Time spent per transaction phase",
+                 f"# TYPE {prefix}_phase_seconds histogram"]
+        for (operation, phase), histogram in sorted(self.histograms.items()):
+            labels = f'operation="{operation}",phase="{phase}"'
+            cumulative = 0
+            for bound, n in zip(histogram.buckets, histogram.counts):
+                cumulative += n
+                lines.append(f'{prefix}_phase_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{prefix}_phase_seconds_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            lines.append(f'{prefix}_phase_seconds_sum{{{labels}}} {histogram.sum:.6f}')
+            lines.append(f'{prefix}_phase_seconds_count{{{labels}}} {histogram.count}')
+
+        lines.append(f"# HELP {prefix}_events_total Transport events")
+        lines.append(f"# TYPE {prefix}_events_total counter")
+        for name, value in sorted(self.counters.items()):
+            lines.append(f'{prefix}_events_total{{event="{name}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def json_lines(self) -> str:
+        """One JSON object per histogram and per counter, newline separated."""
+        now = round(time.time(), 3)
+        records = []
+        for (operation, phase), histogram in sorted(self.histograms.items()):
+            record = {'ts': now, 'type': 'histogram', 'operation': operation, 'phase': phase,
+                      'buckets': list(histogram.buckets), 'counts': histogram.counts}
+            record.update(histogram.summary())
+            records.append(json.dumps(record))
+        for name, value in sorted(self.counters.items()):
+            records.append(json.dumps({'ts': now, 'type': 'counter', 'event': name, 'value': value}))
+        return '\n'.join(records) + '\n'
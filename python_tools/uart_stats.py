@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+UART Statistics Helpers
+Latency percentile summaries shared by the broker, link characterization
+and benchmark tools.
+"""
+
+import math
+from typing import Dict, Iterable, List, Optional
+
+
+def percentile(sorted_values: List[float], fraction: float) -> Optional[float]:
+    """
+    Nearest-rank percentile of an already sorted list.
+
+    Args:
+        sorted_values: Samples in ascending order
+        fraction: 0.0 - 1.0 (e.g. 0.95 for p95)
+
+    Returns:
+        Sample at that rank, None if there are no samples
+    """
+    if not sorted_values:
+        return None
+    index = min(max(math.ceil(fraction * len(sorted_values)) - 1, 0), len(sorted_values) - 1)
+    return sorted_values[index]
+
+
+def latency_summary(samples: Iterable[float], scale: float = 1000.0, digits: int = 3) -> Dict[str, Optional[float]]:
+    """
+    p50/p95/p99/max/mean of latency samples.
+
+    Args:
+        samples: Latencies in seconds
+        scale: Unit conversion (default: milliseconds)
+        digits: Rounding of the reported values
+
+    Returns:
+        Dict with keys p50, p95, p99, max, mean (None without samples)
+    """
+    values = sorted(samples)
+    if not values:
+        return {'p50': None, 'p95': None, 'p99': None, 'max': None, 'mean': None}
+    summary = {f"p{int(f * 100)}": percentile(values, f) for f in (0.50, 0.95, 0.99)}
+    summary['max'] = values[-1]
+    summary['mean'] = sum(values) / len(values)
+    return {key: round(value * scale, digits) for key, value in summary.items()}
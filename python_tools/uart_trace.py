@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+UART Transaction Trace
+Compact append-only binary recording of everything FPGAUartInterface sends
+and receives, for bug reports that can be inspected and replayed instead of
+hand-copied console output.
+
+File layout (little endian):
+    header  32 bytes: magic 'FPGATRC1', version u16, reserved u16,
+            baudrate u32, wall clock start f64, monotonic start ns u64
+    record  11 byte header: monotonic ns u64, kind u8, length u16,
+            followed by length payload bytes
+
+Record kinds: TX (command bytes written), RX (bytes received), MARK (UTF-8
+annotation) and META (JSON, e.g. port name). Every record is flushed to
+the OS as it is written, so a crash of the traced program loses nothing; a
+trace cut short otherwise is read up to the last complete record.
+
+Usage:
+    fpga = FPGAUartInterface('/dev/ttyUSB1', trace='block_read.trc')
+    python3 uart_trace.py dump block_read.trc
+    python3 uart_trace.py replay block_read.trc --emulate --extra 2
+"""
+
+import argparse
+import json
+import mmap
+import os
+import select
+import struct
+import sys
+import time
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+TRACE_MAGIC = b'FPGATRC1'
+TRACE_VERSION = 1
+HEADER = struct.Struct('<8sHHIdQ')
+RECORD = struct.Struct('<QBH')
+
+KIND_TX = 1
+KIND_RX = 2
+KIND_MARK = 3
+KIND_META = 4
+KIND_NAMES = {KIND_TX: 'TX', KIND_RX: 'RX', KIND_MARK: 'MARK', KIND_META: 'META'}
+
+MAX_CHUNK = 0xFFFF
+
+
+class TraceRecord(NamedTuple):
+    timestamp_ns: int
+    kind: int
+    data: memoryview
+
+
+class TraceWriter:
+    """Appends TX/RX chunks with monotonic nanosecond timestamps to a trace file."""
+
+    def __init__(self, path: str, baudrate: int = 115200, port: Optional[str] = None):
+        """
+        Open a trace file for appending (the header is written if the file is new).
+
+        Args:
+            path: Trace file path
+            baudrate: Baud rate stored in a new header
+            port: Port name stored as META record
+        """
+        self.path = path
+        new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file = open(path, 'ab')
+        if new:
+            self._file.write(HEADER.pack(TRACE_MAGIC, TRACE_VERSION, 0, baudrate, time.time(),
+                                         time.monotonic_ns()))
+            self._file.flush()
+        if port is not None:
+            self.meta({'port': port, 'baudrate': baudrate, 'opened': time.time()})
+
+    def _record(self, kind: int, data: bytes):
+        view = memoryview(data)
+        timestamp = time.monotonic_ns()
+        while True:
+            chunk = view[:MAX_CHUNK]
+            self._file.write(RECORD.pack(timestamp, kind, len(chunk)))
+            self._file.write(chunk)
+            view = view[MAX_CHUNK:]
+            if not len(view):
+                break
+        self._file.flush()
+
+    def tx(self, data: bytes):
+        """Record bytes written to the port."""
+        self._record(KIND_TX, data)
+
+    def rx(self, data: bytes):
+        """Record bytes received from the port."""
+        self._record(KIND_RX, data)
+
+    def mark(self, text: str):
+        """Record an annotation (e.g. test step)."""
+        self._record(KIND_MARK, text.encode('utf-8'))
+
+    def meta(self, info: dict):
+        """Record JSON metadata."""
+        self._record(KIND_META, json.dumps(info).encode('utf-8'))
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+
+class TraceReader:
+    """Iterates the records of a trace file through mmap without loading it."""
+
+    def __init__(self, path: str):
+        """
+        Raises:
+            ValueError: Not a trace file or unsupported version
+        """
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"{path}: empty file")
+        if len(self._map) < HEADER.size:
+            self.close()
+            raise ValueError(f"{path}: truncated header")
+        magic, version, _, self.baudrate, self.start_time, self.start_ns = HEADER.unpack_from(self._map, 0)
+        if magic != TRACE_MAGIC or version != TRACE_VERSION:
+            self.close()
+            raise ValueError(f"{path}: not a version {TRACE_VERSION} UART trace")
+
+    def __iter__(self) -> Iterator[TraceRecord]:
+        view = memoryview(self._map)
+        offset = HEADER.size
+        end = len(self._map)
+        while offset + RECORD.size <= end:
+            timestamp, kind, length = RECORD.unpack_from(self._map, offset)
+            offset += RECORD.size
+            if offset + length > end:
+                break   # Record cut short
+            yield TraceRecord(timestamp, kind, view[offset:offset + length])
+            offset += length
+
+    def close(self):
+        if getattr(self, '_map', None) is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                pass    # Records still referenced; closed with the file object
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def exchanges(reader: TraceReader) -> List[Tuple[int, bytes, bytes]]:
+    """
+    Group a trace into command bursts and the bytes received after each.
+
+    Returns:
+        List of (tx timestamp ns, tx bytes, rx bytes until the next tx)
+    """
+    bursts = []     # (timestamp, tx, [rx chunks]), joined once at the end
+    for record in reader:
+        if record.kind == KIND_TX:
+            bursts.append((record.timestamp_ns, bytes(record.data), []))
+        elif record.kind == KIND_RX and bursts:
+            bursts[-1][2].append(record.data)
+    return [(timestamp, tx, b''.join(chunks)) for timestamp, tx, chunks in bursts]
+
+
+def dump(path: str):
+    """Print a trace in readable form with times relative to the trace start."""
+    with TraceReader(path) as reader:
+        print(f"Trace {path}: {reader.baudrate} baud, started "
+              f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(reader.start_time))}")
+        for record in reader:
+            ms = (record.timestamp_ns - reader.start_ns) / 1e6
+            name = KIND_NAMES.get(record.kind, f"?{record.kind}")
+            if record.kind in (KIND_MARK, KIND_META):
+                print(f"{ms:12.3f}  {name:<4}  {bytes(record.data).decode('utf-8', 'replace')}")
+            else:
+                print(f"{ms:12.3f}  {name:<4}  {len(record.data):4d}  {bytes(record.data).hex(' ').upper()}")
+
+
+def replay(path: str, port: str, speed: float = 1.0, baudrate: Optional[int] = None,
+           settle: float = 0.05) -> int:
+    """
+    Send the recorded command bursts with their original spacing and compare replies.
+
+    Args:
+        path: Trace file
+        port: Serial port (hardware or emulator pty)
+        speed: Time scale (2.0 = twice as fast)
+        baudrate: Port baud rate (default: from the trace header)
+        settle: Extra time to collect replies after the recorded ones
+
+    Returns:
+        Number of bursts whose replies differ from the recording
+    """
+    import serial
+
+    with TraceReader(path) as reader:
+        recorded = exchanges(reader)
+        baudrate = baudrate or reader.baudrate
+    if not recorded:
+        print("Trace contains no TX records")
+        return 0
+
+    ser = serial.Serial(port=port, baudrate=baudrate, timeout=0)
+    ser.reset_input_buffer()
+    mismatches = 0
+    try:
+        base_ns = recorded[0][0]
+        start = time.perf_counter()
+        for n, (timestamp, tx, rx) in enumerate(recorded):
+            due = start + (timestamp - base_ns) / 1e9 / speed
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            ser.write(tx)
+            ser.flush()
+
+            # Collect replies until the next burst is due, but at least until the
+            # recorded amount arrived or its wire time plus settle has passed
+            deadline = time.perf_counter() + (len(tx) + len(rx)) * 10 / baudrate + settle
+            if n + 1 < len(recorded):
+                next_due = start + (recorded[n + 1][0] - base_ns) / 1e9 / speed
+            else:
+                next_due = deadline
+            got = bytearray()
+            while True:
+                now = time.perf_counter()
+                if now >= next_due and (len(got) >= len(rx) or now >= deadline):
+                    break
+                # Sleep in select() until data arrives or the stop condition can be met
+                until = next_due if len(got) >= len(rx) else max(next_due, deadline)
+                if select.select([ser.fileno()], [], [], max(0.0, until - now))[0]:
+                    got += ser.read(ser.in_waiting or 1)
+            if bytes(got) != rx:
+                mismatches += 1
+                print(f"Burst {n} TX {tx.hex(' ').upper()}")
+                print(f"  recorded RX ({len(rx)}): {rx.hex(' ').upper()}")
+                print(f"  replayed RX ({len(got)}): {bytes(got).hex(' ').upper()}")
+    finally:
+        ser.close()
+    print(f"Replayed {len(recorded)} bursts, {mismatches} with different replies")
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect or replay FPGA UART traces')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p_dump = sub.add_parser('dump', help='Print trace records')
+    p_dump.add_argument('trace')
+    p_replay = sub.add_parser('replay', help='Replay command bursts and compare replies')
+    p_replay.add_argument('trace')
+    p_replay.add_argument('port', nargs='?', default='/dev/ttyUSB1', help='Serial port (default: /dev/ttyUSB1)')
+    p_replay.add_argument('--speed', type=float, default=1.0, help='Time scale (default: 1.0)')
+    p_replay.add_argument('-b', '--baud', type=int, help='Baud rate (default: from trace)')
+    p_replay.add_argument('--emulate', action='store_true', help='Replay against fpga_emulator.py')
+    p_replay.add_argument('--extra', type=int, default=0, help='Emulated block read over-send bytes')
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'dump':
+            dump(args.trace)
+            return
+        if args.emulate:
+            from fpga_emulator import FPGAEmulator
+            with TraceReader(args.trace) as reader:
+                baudrate = args.baud or reader.baudrate
+            with FPGAEmulator(baudrate=baudrate, block_read_extra=args.extra) as emulator:
+                mismatches = replay(args.trace, emulator.port, args.speed, baudrate)
+        else:
+            mismatches = replay(args.trace, args.port, args.speed, args.baud)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(2)
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()